@@ -1,7 +1,12 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from ..services.rag_service import rag_service
-from ..schemas.chat import ChatRequest, ChatResponse
+from ..schemas.chat import ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse
+from ..core.config import settings
+from ..utils.admission import Overloaded, retry_after_header
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +16,55 @@ router = APIRouter()
 async def chat(request: ChatRequest):
     try:
         logger.info(f"Processing chat request for thread_id: {request.thread_id}")
-        response = rag_service.process_question(request)
+        response = await rag_service.process_question(request)
         return response
+    except Overloaded as e:
+        # Shed under load: 429 when a backend queue is full, 503 when its queue deadline would be missed
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=retry_after_header(e))
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """Answer many questions concurrently; results are returned in request order."""
+    if len(request.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.requests)} requests (max {settings.BATCH_MAX_REQUESTS})"
+        )
+    try:
+        logger.info(f"Processing batch of {len(request.requests)} chat requests")
+        start = time.perf_counter()
+        results = await rag_service.process_batch(request.requests, request.max_concurrency)
+        return BatchChatResponse(results=results, elapsed_ms=round(1000 * (time.perf_counter() - start), 2))
+    except Exception as e:
+        logger.error(f"Error in batch chat endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _format_sse(event: dict) -> str:
+    """Format a pipeline event as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream route, SQL, retrieved documents and answer tokens as Server-Sent Events."""
+    logger.info(f"Streaming chat request for thread_id: {request.thread_id}")
+
+    async def event_source():
+        async for event in rag_service.stream_question(request):
+            yield _format_sse(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/info")
 async def get_info():
     """Get application information."""
@@ -29,10 +76,10 @@ async def get_info():
 
 
 @router.delete("/conversation/{thread_id}/state")
-def clear_conversation_state(thread_id: str):
+async def clear_conversation_state(thread_id: str):
     """Clear conversation state for a specific thread."""
     try:
-        success = rag_service.clear_conversation_state(thread_id)
+        success = await rag_service.clear_conversation_state(thread_id)
         return {
             "success": success,
             "message": f"Conversation state cleared for thread {thread_id}" if success else "No state found to clear"
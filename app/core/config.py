@@ -15,6 +15,16 @@ class Settings(BaseSettings):
     # MongoDB for long-term memory
     MONGODB_URL: str = os.getenv("MONGODB_URL")
     MONGODB_DATABASE: str = Field(default="rag_memory", env="MONGODB_DATABASE")
+    MONGODB_MAX_POOL_SIZE: int = 50            # Per client; one sync and one async client per worker
+    MONGODB_MIN_POOL_SIZE: int = 2             # Kept warm so turns skip the TLS handshake
+
+    # Write-behind persistence of chat turns
+    MEMORY_WRITE_BATCH_SIZE: int = 100         # Turns per insert_many
+    MEMORY_WRITE_FLUSH_INTERVAL: float = 0.5   # Seconds to wait for a batch to fill
+    MEMORY_WRITE_QUEUE_MAX: int = 10000        # Turns buffered before new ones are dropped
+    MEMORY_WRITE_MAX_RETRIES: int = 5
+    MEMORY_WRITE_RETRY_BASE_DELAY: float = 0.5 # Seconds, doubled per retry; a batch stops retrying at the drain timeout
+    MEMORY_WRITE_DRAIN_TIMEOUT: float = 10.0   # Seconds to flush the queue on shutdown
     
     # Azure OpenAIs
     EMBEDDING_AZURE_OPENAI_ENDPOINT: str = os.getenv("EMBEDDING_AZURE_OPENAI_ENDPOINT")
@@ -23,6 +33,105 @@ class Settings(BaseSettings):
     # Qdrant
     QDRANT_API_KEY: str = os.getenv("QDRANT_API_KEY")
     QDRANT_URL: str = os.getenv("QDRANT_URL")
+    QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION", "MovieScriptsOllama")
+
+    # Vector store backend: "qdrant" (remote collection) or "embedded" (in-process index over an exported snapshot)
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "qdrant")
+    VECTOR_SNAPSHOT_DIR: str = os.path.join(os.path.dirname(__file__), "..", "..", "data", "index", "vectors")
+    VECTOR_INDEX_HNSW: bool = False           # Needs hnswlib; brute force is exact and fast for a few scripts
+
+    # Embedding model used for queries and for ingested script chunks
+    EMBEDDING_MODEL: str = "embed-english-v3.0"
+
+    # Script PDF ingestion (python -m app.ingest)
+    INGEST_PDF_DIR: str = os.path.join(os.path.dirname(__file__), "..", "..", "data", "pdf")
+    INGEST_CHUNK_MAX_CHARS: int = 1500
+    INGEST_CHUNK_OVERLAP: int = 150           # Characters carried into the next chunk of a long scene
+    INGEST_EMBED_CONCURRENCY: int = 4         # Provider embedding calls in flight
+    INGEST_UPSERT_BATCH: int = 512            # Points per Qdrant upsert
+
+    # Corpus-wide BM25 index, rebuilt when the Qdrant collection changes
+    BM25_INDEX_PATH: str = os.path.join(os.path.dirname(__file__), "..", "..", "data", "index", "bm25.pkl")
+
+    # Optional reranking of fused retrieval candidates before they are stuffed into the prompt
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = ""                    # Local cross-encoder (needs sentence-transformers); empty = lexical
+    RERANK_TOP_K: int = 6                     # Chunks kept
+    RERANK_TOKEN_BUDGET: int = 2000           # Estimated prompt tokens of kept chunks
+    RERANK_DEDUPE_OVERLAP: float = 0.6        # Word overlap at which a chunk of the same scene counts as a duplicate
+
+    # Semantic answer cache (in-process, keyed on question embeddings)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95     # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL: int = 43000            # Seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000     # Per route namespace, LRU-evicted
+    SEMANTIC_CACHE_ROUTES: str = "sql,vector"  # General answers depend on chat history
+
+    # Query/document embedding cache (in-process LRU + Redis tier)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_TTL: int = 30 * 24 * 3600  # Seconds; embeddings only change with the model
+
+    # Local router tiers (keywords, then example-embedding similarity) before the LLM router
+    ROUTER_FAST_PATH_ENABLED: bool = True
+    ROUTER_EMBEDDING_MIN_SIMILARITY: float = 0.55
+    ROUTER_EMBEDDING_MARGIN: float = 0.08
+    ROUTER_SPECULATIVE_ENABLED: bool = True    # Retrieve and prepare the schema while the LLM router runs
+    SPECULATIVE_RETRIEVAL_MAX_AGE: float = 60.0  # Seconds an unclaimed speculative retrieval is kept
+
+    # SQL prompt schema: cached per database file version; pruned to relevant tables for larger schemas
+    SQL_SCHEMA_PRUNE_MIN_TABLES: int = 8
+
+    # Generated-SQL execution: pooled read-only connections and a result cache keyed on DB file version
+    SQL_POOL_SIZE: int = 4
+    SQL_QUERY_TIMEOUT: float = 5.0            # Seconds per query
+    SQL_MAX_ROWS: int = 100                   # Rows returned to the answer prompt
+    SQL_RESULT_CACHE_MAX_ENTRIES: int = 512
+
+    # Session hydration
+    SESSION_HISTORY_MESSAGES: int = 10             # MongoDB messages seeded into a cold thread
+    SESSION_STATE_CACHE_MAX_ENTRIES: int = 10000   # Threads remembered as having a checkpoint
+    SESSION_STATE_CACHE_TTL: int = 600             # Seconds; well under the checkpoint TTL
+
+    # Conversation context kept in the checkpoint; older turns are folded into a running summary
+    CONTEXT_WINDOW_MESSAGES: int = 12         # Messages kept in state; 0 keeps everything
+    CONTEXT_SUMMARY_ENABLED: bool = True      # False just drops trimmed messages
+    CONTEXT_SUMMARY_MAX_WORDS: int = 200
+    CONTEXT_SUMMARY_MAX_THREADS: int = 10000  # Folds kept per process, running or waiting for the next turn
+
+    # Follow-ups rewritten to standalone questions before routing, retrieval and caching
+    QUERY_CONDENSE_ENABLED: bool = True
+    QUERY_CONDENSE_HISTORY_MESSAGES: int = 6       # Recent messages shown to the rewriter
+    QUERY_CONDENSE_CACHE_MAX_ENTRIES: int = 10000
+
+    # Concurrent requests for the same standalone question share one pipeline run
+    COALESCE_ENABLED: bool = True
+
+    # Metrics at /metrics (Prometheus text format)
+    METRICS_ENABLED: bool = True
+
+    # Sampled request traces (JSONL) for offline replay with benchmarks.replay; empty path disables recording
+    TRACE_RECORD_PATH: str = ""
+    TRACE_SAMPLE_RATE: float = 0.01  # fraction of /api/chat requests recorded
+    TRACE_MAX_BYTES: int = 100_000_000  # recording stops once the file reaches this size
+
+    # Admission control: per-backend concurrency caps with a bounded queue; calls beyond it are shed (429/503)
+    LLM_MAX_CONCURRENCY: int = 16           # 0 disables the limit
+    LLM_MAX_QUEUE: int = 64
+    LLM_QUEUE_TIMEOUT: float = 10.0         # Seconds a call may wait for a slot
+    EMBEDDER_MAX_CONCURRENCY: int = 32
+    EMBEDDER_MAX_QUEUE: int = 128
+    EMBEDDER_QUEUE_TIMEOUT: float = 2.0
+    VECTORSTORE_MAX_CONCURRENCY: int = 32
+    VECTORSTORE_MAX_QUEUE: int = 128
+    VECTORSTORE_QUEUE_TIMEOUT: float = 2.0
+    MONGODB_MAX_CONCURRENCY: int = 20
+    MONGODB_MAX_QUEUE: int = 100
+    MONGODB_QUEUE_TIMEOUT: float = 1.0
+
+    # Batch chat endpoint
+    BATCH_MAX_REQUESTS: int = 1000
+    BATCH_MAX_CONCURRENCY: int = 16
+    BATCH_EMBED_SIZE: int = 96                # Texts per provider embedding call (Cohere's limit)
 
     # Redis Configuration - Individual parameters
     REDIS_HOST: str = Field(env="REDIS_HOST")
@@ -1,19 +1,40 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_qdrant import QdrantVectorStore
-from langchain_community.utilities import SQLDatabase
-from langchain_ollama import OllamaEmbeddings
-from langchain_cohere import CohereEmbeddings
+"""
+Model, vector store and database clients, built on first use.
+
+Importing this module constructs nothing: ``from app.factories.models import llm``
+(or ``models.llm``) builds the resource on first access, and
+``resources.warm_up()`` builds all of them concurrently at startup. Client
+libraries are imported inside the builders so they stay off the import path.
+"""
+
+from functools import partial
 from ..core.config import settings
+from ..utils.metrics import LLMMetricsHandler
+from ..utils.tracing import TraceCallbackHandler
+from .resources import ResourceRegistry
+
+resources = ResourceRegistry()
+
+EMBEDDING_MODEL = settings.EMBEDDING_MODEL
 
 
 # LLM
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
+@resources.register("llm")
+def _build_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from ..utils.admission import Bulkhead, limit_chat_model
+
+    # Concurrent Gemini calls capped by a bulkhead; excess calls queue briefly or are shed
+    return limit_chat_model(ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        # Call latency, time to first token and token usage for /metrics; replies for sampled request traces
+        callbacks=[LLMMetricsHandler("gemini-2.0-flash"), TraceCallbackHandler()],
+    ), Bulkhead.from_settings("llm"))
+
 
 # Embedder
 # embedder = AzureOpenAIEmbeddings(
@@ -24,9 +45,27 @@ llm = ChatGoogleGenerativeAI(
 
 # embedder = OllamaEmbeddings(model="mxbai-embed-large")
 
-embedder = CohereEmbeddings(
-    model="embed-english-v3.0",
-)
+@resources.register("embedder")
+def _build_embedder():
+    from langchain_cohere import CohereEmbeddings
+    from ..utils.admission import Bulkhead
+    from ..utils.embedding_cache import CachedEmbeddings
+
+    cohere_embeddings = CohereEmbeddings(
+        model=EMBEDDING_MODEL,
+    )
+
+    # Cohere embeddings behind a content-addressed cache (in-process LRU + Redis)
+    return CachedEmbeddings(
+        cohere_embeddings,
+        model_name=EMBEDDING_MODEL,
+        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        redis_url=f"redis://{settings.REDIS_USERNAME}:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}/0",
+        ttl=settings.EMBEDDING_CACHE_TTL,
+        abatch_query=partial(cohere_embeddings.aembed, input_type="search_query"),
+        limiter=Bulkhead.from_settings("embedder"),
+    )
+
 
 # Vector Store
 # vectorstore = QdrantVectorStore.from_existing_collection(
@@ -37,13 +76,92 @@ embedder = CohereEmbeddings(
 #     prefer_grpc=True,
 # )
 
-vectorstore = QdrantVectorStore.from_existing_collection(
-    embedding=embedder,
-    api_key=settings.QDRANT_API_KEY,
-    collection_name="MovieScriptsOllama",
-    url=settings.QDRANT_URL,
-    prefer_grpc=True,
-)
+@resources.register("vectorstore")
+def _build_vectorstore():
+    embedder = resources.get("embedder")
+    if settings.VECTOR_STORE_BACKEND == "embedded":
+        from ..utils.vector_index import EmbeddedVectorIndex
+
+        # In-process: memory-mapped snapshot exported with `python -m app.ingest --export-snapshot`
+        return EmbeddedVectorIndex.from_snapshot(
+            settings.VECTOR_SNAPSHOT_DIR,
+            embedder,
+            embedding_model=EMBEDDING_MODEL,
+            use_hnsw=settings.VECTOR_INDEX_HNSW,
+        )
+
+    from langchain_qdrant import QdrantVectorStore
+
+    return QdrantVectorStore.from_existing_collection(
+        embedding=embedder,
+        api_key=settings.QDRANT_API_KEY,
+        collection_name=settings.QDRANT_COLLECTION,
+        url=settings.QDRANT_URL,
+        prefer_grpc=True,
+    )
+
+
+# Hybrid retriever: dense MMR + corpus-wide BM25, built once per process
+@resources.register("hybrid_retriever")
+def _build_hybrid_retriever():
+    from ..utils.admission import Bulkhead
+    from ..utils.retrieval import build_hybrid_retriever
+    from ..utils.reranking import ContextReranker
+
+    return build_hybrid_retriever(
+        resources.get("vectorstore"),
+        settings.BM25_INDEX_PATH,
+        reranker=ContextReranker(
+            top_k=settings.RERANK_TOP_K,
+            token_budget=settings.RERANK_TOKEN_BUDGET,
+            dedupe_overlap=settings.RERANK_DEDUPE_OVERLAP,
+            model_name=settings.RERANK_MODEL or None,
+        ) if settings.RERANK_ENABLED else None,
+        limiter=Bulkhead.from_settings("vectorstore"),
+    )
+
 
 # Database
-db = SQLDatabase.from_uri(f"sqlite:///{settings.SQLITE_DB_PATH}", sample_rows_in_table_info=3)
\ No newline at end of file
+@resources.register("db")
+def _build_db():
+    from langchain_community.utilities import SQLDatabase
+
+    return SQLDatabase.from_uri(f"sqlite:///{settings.SQLITE_DB_PATH}", sample_rows_in_table_info=3)
+
+
+# Schema text for SQL generation, computed once and refreshed when the database file changes
+@resources.register("schema_context")
+def _build_schema_context():
+    from ..utils.sql_schema import SchemaContext
+
+    schema_context = SchemaContext(
+        f"sqlite:///{settings.SQLITE_DB_PATH}",
+        settings.SQLITE_DB_PATH,
+        sample_rows=3,
+        prune_min_tables=settings.SQL_SCHEMA_PRUNE_MIN_TABLES,
+    )
+    schema_context.refresh()
+    return schema_context
+
+
+# Generated SQL runs here: read-only pooled connections, timeout, row cap and result cache
+@resources.register("sql_executor")
+def _build_sql_executor():
+    from ..utils.sql_executor import ReadOnlySQLExecutor
+
+    return ReadOnlySQLExecutor(
+        settings.SQLITE_DB_PATH,
+        pool_size=settings.SQL_POOL_SIZE,
+        timeout=settings.SQL_QUERY_TIMEOUT,
+        max_rows=settings.SQL_MAX_ROWS,
+        cache_max_entries=settings.SQL_RESULT_CACHE_MAX_ENTRIES,
+    )
+
+
+def __getattr__(name: str):
+    if name in resources:
+        value = resources.get(name)
+        # Later lookups are plain module attributes
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
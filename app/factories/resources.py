@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """Named singletons built on first use, or all at once by ``warm_up``.
+
+    Each resource has its own lock, so concurrent first accesses build it once
+    and a builder may get other resources it depends on. A failed build is
+    recorded and retried on the next access.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, dict] = {}
+
+    def register(self, name: str) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """Decorator registering ``builder`` as the factory of ``name``."""
+        def decorator(builder: Callable[[], Any]) -> Callable[[], Any]:
+            self._builders[name] = builder
+            self._locks[name] = threading.Lock()
+            self._status[name] = {"state": "pending"}
+            return builder
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._builders
+
+    def get(self, name: str) -> Any:
+        """The resource, building it (blocking) if this is the first access."""
+        if name in self._values:
+            return self._values[name]
+
+        with self._locks[name]:
+            if name in self._values:
+                return self._values[name]
+
+            self._status[name] = {"state": "building"}
+            start = time.perf_counter()
+            try:
+                value = self._builders[name]()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "error": str(e)}
+                logger.error(f"Failed to build {name}: {e}")
+                raise
+            self._values[name] = value
+            self._status[name] = {"state": "ready", "seconds": round(time.perf_counter() - start, 3)}
+            logger.info(f"{name} ready in {self._status[name]['seconds']}s")
+            return value
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The resource if it is already built, without building it."""
+        return self._values.get(name)
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None) -> bool:
+        """Build resources concurrently in worker threads; True if all of them are ready."""
+        names = list(names or self._builders)
+        results = await asyncio.gather(*(asyncio.to_thread(self.get, name) for name in names), return_exceptions=True)
+        return not any(isinstance(result, Exception) for result in results)
+
+    @property
+    def ready(self) -> bool:
+        return all(name in self._values for name in self._builders)
+
+    def get_status(self) -> Dict[str, dict]:
+        return {name: dict(status) for name, status in self._status.items()}
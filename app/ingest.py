@@ -0,0 +1,92 @@
+"""
+Build or update the Qdrant movie scripts collection from the script PDFs.
+
+Incremental: chunks whose content is already in the collection are not
+re-embedded, and chunks a PDF no longer produces are removed. The BM25
+index is invalidated when anything changed so the API rebuilds it.
+
+Usage:
+    python -m app.ingest                                    # every PDF in INGEST_PDF_DIR -> QDRANT_COLLECTION
+    python -m app.ingest data/pdf/get-out-2017_merged.pdf   # selected files
+    python -m app.ingest --qdrant-path data/qdrant          # local on-disk Qdrant instead of QDRANT_URL
+    python -m app.ingest --export-snapshot                  # then export for VECTOR_STORE_BACKEND=embedded
+    python -m app.ingest --skip-ingest --export-snapshot    # export only
+"""
+
+import argparse
+import asyncio
+import glob
+import logging
+import os
+from qdrant_client import AsyncQdrantClient
+from langchain_cohere import CohereEmbeddings
+from .core.config import settings
+from .utils.ingestion import SceneChunker, ScriptIngestor
+from .utils.vector_index import export_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _client(args) -> AsyncQdrantClient:
+    if args.memory:
+        return AsyncQdrantClient(location=":memory:")
+    if args.qdrant_path:
+        return AsyncQdrantClient(path=args.qdrant_path)
+    return AsyncQdrantClient(url=args.qdrant_url or settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, prefer_grpc=True)
+
+
+async def main(args):
+    paths = args.paths or sorted(glob.glob(os.path.join(settings.INGEST_PDF_DIR, "*.pdf")))
+    if not paths and not args.skip_ingest:
+        raise SystemExit(f"No PDFs found in {settings.INGEST_PDF_DIR}")
+
+    client = _client(args)
+    collection_name = args.collection or settings.QDRANT_COLLECTION
+    try:
+        if not args.skip_ingest:
+            await _ingest(args, client, collection_name, paths)
+        if args.export_snapshot:
+            meta = await export_snapshot(client, collection_name, args.export_snapshot, settings.EMBEDDING_MODEL)
+            print(f"Exported {meta['count']} chunks of {collection_name} to {args.export_snapshot}")
+    finally:
+        await client.close()
+
+
+async def _ingest(args, client: AsyncQdrantClient, collection_name: str, paths):
+    ingestor = ScriptIngestor(
+        client,
+        collection_name,
+        CohereEmbeddings(model=settings.EMBEDDING_MODEL),
+        chunker=SceneChunker(max_chars=args.chunk_chars, overlap=args.chunk_overlap),
+        embed_batch_size=settings.BATCH_EMBED_SIZE,
+        embed_concurrency=args.embed_concurrency,
+        upsert_batch_size=args.upsert_batch,
+    )
+    stats = await ingestor.ingest(paths)
+
+    if (stats.embedded or stats.deleted) and not args.memory and os.path.exists(settings.BM25_INDEX_PATH):
+        os.remove(settings.BM25_INDEX_PATH)
+        logger.info("BM25 index invalidated; it is rebuilt on the next API start")
+
+    summary = stats.as_dict()
+    print(f"{summary['files']} files, {summary['pages']} pages, {summary['chunks']} chunks "
+          f"({summary['unchanged']} unchanged, {summary['embedded']} embedded, {summary['deleted']} removed) "
+          f"in {summary['seconds']}s - {summary['pages_per_sec']} pages/s, {summary['chunks_per_sec']} chunks/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="PDF files (default: every PDF in INGEST_PDF_DIR)")
+    parser.add_argument("--collection", help="Qdrant collection (default: QDRANT_COLLECTION)")
+    parser.add_argument("--qdrant-url", help="Qdrant URL (default: QDRANT_URL)")
+    parser.add_argument("--qdrant-path", help="use a local on-disk Qdrant at this path")
+    parser.add_argument("--memory", action="store_true", help="use an in-memory Qdrant (dry run)")
+    parser.add_argument("--export-snapshot", nargs="?", const=settings.VECTOR_SNAPSHOT_DIR, metavar="DIR",
+                        help="export the collection for the embedded vector index (default: VECTOR_SNAPSHOT_DIR)")
+    parser.add_argument("--skip-ingest", action="store_true", help="only export")
+    parser.add_argument("--chunk-chars", type=int, default=settings.INGEST_CHUNK_MAX_CHARS)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.INGEST_CHUNK_OVERLAP)
+    parser.add_argument("--embed-concurrency", type=int, default=settings.INGEST_EMBED_CONCURRENCY)
+    parser.add_argument("--upsert-batch", type=int, default=settings.INGEST_UPSERT_BATCH)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s   %(message)s")
+    asyncio.run(main(parser.parse_args()))
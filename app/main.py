@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+import asyncio
 import sys
 import os
 import logging
@@ -8,8 +10,10 @@ from contextlib import asynccontextmanager
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.api.routes import router
 from app.services.redis_checkpointer import redis_checkpointer
-from app.services.redis_cache_service import redis_cache_service
 from app.services.rag_service import rag_service
+from app.services.memory_service import memory_service
+from app.factories.models import resources
+from app.utils.metrics import metrics
 
 
 logger = logging.getLogger(__name__)
@@ -19,26 +23,33 @@ async def lifespan(app: FastAPI):
     """Manage application lifespan with Redis validation."""
     # Startup
     logger.info("Starting RAG Movie Assistant API")
-    
-    try:
-        # Initialize Redis cache early
-        redis_cache_service.initialize_llm_cache()
-
-        health = rag_service.health_check()
-        if health["status"] == "healthy":
-            logger.info("Service startup completed successfully")
-        else:
-            logger.warning("Service starting with degraded functionality")
 
-    except Exception as e:
-        logger.warning(f"Startup health check failed: {e}")
+    # Clients, graph and async checkpointer warm up concurrently on the serving event loop
+    # while the app already answers /health; /ready turns 200 once they are done
+    warmup = asyncio.create_task(rag_service.initialize())
+    warmup.add_done_callback(_log_warmup)
 
     yield
     
     # Shutdown
     logger.info("Shutting down RAG Movie Assistant API")
 
-    redis_checkpointer.close()
+    if not warmup.done():
+        warmup.cancel()
+    await redis_checkpointer.close()
+    await memory_service.close()
+    sql_executor = resources.peek("sql_executor")
+    if sql_executor is not None:
+        sql_executor.close()
+    rag_service.trace_recorder.close()
+
+def _log_warmup(task: asyncio.Task):
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error(f"Service warm-up failed, not ready: {task.exception()}")
+    else:
+        logger.info("Service startup completed successfully")
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -71,9 +82,20 @@ async def root():
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint including Redis status."""
+    """Liveness: answers as soon as the process serves, with Redis status and stats once warmed up."""
     return rag_service.health_check()
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness: 200 once models, stores and the graph are warmed up, 503 until then."""
+    readiness = rag_service.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Latency histograms, token counts and cache counters in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     """Run the FastAPI server."""
     uvicorn.run(
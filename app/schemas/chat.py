@@ -1,12 +1,29 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
     question: str
     thread_id: Optional[str] = "default"
+    include_timings: bool = False
 
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     answer: str
-    route: Optional[str] = None
\ No newline at end of file
+    route: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None  # Milliseconds per node / backend call and in total, on request
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint."""
+    requests: List[ChatRequest]
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
+class BatchChatItem(ChatResponse):
+    """One answer of a batch, with its own processing time."""
+    thread_id: Optional[str] = None
+    elapsed_ms: float
+
+class BatchChatResponse(BaseModel):
+    """Response model for batch chat endpoint; results are in request order."""
+    results: List[BatchChatItem]
+    elapsed_ms: float
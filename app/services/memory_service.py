@@ -1,100 +1,492 @@
+import asyncio
+import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
 from ..core.config import settings
-from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
-from langchain_core.messages import BaseMessage
+from ..utils.admission import Bulkhead, Overloaded
+from ..utils.metrics import track
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, message_to_dict, messages_from_dict
+from pymongo import AsyncMongoClient, MongoClient, UpdateOne, ASCENDING, DESCENDING
 
 logger = logging.getLogger(__name__)
 
+# Newest first; ``_id`` breaks ties between the two messages of a turn
+_NEWEST_FIRST = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+_OLDEST_FIRST = [("timestamp", ASCENDING), ("_id", ASCENDING)]
+
 class MemoryService:
+    """Long-term chat history in MongoDB.
+
+    One pooled sync client and one pooled async client are shared by every
+    call. Documents keep the ``SessionId``/``History`` layout of
+    ``MongoDBChatMessageHistory`` plus a ``timestamp``, indexed together with
+    ``SessionId`` so per-session reads are index scans. A metadata document
+    per session (``_id`` = session id) carries the message count, first/last
+    activity and a route histogram, updated with ``$inc``/``$min``/``$max``
+    on every save so summaries are a single ``_id`` lookup.
+
+    Turns saved from the answer path go through a write-behind queue:
+    ``enqueue_conversation`` returns immediately and a background task
+    flushes queued turns in batches, retrying with exponential backoff.
+    ``drain`` flushes what is left on shutdown.
+
+    Async reads on the request path hold a slot of the ``mongodb`` bulkhead
+    and raise ``Overloaded`` when it sheds them.
+    """
+
     def __init__(self):
         self.mongodb_url = settings.MONGODB_URL
         self.database_name = settings.MONGODB_DATABASE
+        self.collection_name = "chat_sessions"
+        self.meta_collection_name = "chat_session_meta"
         self._validated = False
-        self._validate_connection()
-    
-    def _validate_connection(self):
-        """Validate MongoDB connection once on startup."""
+        self._client: Optional[MongoClient] = None
+        self._async_client: Optional[AsyncMongoClient] = None
+        # Queued turns carry their thread's clear generation; turns of a since-cleared session are skipped
+        self._queue: Optional["asyncio.Queue[Tuple[str, str, str, str, datetime, int]]"] = None
+        self._clear_generation: Dict[str, int] = {}
+        # Threads of the batch being written, and an event set once it is done
+        self._flushing: Optional[Tuple[Set[str], asyncio.Event]] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Set while draining: retries must not outlive the shutdown deadline
+        self._drain_deadline: Optional[float] = None
+        self._write_stats = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0, "meta_failed": 0,
+                             "discarded": 0}
+        self._bulkhead = Bulkhead.from_settings("mongodb")
+
+    def _client_options(self) -> dict:
+        return {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "serverSelectionTimeoutMS": 3000,
+        }
+
+    def connect(self) -> bool:
+        """Validate the MongoDB connection and ensure indexes (blocking; run once at startup)."""
+        if self._validated:
+            return True
         if not self.mongodb_url:
             logger.warning("MongoDB not configured - memory service disabled")
-            return
-            
+            return False
+
         try:
-            from pymongo import MongoClient
-            client = MongoClient(self.mongodb_url, serverSelectionTimeoutMS=3000)
-            client.admin.command('ping')
-            client.close()
+            self._client = MongoClient(self.mongodb_url, **self._client_options())
+            self._client.admin.command('ping')
+            self._client[self.database_name][self.collection_name].create_index(
+                [("SessionId", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+                name="session_timestamp"
+            )
+            try:
+                self._backfill_session_metadata()
+            except Exception as e:
+                logger.warning(f"Session metadata backfill skipped: {e}")
             self._validated = True
             logger.info("MongoDB connection validated")
         except Exception as e:
             logger.error(f"MongoDB validation failed: {e}")
             self._validated = False
-    
-    def _get_chat_history(self, session_id: str) -> Optional[MongoDBChatMessageHistory]:
-        """Get MongoDB chat message history instance."""
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        return self._validated
+
+    def _backfill_session_metadata(self):
+        """Build metadata documents from existing history the first time the collection is empty."""
+        database = self._client[self.database_name]
+        if database[self.meta_collection_name].estimated_document_count() > 0:
+            return
+        if database[self.collection_name].estimated_document_count() == 0:
+            return
+
+        database[self.collection_name].aggregate([
+            {"$group": {
+                "_id": "$SessionId",
+                "message_count": {"$sum": 1},
+                "first_activity": {"$min": "$timestamp"},
+                "last_activity": {"$max": "$timestamp"},
+            }},
+            {"$merge": {"into": self.meta_collection_name, "whenMatched": "keepExisting"}},
+        ])
+        logger.info("Session metadata backfilled from chat history")
+
+    def _get_collection(self):
+        """Get the chat collection on the shared sync client."""
         if not self._validated:
             return None
-        
-        return MongoDBChatMessageHistory(
-            connection_string=self.mongodb_url,
-            session_id=session_id,
-            database_name=self.database_name,
-            collection_name="chat_sessions"
-        )
-    
+        return self._client[self.database_name][self.collection_name]
+
+    def _get_meta_collection(self):
+        """Get the session metadata collection on the shared sync client."""
+        if not self._validated:
+            return None
+        return self._client[self.database_name][self.meta_collection_name]
+
+    def _get_async_meta_collection(self):
+        """Get the session metadata collection on the shared async client."""
+        collection = self._get_async_collection()
+        return None if collection is None else collection.database[self.meta_collection_name]
+
+    def _get_async_collection(self):
+        """Get the chat collection on the shared async client."""
+        if not self._validated:
+            return None
+
+        if self._async_client is None:
+            self._async_client = AsyncMongoClient(self.mongodb_url, **self._client_options())
+        return self._async_client[self.database_name][self.collection_name]
+
+    @staticmethod
+    def _turn_documents(thread_id: str, question: str, answer: str, timestamp: Optional[datetime] = None) -> List[dict]:
+        """Both messages of a turn, ready for a single ``insert_many``."""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        return [
+            {"SessionId": thread_id, "History": json.dumps(message_to_dict(HumanMessage(content=question))), "timestamp": timestamp},
+            {"SessionId": thread_id, "History": json.dumps(message_to_dict(AIMessage(content=answer))), "timestamp": timestamp},
+        ]
+
+    @staticmethod
+    def _meta_updates(turns: List[Tuple[str, str, datetime]]) -> List[UpdateOne]:
+        """One upsert per session for ``(thread_id, route, timestamp)`` turns."""
+        sessions: Dict[str, dict] = {}
+        for thread_id, route, timestamp in turns:
+            session = sessions.setdefault(thread_id, {"routes": {}, "first": timestamp, "last": timestamp})
+            session["routes"][route] = session["routes"].get(route, 0) + 1
+            session["first"] = min(session["first"], timestamp)
+            session["last"] = max(session["last"], timestamp)
+
+        return [
+            UpdateOne(
+                {"_id": thread_id},
+                {
+                    "$inc": {"message_count": 2 * sum(s["routes"].values()),
+                             **{f"routes.{route}": n for route, n in s["routes"].items()}},
+                    "$min": {"first_activity": s["first"]},
+                    "$max": {"last_activity": s["last"]},
+                },
+                upsert=True
+            )
+            for thread_id, s in sessions.items()
+        ]
+
+    @staticmethod
+    def _summary(session_id: str, meta: Optional[dict]) -> Dict:
+        if not meta:
+            return {"message_count": 0, "last_activity": None, "session_id": session_id}
+        return {
+            "message_count": meta.get("message_count", 0),
+            "first_activity": meta.get("first_activity"),
+            "last_activity": meta.get("last_activity"),
+            "routes": meta.get("routes", {}),
+            "session_id": session_id
+        }
+
     def save_conversation(self, thread_id: str, question: str, answer: str, route: str) -> bool:
         """Save conversation to MongoDB chat history."""
         try:
-            chat_history = self._get_chat_history(thread_id)
-            if not chat_history:
+            collection = self._get_collection()
+            if collection is None:
                 return False
-            
-            chat_history.add_user_message(question)
-            chat_history.add_ai_message(answer)
+
+            documents = self._turn_documents(thread_id, question, answer)
+            collection.insert_many(documents)
+            self._get_meta_collection().bulk_write(self._meta_updates([(thread_id, route, documents[0]["timestamp"])]))
             return True
-            
+
+        except Exception as e:
+            logger.error(f"Failed to save conversation: {e}")
+            return False
+
+    async def asave_conversation(self, thread_id: str, question: str, answer: str, route: str) -> bool:
+        """Save conversation to MongoDB chat history without blocking the event loop."""
+        try:
+            collection = self._get_async_collection()
+            if collection is None:
+                return False
+
+            documents = self._turn_documents(thread_id, question, answer)
+            await collection.insert_many(documents)
+            await self._get_async_meta_collection().bulk_write(
+                self._meta_updates([(thread_id, route, documents[0]["timestamp"])])
+            )
+            return True
+
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
             return False
-    
+
+    # Write-behind queue
+
+    def start_writer(self):
+        """Start the background flush task on the running event loop."""
+        if not self._validated or (self._writer_task is not None and not self._writer_task.done()):
+            return
+        self._queue = asyncio.Queue(maxsize=settings.MEMORY_WRITE_QUEUE_MAX)
+        self._writer_task = asyncio.get_running_loop().create_task(self._writer_loop())
+        logger.info("Memory write-behind queue started")
+
+    def enqueue_conversation(self, thread_id: str, question: str, answer: str, route: str) -> bool:
+        """Queue a turn for background persistence; never waits on MongoDB."""
+        if not self._validated:
+            return False
+        if self._writer_task is None or self._writer_task.done():
+            self.start_writer()
+
+        try:
+            self._queue.put_nowait((thread_id, question, answer, route, datetime.now(timezone.utc),
+                                    self._clear_generation.get(thread_id, 0)))
+            self._write_stats["queued"] += 1
+            return True
+        except asyncio.QueueFull:
+            self._write_stats["dropped"] += 1
+            logger.error(f"Memory write queue full, dropping turn for thread {thread_id}")
+            return False
+
+    async def _next_batch(self) -> List[Tuple[str, str, str, str, datetime, int]]:
+        """Wait for one turn, then collect more until the batch is full or the flush interval passes."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.MEMORY_WRITE_FLUSH_INTERVAL
+        while len(batch) < settings.MEMORY_WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _insert_messages(self, batch: List[Tuple[str, str, str, str, datetime]]):
+        """Persist a batch of turns in one ordered ``insert_many``."""
+        documents = []
+        for thread_id, question, answer, route, timestamp in batch:
+            documents.extend(self._turn_documents(thread_id, question, answer, timestamp))
+        with track("mongodb", "insert_messages"):
+            await self._get_async_collection().insert_many(documents)
+
+    async def _update_metadata(self, batch: List[Tuple[str, str, str, str, datetime]]):
+        """Apply the batch to the per-session metadata documents, one upsert per session."""
+        updates = self._meta_updates([(thread_id, route, timestamp) for thread_id, _, _, route, timestamp in batch])
+        with track("mongodb", "update_metadata"):
+            await self._get_async_meta_collection().bulk_write(updates, ordered=False)
+
+    async def _write_step(self, step, batch: List[Tuple[str, str, str, str, datetime]], what: str, deadline: float) -> bool:
+        """Run one write step, retrying with exponential backoff; False once it gives up."""
+        for attempt in range(settings.MEMORY_WRITE_MAX_RETRIES + 1):
+            try:
+                await step(batch)
+                return True
+            except Exception as e:
+                delay = min(settings.MEMORY_WRITE_RETRY_BASE_DELAY * 2 ** attempt, 30.0)
+                give_up_at = min(deadline, self._drain_deadline or deadline)
+                if attempt == settings.MEMORY_WRITE_MAX_RETRIES or time.monotonic() + delay > give_up_at:
+                    logger.error(f"Failed to {what} for {len(batch)} turns after {attempt + 1} attempts: {e}")
+                    return False
+                self._write_stats["retries"] += 1
+                logger.warning(f"Failed to {what} for {len(batch)} turns, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _flush(self, batch: List[Tuple[str, str, str, str, datetime]]):
+        """Write a batch: messages first, then the session metadata, each step retried on its own.
+
+        A metadata failure never re-inserts messages that were already
+        written; those turns count as ``written`` and ``meta_failed``, not
+        ``dropped``. All retries of a batch fit in ``MEMORY_WRITE_DRAIN_TIMEOUT``
+        (and in the drain deadline during shutdown).
+        """
+        deadline = time.monotonic() + settings.MEMORY_WRITE_DRAIN_TIMEOUT
+        try:
+            saved = await self._write_step(self._insert_messages, batch, "save messages", deadline)
+        except asyncio.CancelledError:
+            self._write_stats["dropped"] += len(batch)
+            logger.error(f"Memory writer stopped while saving {len(batch)} turns, they are lost")
+            raise
+        if not saved:
+            self._write_stats["dropped"] += len(batch)
+            return
+        self._write_stats["written"] += len(batch)
+        self._write_stats["batches"] += 1
+
+        try:
+            updated = await self._write_step(self._update_metadata, batch, "update session metadata", deadline)
+        except asyncio.CancelledError:
+            self._write_stats["meta_failed"] += len(batch)
+            raise
+        if not updated:
+            self._write_stats["meta_failed"] += len(batch)
+
+    async def _writer_loop(self):
+        while True:
+            batch = await self._next_batch()
+            live = [turn[:5] for turn in batch if turn[5] == self._clear_generation.get(turn[0], 0)]
+            self._write_stats["discarded"] += len(batch) - len(live)
+            flushed = asyncio.Event()
+            self._flushing = ({thread_id for thread_id, *_ in live}, flushed)
+            try:
+                if live:
+                    await self._flush(live)
+            finally:
+                self._flushing = None
+                flushed.set()
+                for _ in batch:
+                    self._queue.task_done()
+                # No turn enqueued before a clear is left, so the generations can start over
+                if self._queue.empty():
+                    self._clear_generation.clear()
+
+    async def _discard_queued(self, session_id: str):
+        """Skip the session's queued turns and wait out a batch writing some of them, before a clear."""
+        if self._queue is None:
+            return
+        self._clear_generation[session_id] = self._clear_generation.get(session_id, 0) + 1
+        flushing = self._flushing
+        if flushing is not None and session_id in flushing[0]:
+            await flushing[1].wait()
+
+    async def drain(self, timeout: float = 10.0):
+        """Flush queued turns and stop the writer; turns still pending after ``timeout`` are lost."""
+        if self._writer_task is None:
+            return
+        self._drain_deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self._write_stats["dropped"] += self._queue.qsize()
+            logger.error(f"Memory write queue not drained within {timeout}s, {self._queue.qsize()} turns lost")
+        # A batch still being written is counted by _flush when cancelled
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_task = None
+        self._drain_deadline = None
+        logger.info("Memory write-behind queue drained")
+
+    def get_write_stats(self) -> dict:
+        """Get write-behind queue statistics."""
+        return {
+            "running": self._writer_task is not None and not self._writer_task.done(),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            **self._write_stats,
+        }
+
     def get_messages_for_langchain(self, session_id: str) -> List[BaseMessage]:
         """Get messages in LangChain format."""
         try:
-            chat_history = self._get_chat_history(session_id)
-            return chat_history.messages if chat_history else []
+            collection = self._get_collection()
+            if collection is None:
+                return []
+
+            cursor = collection.find({"SessionId": session_id}, {"History": 1, "_id": 0}).sort(_OLDEST_FIRST)
+            return messages_from_dict([json.loads(doc["History"]) for doc in cursor])
         except Exception as e:
             logger.error(f"Failed to get messages: {e}")
             return []
-    
+
+    async def aget_messages_for_langchain(self, session_id: str) -> List[BaseMessage]:
+        """Get messages in LangChain format without blocking the event loop."""
+        try:
+            collection = self._get_async_collection()
+            if collection is None:
+                return []
+
+            async with self._bulkhead.slot():
+                cursor = collection.find({"SessionId": session_id}, {"History": 1, "_id": 0}).sort(_OLDEST_FIRST)
+                return messages_from_dict([json.loads(doc["History"]) async for doc in cursor])
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get messages: {e}")
+            return []
+
+    async def aget_recent_messages(self, session_id: str, limit: int) -> List[BaseMessage]:
+        """Get the last ``limit`` messages, oldest first, reading only those documents."""
+        try:
+            collection = self._get_async_collection()
+            if collection is None or limit <= 0:
+                return []
+
+            async with self._bulkhead.slot():
+                with track("mongodb", "recent_messages"):
+                    cursor = collection.find({"SessionId": session_id}, {"History": 1, "_id": 0}).sort(_NEWEST_FIRST).limit(limit)
+                    items = [json.loads(doc["History"]) async for doc in cursor]
+            return messages_from_dict(items[::-1])
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get recent messages: {e}")
+            return []
+
     def clear_session_history(self, session_id: str) -> bool:
         """Clear chat history for a session."""
         try:
-            chat_history = self._get_chat_history(session_id)
-            if chat_history:
-                chat_history.clear()
-                return True
+            collection = self._get_collection()
+            if collection is None:
+                return False
+
+            collection.delete_many({"SessionId": session_id})
+            self._get_meta_collection().delete_one({"_id": session_id})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to clear session: {e}")
             return False
+
+    async def aclear_session_history(self, session_id: str) -> bool:
+        """Clear chat history for a session without blocking the event loop."""
+        try:
+            collection = self._get_async_collection()
+            if collection is None:
+                return False
+
+            # Turns still in the write-behind queue would bring the session back after the delete
+            await self._discard_queued(session_id)
+            await collection.delete_many({"SessionId": session_id})
+            await self._get_async_meta_collection().delete_one({"_id": session_id})
+            return True
         except Exception as e:
             logger.error(f"Failed to clear session: {e}")
             return False
-    
+
     def get_session_summary(self, session_id: str) -> Dict:
-        """Get session summary."""
+        """Get session summary from its metadata document."""
         try:
-            chat_history = self._get_chat_history(session_id)
-            if not chat_history:
+            collection = self._get_meta_collection()
+            if collection is None:
                 return {"message_count": 0, "last_activity": None}
-            
-            messages = chat_history.messages
-            return {
-                "message_count": len(messages),
-                "last_activity": datetime.utcnow() if messages else None,
-                "session_id": session_id
-            }
+
+            return self._summary(session_id, collection.find_one({"_id": session_id}))
         except Exception as e:
             logger.error(f"Failed to get session summary: {e}")
             return {"message_count": 0, "last_activity": None}
 
+    async def aget_session_summary(self, session_id: str) -> Dict:
+        """Get session summary from its metadata document without blocking the event loop."""
+        try:
+            collection = self._get_async_meta_collection()
+            if collection is None:
+                return {"message_count": 0, "last_activity": None}
+
+            async with self._bulkhead.slot():
+                meta = await collection.find_one({"_id": session_id})
+            return self._summary(session_id, meta)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get session summary: {e}")
+            return {"message_count": 0, "last_activity": None}
+
+    async def close(self):
+        """Drain the write queue and close the shared MongoDB clients."""
+        await self.drain(settings.MEMORY_WRITE_DRAIN_TIMEOUT)
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._validated = False
+
 # Global service instance
 memory_service = MemoryService()
@@ -1,30 +1,72 @@
+import asyncio
+import hashlib
 import logging
-from typing import Dict
-from ..utils.nodes import build_graph
-from langchain_core.messages import HumanMessage, AIMessage
-from ..schemas.chat import ChatRequest, ChatResponse
+import time
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional
+from langchain_core.messages import AIMessage
+from ..schemas.chat import ChatRequest, ChatResponse, BatchChatItem
 from .redis_checkpointer import redis_checkpointer
 from .redis_cache_service import redis_cache_service
 from .memory_service import memory_service
+from .session_service import session_hydrator
+from .semantic_cache_service import semantic_cache_service, normalize_question
+from ..core.config import settings
+from ..factories import models
+from ..utils.admission import Overloaded, admission_scope, bulkheads
+from ..utils.coalescing import SingleFlight
+from ..utils.metrics import metrics, observe_request, request_timings, stats_samples
+from ..utils.tracing import TraceRecorder
 
 logger = logging.getLogger(__name__)
 
+metrics.enabled = settings.METRICS_ENABLED
+
+def _load_nodes():
+    """Import the graph nodes, which builds the models they use (blocking)."""
+    from ..utils import nodes
+    return nodes
+
+
 class RAGService:
     def __init__(self):
         self.graph = None
         self._graph_initialized = False
+        self._warmup = {"state": "pending"}
+        # Sampled requests recorded for offline replay (benchmarks.replay)
+        self.trace_recorder = TraceRecorder(settings.TRACE_RECORD_PATH, settings.TRACE_SAMPLE_RATE, settings.TRACE_MAX_BYTES)
+        # Concurrent duplicates of a question wait for one pipeline run
+        self.inflight = SingleFlight(enabled=settings.COALESCE_ENABLED)
 
-        redis_cache_service.initialize_llm_cache()
-        self._initialize_graph()
+    async def initialize(self):
+        """Warm up models, stores, caches and the graph concurrently on the running event loop."""
+        self._warmup = {"state": "running"}
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(
+                models.resources.warm_up(),
+                asyncio.to_thread(redis_cache_service.initialize_llm_cache),
+                asyncio.to_thread(memory_service.connect),
+                self._initialize_graph(),
+            )
+            memory_service.start_writer()
+            self._warmup = {"state": "done", "seconds": round(time.perf_counter() - start, 3)}
+            logger.info(f"Warm-up completed in {self._warmup['seconds']}s")
+        except Exception as e:
+            self._warmup = {"state": "failed", "error": str(e)}
+            raise
         
-    def _initialize_graph(self):
-        """Initialize graph with Redis checkpointer."""
+    async def _initialize_graph(self):
+        """Initialize graph with async Redis checkpointer."""
         if self._graph_initialized:
             return
             
         try:
-            checkpointer = redis_checkpointer.get_checkpointer()
-            self.graph = build_graph().compile(checkpointer=checkpointer)
+            checkpointer, nodes = await asyncio.gather(
+                redis_checkpointer.aget_checkpointer(),
+                asyncio.to_thread(_load_nodes),
+            )
+            self.graph = nodes.build_graph().compile(checkpointer=checkpointer)
             self._graph_initialized = True
             logger.info("Graph initialized successfully")
             
@@ -33,40 +75,134 @@ class RAGService:
             self._graph_initialized = False
             raise RuntimeError(f"Cannot initialize RAG service: {e}") from e
     
-    def process_question(self, request: ChatRequest) -> ChatResponse:
-        """Process question through RAG pipeline."""
+    async def _condense(self, request: ChatRequest, graph_input: dict) -> str:
+        """Rewrite the question to stand on its own and put it in the graph input."""
+        from ..utils.nodes import question_condenser
+        
+        history = session_hydrator.recent_history(request.thread_id, graph_input)
+        standalone = await question_condenser.condense(request.thread_id, request.question, history)
+        graph_input["standalone_question"] = standalone
+        return standalone
+    
+    def _mark_turn(self, request: ChatRequest, graph_input: dict, answer: Optional[str]):
+        """Refresh the hydrator's view of the thread after a turn answered outside ``ainvoke``."""
+        messages = session_hydrator.recent_history(request.thread_id, graph_input) + [graph_input["messages"][-1]]
+        if answer:
+            messages.append(AIMessage(content=answer))
+        session_hydrator.mark_has_state(request.thread_id, messages)
+    
+    async def _record_cached_answer(self, request: ChatRequest, config: dict, graph_input: dict, entry: dict) -> bool:
+        """Record a cache-served turn in the thread state and chat history, as if the graph had answered it.
+        
+        Returns False, recording nothing, when the route has no answer node to
+        record it as (``unknown`` from a run that ended without one).
+        """
+        from ..utils.nodes import ANSWER_NODE_BY_ROUTE
+        
+        answer_node = ANSWER_NODE_BY_ROUTE.get(entry["route"])
+        if answer_node is None:
+            return False
+        await self.graph.aupdate_state(
+            config,
+            {
+                **graph_input,
+                "messages": graph_input["messages"] + [AIMessage(content=entry["answer"])],
+                "route": entry["route"],
+                "answer": entry["answer"]
+            },
+            as_node=answer_node
+        )
+        self._mark_turn(request, graph_input, entry["answer"])
+        memory_service.enqueue_conversation(request.thread_id, request.question, entry["answer"], entry["route"])
+        return True
+    
+    async def process_question(self, request: ChatRequest) -> ChatResponse:
+        """Process question through RAG pipeline; raises ``Overloaded`` when a backend sheds the request."""
+        start = time.perf_counter()
+        with request_timings() as timings, self.trace_recorder.record(request.thread_id, request.question) as trace, \
+                admission_scope():
+            try:
+                response = await self._answer(request)
+            except Overloaded:
+                observe_request("overloaded", time.perf_counter() - start)
+                if trace is not None:
+                    trace.route = "overloaded"
+                raise
+            if trace is not None:
+                trace.route = response.route
+        elapsed = time.perf_counter() - start
+        observe_request(response.route, elapsed)
+        
+        if request.include_timings:
+            response.timings = {key: round(1000 * seconds, 3) for key, seconds in timings.items()}
+            response.timings["total"] = round(1000 * elapsed, 3)
+        return response
+    
+    def _history_key(self, request: ChatRequest, graph_input: dict) -> str:
+        """Digest of the conversation before this turn, which history-dependent (general) answers rely on."""
+        digest = hashlib.sha256()
+        for message in session_hydrator.recent_history(request.thread_id, graph_input):
+            digest.update(f"{message.type}:{message.content}\x00".encode("utf-8"))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _cacheable(route: str, sql_result: Optional[str]) -> bool:
+        """Answers written from a failed SQL run (pool timeout, bad query) must not be served to others."""
+        return not (route == "sql" and str(sql_result or "").startswith("Error:"))
+    
+    async def _generate(self, request: ChatRequest, config: dict, graph_input: dict, question: str,
+                        history_key: str) -> dict:
+        """Answer from the semantic cache or the graph and record the turn on the request's thread."""
+        cached, embedding = await semantic_cache_service.lookup(question)
+        if cached:
+            await self._record_cached_answer(request, config, graph_input, cached)
+            return {"answer": cached["answer"], "route": cached["route"], "history_key": history_key}
+        
+        result = await self.graph.ainvoke(graph_input, config=config)
+        session_hydrator.mark_has_state(request.thread_id, result.get("messages"))
+        
+        answer = result.get("answer", "Sorry, I couldn't process your question.")
+        route = result.get("route", "unknown")
+        
+        if not answer and result.get("messages"):
+            ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
+            if ai_messages:
+                answer = ai_messages[-1].content
+        
+        if self._cacheable(route, result.get("result")):
+            semantic_cache_service.store(embedding, question, answer, route)
+        return {"answer": answer, "route": route, "history_key": history_key}
+    
+    async def _answer(self, request: ChatRequest) -> ChatResponse:
+        """Answer from the semantic cache or the graph; errors become an apology with route ``error``.
+        
+        Concurrent requests with the same normalized standalone question share
+        one run. Its answer is recorded on each thread like a cache hit, unless
+        the route depends on chat history (not a semantic cache route) and this
+        thread's history differs; then the question runs again, shared only
+        with requests that have the same history.
+        """
         try:
             if not self._graph_initialized:
                 raise RuntimeError("Graph not initialized")
             
             config = {"configurable": {"thread_id": request.thread_id}}
-            current_state = self.graph.get_state(config)
+            graph_input = await session_hydrator.build_input(request.thread_id, request.question)
+            question = await self._condense(request, graph_input)
+            history_key = self._history_key(request, graph_input)
             
-            if current_state and current_state.values.get("messages"):
-                graph_input = {
-                    "messages": [HumanMessage(content=request.question)],
-                    "thread_id": request.thread_id
-                }
-            else:
-                chat_history = memory_service.get_messages_for_langchain(request.thread_id)[-10:]
-                all_messages = chat_history + [HumanMessage(content=request.question)]
-                graph_input = {
-                    "messages": all_messages,
-                    "thread_id": request.thread_id
-                }
-            
-            result = self.graph.invoke(graph_input, config=config)
-            
-            answer = result.get("answer", "Sorry, I couldn't process your question.")
-            route = result.get("route", "unknown")
-            
-            if not answer and result.get("messages"):
-                ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
-                if ai_messages:
-                    answer = ai_messages[-1].content
-            
-            return ChatResponse(answer=answer, route=route)
+            generate = partial(self._generate, request, config, graph_input, question, history_key)
+            key = normalize_question(question)
+            entry, shared = await self.inflight.run(key, generate)
+            if shared and entry["route"] not in semantic_cache_service.routes and entry["history_key"] != history_key:
+                entry, shared = await self.inflight.run((key, history_key), generate)
+            if shared and not await self._record_cached_answer(request, config, graph_input, entry):
+                # The shared run can't be recorded on this thread; answer it with its own run
+                entry = await generate()
+            return ChatResponse(answer=entry["answer"], route=entry["route"])
             
+        except Overloaded:
+            raise
         except RuntimeError as e:
             logger.error(f"Service unavailable: {e}")
             return ChatResponse(
@@ -80,74 +216,243 @@ class RAGService:
                 route="error"
             )
     
-    def get_conversation_state(self, thread_id: str) -> dict:
+    async def _prewarm_embeddings(self, questions: List[str]):
+        """Embed every distinct question form used downstream in a few batched provider calls.
+
+        The semantic cache embeds the normalized question; the router's
+        embedding tier and the retriever embed the raw one. Afterwards those
+        lookups are served from the embedding cache. Skipped before warm-up so
+        the embedder is never built on the event loop.
+        """
+        embedder = models.resources.peek("embedder")
+        if not self._graph_initialized or embedder is None:
+            return
+        texts = list(dict.fromkeys(
+            text for question in questions for text in (question, normalize_question(question))
+        ))
+        size = settings.BATCH_EMBED_SIZE
+        try:
+            await asyncio.gather(*(
+                embedder.aembed_queries(texts[i:i + size]) for i in range(0, len(texts), size)
+            ))
+        except Exception as e:
+            logger.warning(f"Batch embedding prewarm failed, falling back to per-question calls: {e}")
+    
+    async def process_batch(self, requests: List[ChatRequest], max_concurrency: Optional[int] = None) -> List[BatchChatItem]:
+        """Process many questions concurrently; results come back in request order.
+        
+        Questions on the same thread run one after another in request order so
+        each sees the previous turn; distinct threads run in parallel, at most
+        ``max_concurrency`` at a time. Questions shed by a backend come back
+        with route ``overloaded`` instead of failing the batch.
+        """
+        await self._prewarm_embeddings([request.question for request in requests])
+        
+        semaphore = asyncio.Semaphore(max_concurrency or settings.BATCH_MAX_CONCURRENCY)
+        results: List[Optional[BatchChatItem]] = [None] * len(requests)
+        threads: Dict[str, List[int]] = {}
+        for index, request in enumerate(requests):
+            threads.setdefault(request.thread_id, []).append(index)
+        
+        async def _run_thread(indices: List[int]):
+            for index in indices:
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await self.process_question(requests[index])
+                    except Overloaded as e:
+                        response = ChatResponse(answer=f"Service busy ({e}). Please retry later.", route="overloaded")
+                    results[index] = BatchChatItem(
+                        **response.model_dump(),
+                        thread_id=requests[index].thread_id,
+                        elapsed_ms=round(1000 * (time.perf_counter() - start), 2)
+                    )
+        
+        await asyncio.gather(*(_run_thread(indices) for indices in threads.values()))
+        return results
+    
+    async def stream_question(self, request: ChatRequest) -> AsyncIterator[Dict]:
+        """Stream pipeline progress and answer tokens as they are produced.
+        
+        Yields ``{"event": ..., "data": ...}`` dicts: ``route``, ``sql``,
+        ``documents`` and ``token`` while the graph runs, then a final
+        ``done`` (or ``error``) carrying the same fields as ``ChatResponse``.
+        """
+        try:
+            if not self._graph_initialized:
+                raise RuntimeError("Graph not initialized")
+            
+            from ..utils.nodes import ANSWER_NODES, HYBRID_RETRIEVER_TAG
+            
+            config = {"configurable": {"thread_id": request.thread_id}}
+            graph_input = await session_hydrator.build_input(request.thread_id, request.question)
+            question = await self._condense(request, graph_input)
+            
+            cached, embedding = await semantic_cache_service.lookup(question)
+            if cached:
+                await self._record_cached_answer(request, config, graph_input, cached)
+                yield {"event": "route", "data": {"route": cached["route"]}}
+                yield {"event": "token", "data": {"text": cached["answer"]}}
+                yield {"event": "done", "data": {"answer": cached["answer"], "route": cached["route"]}}
+                return
+            
+            route = "unknown"
+            answer = None
+            sql_result = None
+            start = time.perf_counter()
+            
+            async for event in self.graph.astream_events(graph_input, config=config, version="v2"):
+                kind = event["event"]
+                name = event["name"]
+                node = event.get("metadata", {}).get("langgraph_node")
+                
+                if kind == "on_chat_model_stream" and node in ANSWER_NODES:
+                    token = event["data"]["chunk"].content
+                    if token:
+                        yield {"event": "token", "data": {"text": token}}
+                elif kind == "on_retriever_end" and HYBRID_RETRIEVER_TAG in event.get("tags", []):
+                    documents = event["data"].get("output") or []
+                    yield {"event": "documents", "data": {"documents": [doc.metadata for doc in documents]}}
+                elif kind == "on_chain_end" and name == node == "router":
+                    route = event["data"]["output"]["route"]
+                    yield {"event": "route", "data": {"route": route}}
+                elif kind == "on_chain_end" and name == node == "write_query":
+                    yield {"event": "sql", "data": {"query": event["data"]["output"]["query"]}}
+                elif kind == "on_chain_end" and name == node == "execute_query":
+                    sql_result = event["data"]["output"]["result"]
+                elif kind == "on_chain_end" and name == node and node in ANSWER_NODES:
+                    answer = event["data"]["output"]["answer"]
+            
+            self._mark_turn(request, graph_input, answer)
+            if self._cacheable(route, sql_result):
+                semantic_cache_service.store(embedding, question, answer, route)
+            observe_request(route, time.perf_counter() - start)
+            yield {"event": "done", "data": {
+                "answer": answer or "Sorry, I couldn't process your question.",
+                "route": route
+            }}
+            
+        except Overloaded as e:
+            logger.warning(f"Stream shed: {e}")
+            yield {"event": "error", "data": {
+                "answer": "Service busy. Please retry later.",
+                "route": "overloaded",
+                "status": e.status_code,
+                "retry_after": e.retry_after
+            }}
+        except RuntimeError as e:
+            logger.error(f"Service unavailable: {e}")
+            yield {"event": "error", "data": {
+                "answer": "Service temporarily unavailable. Please try again.",
+                "route": "error"
+            }}
+        except Exception as e:
+            logger.error(f"Error streaming question: {e}")
+            yield {"event": "error", "data": {
+                "answer": "Sorry, something went wrong. Please try again.",
+                "route": "error"
+            }}
+    
+    async def get_conversation_state(self, thread_id: str) -> dict:
         """Get conversation state from Redis."""
         try:
             if not self._graph_initialized:
                 raise RuntimeError("Graph not initialized")
             
             config = {"configurable": {"thread_id": thread_id}}
-            state = self.graph.get_state(config)
+            state = await self.graph.aget_state(config)
             return state.values if state else {}
             
         except Exception as e:
             logger.error(f"Error getting state: {e}")
             raise RuntimeError(f"Cannot retrieve conversation state: {e}") from e
     
-    def clear_conversation_state(self, thread_id: str) -> bool:
+    async def clear_conversation_state(self, thread_id: str) -> bool:
         """Clear conversation state."""
         try:
             if not self._graph_initialized:
                 raise RuntimeError("Graph not initialized")
             
-            config = {"configurable": {"thread_id": thread_id}}
-            current_state = self.graph.get_state(config)
+            from ..utils.nodes import context_summarizer
+            
             redis_cleared = False
+            # A fold of the old conversation must not become the new one's summary
+            context_summarizer.forget(thread_id)
             
-            if current_state:
+            if await session_hydrator.has_state(thread_id):
+                session_hydrator.forget(thread_id)
                 checkpointer = redis_checkpointer.get_checkpointer()
-                if hasattr(checkpointer, 'delete'):
-                    checkpointer.delete(config)
+                try:
+                    await checkpointer.adelete_thread(thread_id)
                     redis_cleared = True
+                except NotImplementedError:
+                    logger.warning("Checkpointer does not support thread deletion")
             
-            mongo_cleared = memory_service.clear_session_history(thread_id)
+            mongo_cleared = await memory_service.aclear_session_history(thread_id)
             return redis_cleared or mongo_cleared
             
         except Exception as e:
             logger.error(f"Error clearing state: {e}")
             return False
     
-    def get_session_info(self, thread_id: str) -> dict:
+    async def get_session_info(self, thread_id: str) -> dict:
         """Get session information."""
         try:
-            summary = memory_service.get_session_summary(thread_id)
-            state = self.get_conversation_state(thread_id)
+            summary = await memory_service.aget_session_summary(thread_id)
             
             return {
                 "thread_id": thread_id,
                 "message_count": summary.get("message_count", 0),
+                "first_activity": summary.get("first_activity"),
                 "last_activity": summary.get("last_activity"),
-                "has_state": bool(state)
+                "routes": summary.get("routes", {}),
+                "has_state": await session_hydrator.has_state(thread_id)
             }
         except Exception as e:
             logger.error(f"Error getting session info: {e}")
             return {"thread_id": thread_id, "error": str(e)}
 
+    def readiness(self) -> dict:
+        """Whether warm-up finished and requests can be served; never builds anything."""
+        return {
+            "ready": self._graph_initialized,
+            "warmup": dict(self._warmup),
+            "resources": models.resources.get_status(),
+        }
+
     def health_check(self) -> dict:
         """Check service health."""
+        if not self._graph_initialized and self._warmup["state"] in ("pending", "running"):
+            # Liveness answers while warm-up is still running
+            return {"status": "starting", "graph_initialized": False, **self.readiness()}
+        
         try:
             redis_checkpointer.get_checkpointer()
             
             if not self._graph_initialized:
                 raise RuntimeError("Graph not initialized")
 
+            from ..utils.nodes import tiered_router, context_summarizer, question_condenser, speculative_retriever
+            
             cache_stats = redis_cache_service.get_cache_stats()
 
             return {
                 "status": "healthy",
                 "redis_connected": True,
                 "graph_initialized": True,
-                "llm_cache": cache_stats
+                "llm_cache": cache_stats,
+                "semantic_cache": semantic_cache_service.get_cache_stats(),
+                "embedding_cache": models.embedder.get_cache_stats(),
+                "sql_result_cache": models.sql_executor.get_cache_stats(),
+                "router": tiered_router.get_stats(),
+                "sessions": session_hydrator.get_stats(),
+                "context_summaries": context_summarizer.get_stats(),
+                "question_condenser": question_condenser.get_stats(),
+                "speculative_retrieval": speculative_retriever.get_stats(),
+                "memory_writes": memory_service.get_write_stats(),
+                "trace_recording": self.trace_recorder.get_stats(),
+                "admission": {name: bulkhead.get_stats() for name, bulkhead in bulkheads.items()},
+                "coalescing": self.inflight.get_stats()
             }
             
         except Exception as e:
@@ -156,8 +461,51 @@ class RAGService:
                 "status": "unhealthy",
                 "redis_connected": False,
                 "graph_initialized": self._graph_initialized,
+                "warmup": dict(self._warmup),
                 "error": str(e)
             }
 
+    def collect_metrics(self):
+        """Cache, router and queue counters for /metrics, read from the components' stats at scrape time."""
+        families = [
+            ("rag_semantic_cache_events_total", "counter", "Semantic answer cache lookups and maintenance",
+             stats_samples(semantic_cache_service.get_cache_stats(), ("hits", "misses", "stores", "evictions", "expirations", "errors"))),
+            ("rag_session_events_total", "counter", "Checkpoint existence checks and MongoDB hydrations",
+             stats_samples(session_hydrator.get_stats(), ("state_cache_hits", "state_checks", "hydrations"))),
+            ("rag_memory_write_events_total", "counter", "Chat history write-behind queue",
+             stats_samples(memory_service.get_write_stats(), ("queued", "written", "batches", "retries", "dropped", "meta_failed", "discarded"))),
+            ("rag_memory_write_pending", "gauge", "Turns waiting in the write-behind queue",
+             [({}, memory_service.get_write_stats()["pending"])]),
+            ("rag_coalescing_events_total", "counter", "Requests that ran the pipeline (leaders) or shared an in-flight run",
+             stats_samples(self.inflight.get_stats(), ("leaders", "coalesced", "leader_cancelled"))),
+        ]
+        
+        # Only components that are already built; scraping never triggers warm-up
+        embedder = models.resources.peek("embedder")
+        if embedder is not None:
+            families.append(("rag_embedding_cache_events_total", "counter", "Embedding cache lookups",
+                             stats_samples(embedder.get_cache_stats(), ("memory_hits", "redis_hits", "misses", "redis_errors"))))
+        sql_executor = models.resources.peek("sql_executor")
+        if sql_executor is not None:
+            families.append(("rag_sql_result_cache_events_total", "counter", "Generated-SQL result cache and execution outcomes",
+                             stats_samples(sql_executor.get_cache_stats(), ("hits", "misses", "errors", "timeouts", "truncated"))))
+        
+        if self._graph_initialized:
+            from ..utils.nodes import tiered_router, question_condenser, context_summarizer, speculative_retriever
+            
+            router_stats = tiered_router.get_stats()
+            families += [
+                ("rag_router_decisions_total", "counter", "Routing decisions by tier",
+                 [({"tier": tier}, values["decisions"]) for tier, values in router_stats.items() if isinstance(values, dict)]),
+                ("rag_question_condenser_events_total", "counter", "Follow-up condensation outcomes",
+                 stats_samples(question_condenser.get_stats(), ("skipped", "hits", "rewrites", "failed"))),
+                ("rag_context_summary_events_total", "counter", "Background conversation summaries",
+                 stats_samples(context_summarizer.get_stats(), ("scheduled", "completed", "failed", "stale", "skipped", "evicted"))),
+                ("rag_speculative_retrieval_events_total", "counter", "Retrievals started while the LLM router runs",
+                 stats_samples(speculative_retriever.get_stats(), ("started", "used", "cancelled", "failed"))),
+            ]
+        return families
+
 # Global service instance
 rag_service = RAGService()
+metrics.add_collector(rag_service.collect_metrics)
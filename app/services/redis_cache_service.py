@@ -1,7 +1,5 @@
 import logging
 import redis
-from langchain.globals import set_llm_cache
-from langchain_community.cache import RedisCache
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -18,6 +16,9 @@ class RedisCacheService:
         if self._cache_initialized:
             return
         
+        from langchain.globals import set_llm_cache
+        from langchain_community.cache import RedisCache
+        
         try:
             # Create Redis client for LLM caching - use default DB (0)
             self._redis_client = redis.Redis(
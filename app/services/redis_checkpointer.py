@@ -1,65 +1,92 @@
+import asyncio
+import importlib
 import logging
-from typing import Optional
-from langgraph.checkpoint.redis import RedisSaver
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Optional
 from ..core.config import settings
+from ..utils.metrics import timed_async
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.redis.aio import AsyncRedisSaver
 
 logger = logging.getLogger(__name__)
 
 class RedisCheckpointer:
-    """Production Redis checkpointer with proper setup."""
-    
+    """Production async Redis checkpointer with proper setup."""
+
     def __init__(self):
-        self._checkpointer: Optional[RedisSaver] = None
+        self._checkpointer: Optional["AsyncRedisSaver"] = None
+        self._exit_stack: Optional[AsyncExitStack] = None
         self._connection_string = None
         self._initialized = False
-    
+
     def _build_connection_string(self) -> str:
         """Build Redis connection string from individual parameters."""
         return f"redis://{settings.REDIS_USERNAME}:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
-    
-    def get_checkpointer(self) -> RedisSaver:
-        """Get Redis checkpointer with proper setup."""
+
+    def get_checkpointer(self) -> "AsyncRedisSaver":
+        """Get the already initialized Redis checkpointer."""
+        if self._checkpointer is None:
+            raise RuntimeError("Redis checkpointer not initialized")
+        return self._checkpointer
+
+    async def aget_checkpointer(self) -> "AsyncRedisSaver":
+        """Get Redis checkpointer, initializing it on the running event loop."""
         if self._checkpointer is not None:
             return self._checkpointer
-        
+
         if self._initialized:
             raise RuntimeError("Redis checkpointer initialization failed previously")
-        
-        return self._initialize_checkpointer()
-    
-    def _initialize_checkpointer(self) -> RedisSaver:
-        """Initialize Redis checkpointer with proper setup pattern."""
+
+        return await self._initialize_checkpointer()
+
+    async def _initialize_checkpointer(self) -> "AsyncRedisSaver":
+        """Initialize async Redis checkpointer with proper setup pattern."""
         self._initialized = True
-        
+
         try:
             logger.info("Initializing Redis checkpointer...")
-            
+
+            # Imported at warm-up, off the event loop: langgraph/redisvl take a few hundred ms to import
+            saver = await asyncio.to_thread(importlib.import_module, "langgraph.checkpoint.redis.aio")
+
             # Build connection string
             self._connection_string = self._build_connection_string()
-            
-            # Initialize checkpointer with proper 
+
+            # Initialize checkpointer with proper
             ttl_config = {
                 "default_ttl": 720,     # Default TTL in minutes
                 "refresh_on_read": True,  # Refresh TTL when checkpoint is read
                 }
 
-            checkpointer = None
-            with RedisSaver.from_conn_string(self._connection_string, ttl=ttl_config) as _checkpointer:
-                _checkpointer.setup()
-                checkpointer = _checkpointer
-            
-            self._checkpointer = checkpointer
+            # Keep the saver's context open for the lifetime of the app;
+            # entering it creates the indexes and exiting it closes the client.
+            exit_stack = AsyncExitStack()
+            self._checkpointer = await exit_stack.enter_async_context(
+                saver.AsyncRedisSaver.from_conn_string(self._connection_string, ttl=ttl_config)
+            )
+            self._exit_stack = exit_stack
+
+            # Checkpoint reads and writes show up as Redis backend latency
+            for name in ("aget_tuple", "aput", "aput_writes"):
+                setattr(self._checkpointer, name, timed_async(getattr(self._checkpointer, name), "redis", f"checkpoint_{name[1:]}"))
             logger.info(f"Redis checkpointer initialized successfully")
             return self._checkpointer
-            
+
         except Exception as e:
             logger.error(f"Redis checkpointer initialization failed: {e}")
             raise RuntimeError(f"Redis checkpointer initialization failed: {e}") from e
-    
-    def close(self):
+
+    async def close(self):
         """Clean up Redis connections."""
+        if self._exit_stack is not None:
+            try:
+                await self._exit_stack.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing Redis checkpointer: {e}")
         logger.info("Redis checkpointer cleanup completed")
         self._checkpointer = None
+        self._exit_stack = None
         self._initialized = False
 
 # Global checkpointer service
@@ -0,0 +1,184 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from ..factories import models
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# Numbers and quoted phrases: "movies after 2015" and "after 2016" embed almost identically but differ in data
+_LITERALS = re.compile(r"\d+(?:[.,]\d+)*|\"[^\"]+\"|(?<!\w)'[^']+'(?!\w)")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question for embedding: lowercase, single spaces, no trailing punctuation."""
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip("?!. ")
+
+
+def question_literals(question: str) -> Tuple[str, ...]:
+    """Numeric and quoted tokens of a question, which must match exactly for a cache hit."""
+    return tuple(sorted(token.strip("\"'").lower() for token in _LITERALS.findall(question)))
+
+
+class _Namespace:
+    """Fixed-capacity embedding matrix with LRU order and per-entry expiry."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.matrix: Optional[np.ndarray] = None
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.entries: Dict[int, dict] = {}
+        self.lru: "OrderedDict[int, None]" = OrderedDict()
+
+    def _ensure_matrix(self, dim: int):
+        if self.matrix is None:
+            self.matrix = np.zeros((self.capacity, dim), dtype=np.float32)
+
+    def matches(self, embedding: np.ndarray, threshold: float) -> Iterator[Tuple[int, float]]:
+        """Slots whose cosine similarity clears ``threshold``, best first."""
+        if self.matrix is None or not self.valid.any():
+            return
+        scores = self.matrix @ embedding
+        scores[~self.valid] = -np.inf
+        candidates = np.flatnonzero(scores >= threshold)
+        for slot in candidates[np.argsort(-scores[candidates])]:
+            yield int(slot), float(scores[slot])
+
+    def touch(self, slot: int):
+        self.lru.move_to_end(slot)
+
+    def remove(self, slot: int):
+        self.valid[slot] = False
+        self.entries.pop(slot, None)
+        self.lru.pop(slot, None)
+
+    def put(self, embedding: np.ndarray, entry: dict, slot: Optional[int] = None) -> bool:
+        """Insert an entry, reusing ``slot`` if given; returns True if an LRU entry was evicted."""
+        self._ensure_matrix(embedding.shape[0])
+        evicted = False
+        if slot is None:
+            free = np.flatnonzero(~self.valid)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot, _ = self.lru.popitem(last=False)
+                evicted = True
+        self.matrix[slot] = embedding
+        self.valid[slot] = True
+        self.entries[slot] = entry
+        self.lru[slot] = None
+        self.lru.move_to_end(slot)
+        return evicted
+
+
+class SemanticCacheService:
+    """In-process semantic answer cache keyed on normalized question embeddings.
+
+    Answers are stored per route namespace; a lookup searches every namespace
+    and returns the closest entry whose cosine similarity clears the threshold
+    and whose numbers and quoted phrases equal the question's.
+    """
+
+    def __init__(self):
+        self.enabled = settings.SEMANTIC_CACHE_ENABLED
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = settings.SEMANTIC_CACHE_TTL
+        self.routes = tuple(route.strip() for route in settings.SEMANTIC_CACHE_ROUTES.split(",") if route.strip())
+        self._namespaces = {route: _Namespace(settings.SEMANTIC_CACHE_MAX_ENTRIES) for route in self.routes}
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "errors": 0}
+        self._lookup_seconds = 0.0
+
+    async def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(await models.embedder.aembed_query(normalize_question(question)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, question: str) -> Tuple[Optional[dict], Optional[np.ndarray]]:
+        """Find a cached answer for a near-duplicate question.
+
+        Returns ``(entry, embedding)``; ``entry`` is None on a miss and the
+        embedding can be handed back to ``store`` to avoid re-embedding.
+        """
+        if not self.enabled:
+            return None, None
+
+        start = time.perf_counter()
+        try:
+            embedding = await self._embed(question)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            self._stats["errors"] += 1
+            return None, None
+
+        now = time.time()
+        literals = question_literals(question)
+        best_entry, best_score = None, -1.0
+        for namespace in self._namespaces.values():
+            for slot, score in list(namespace.matches(embedding, self.threshold)):
+                entry = namespace.entries[slot]
+                if entry["expires_at"] <= now:
+                    namespace.remove(slot)
+                    self._stats["expirations"] += 1
+                    continue
+                if entry["literals"] != literals:
+                    continue
+                if score > best_score:
+                    best_entry, best_score = entry, score
+                    namespace.touch(slot)
+                break
+
+        self._stats["hits" if best_entry else "misses"] += 1
+        self._lookup_seconds += time.perf_counter() - start
+
+        if best_entry:
+            logger.info(f"Semantic cache hit ({best_entry['route']}, similarity {best_score:.3f})")
+        return best_entry, embedding
+
+    def store(self, embedding: Optional[np.ndarray], question: str, answer: str, route: str):
+        """Cache an answer under its route's namespace."""
+        namespace = self._namespaces.get(route)
+        if not self.enabled or namespace is None or embedding is None or not answer:
+            return
+
+        literals = question_literals(question)
+        entry = {
+            "question": question,
+            "answer": answer,
+            "route": route,
+            "literals": literals,
+            "expires_at": time.time() + self.ttl,
+        }
+        # Refresh a near-duplicate in place instead of adding a second copy
+        slot = next((slot for slot, _ in namespace.matches(embedding, self.threshold)
+                     if namespace.entries[slot]["literals"] == literals), None)
+        if namespace.put(embedding, entry, slot):
+            self._stats["evictions"] += 1
+        self._stats["stores"] += 1
+
+    def clear(self, route: Optional[str] = None):
+        """Drop cached answers for one route, or for all routes."""
+        for name in ([route] if route else list(self._namespaces)):
+            if name in self._namespaces:
+                self._namespaces[name] = _Namespace(settings.SEMANTIC_CACHE_MAX_ENTRIES)
+
+    def get_cache_stats(self) -> dict:
+        """Get semantic cache statistics."""
+        if not self.enabled:
+            return {"status": "disabled"}
+
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "status": "enabled",
+            "threshold": self.threshold,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "avg_lookup_ms": round(1000 * self._lookup_seconds / lookups, 3) if lookups else 0.0,
+            "entries": {route: int(ns.valid.sum()) for route, ns in self._namespaces.items()},
+        }
+
+# Global semantic cache service
+semantic_cache_service = SemanticCacheService()
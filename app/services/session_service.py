@@ -0,0 +1,101 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage
+from ..core.config import settings
+from .redis_checkpointer import redis_checkpointer
+from .memory_service import memory_service
+
+logger = logging.getLogger(__name__)
+
+class SessionHydrator:
+    """Builds graph input for a turn with as few Redis/MongoDB round trips as possible.
+
+    The graph loads the thread's checkpoint itself when it runs, so the only
+    question here is whether the thread already has state. That bit is cached
+    per worker (LRU, TTL shorter than the checkpoint TTL); on a miss one
+    ``aget_tuple`` answers it. Cold threads are seeded with the last
+    ``SESSION_HISTORY_MESSAGES`` messages from MongoDB, fetched with a sorted,
+    limited, projected query.
+
+    Alongside the bit it keeps the thread's last few messages, refreshed after
+    every turn, so a follow-up can be condensed to a standalone question
+    before the graph (and its checkpoint read) runs. With several workers the
+    tail can lag behind turns served elsewhere until the entry expires.
+    """
+
+    def __init__(self):
+        self.history_messages = settings.SESSION_HISTORY_MESSAGES
+        self.max_entries = settings.SESSION_STATE_CACHE_MAX_ENTRIES
+        self.ttl = settings.SESSION_STATE_CACHE_TTL
+        self._has_state: "OrderedDict[str, Tuple[float, List[BaseMessage]]]" = OrderedDict()
+        self._stats = {"state_cache_hits": 0, "state_checks": 0, "hydrations": 0}
+
+    def _cached_has_state(self, thread_id: str) -> bool:
+        entry = self._has_state.get(thread_id)
+        if entry is None:
+            return False
+        if entry[0] <= time.monotonic():
+            del self._has_state[thread_id]
+            return False
+        self._has_state.move_to_end(thread_id)
+        return True
+
+    def mark_has_state(self, thread_id: str, messages: Optional[Sequence[BaseMessage]] = None):
+        """Remember that a checkpoint exists for ``thread_id`` (call after the graph wrote one).
+
+        ``messages`` is the thread's message list after the turn; only its tail is kept.
+        """
+        if messages is None:
+            entry = self._has_state.get(thread_id)
+            tail = entry[1] if entry else []
+        else:
+            tail = list(messages[-self.history_messages:])
+        self._has_state[thread_id] = (time.monotonic() + self.ttl, tail)
+        self._has_state.move_to_end(thread_id)
+        while len(self._has_state) > self.max_entries:
+            self._has_state.popitem(last=False)
+
+    def forget(self, thread_id: str):
+        """Drop the cached bit, e.g. after the thread's state was cleared."""
+        self._has_state.pop(thread_id, None)
+
+    async def has_state(self, thread_id: str) -> bool:
+        """Whether the thread has a checkpoint, from the cache or one checkpoint read."""
+        if self._cached_has_state(thread_id):
+            self._stats["state_cache_hits"] += 1
+            return True
+
+        self._stats["state_checks"] += 1
+        checkpointer = redis_checkpointer.get_checkpointer()
+        checkpoint_tuple = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+        if checkpoint_tuple is not None:
+            self.mark_has_state(thread_id, checkpoint_tuple.checkpoint["channel_values"].get("messages", []))
+            return True
+        return False
+
+    async def build_input(self, thread_id: str, question: str) -> dict:
+        """Graph input for a new turn, seeding a cold thread from recent MongoDB history."""
+        messages = [HumanMessage(content=question)]
+        if not await self.has_state(thread_id):
+            self._stats["hydrations"] += 1
+            messages = await memory_service.aget_recent_messages(thread_id, self.history_messages) + messages
+
+        # Reset every turn so a checkpointed rewrite of an earlier question is never reused
+        return {"messages": messages, "thread_id": thread_id, "standalone_question": question}
+
+    def recent_history(self, thread_id: str, graph_input: dict) -> List[BaseMessage]:
+        """Messages before this turn's question: a cold thread's seeded history, else the cached tail."""
+        seeded = graph_input["messages"][:-1]
+        if seeded:
+            return list(seeded)
+        entry = self._has_state.get(thread_id)
+        return list(entry[1]) if entry else []
+
+    def get_stats(self) -> dict:
+        """Get session hydration statistics."""
+        return {"cached_threads": len(self._has_state), **self._stats}
+
+# Global session hydrator
+session_hydrator = SessionHydrator()
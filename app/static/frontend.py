@@ -97,6 +97,31 @@ def get_most_recent_session():
     
     return most_recent_id, sessions_with_history[most_recent_id]
 
+def stream_chat(thread_id, question):
+    """Yield (event, data) pairs from the streaming chat endpoint as they arrive"""
+    with requests.post(
+        "http://localhost:8000/api/chat/stream",
+        json={
+            "thread_id": thread_id,
+            "question": question
+        },
+        stream=True,
+        timeout=(10, 300)
+    ) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        
+        event, data_lines = "message", []
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].strip())
+            elif not line and data_lines:
+                # A blank line terminates one SSE frame
+                yield event, json.loads("\n".join(data_lines))
+                event, data_lines = "message", []
+
 # Initialize session state with auto-load
 if "thread_id" not in st.session_state:
     # Try to load the most recent session
@@ -180,45 +205,65 @@ if submitted:
     if not question.strip():
         st.warning("Please enter a question.")
     else:
-        with st.spinner("🤔 Thinking..."):
-            try:
-                response = requests.post(
-                    "http://localhost:8000/api/chat",
-                    json={
-                        "thread_id": st.session_state.thread_id,
-                        "question": question.strip()
-                    },
-                    timeout=300
-                )
+        status_placeholder = st.empty()
+        answer_placeholder = st.empty()
+        status_placeholder.info("🤔 Thinking...")
+        
+        try:
+            answer = ""
+            route = "unknown"
+            error = None
+            route_colors = {
+                "sql": "🗃️",
+                "vector": "🔍", 
+                "general": "💭",
+                "error": "❌"
+            }
+            
+            for event, data in stream_chat(st.session_state.thread_id, question.strip()):
+                if event == "route":
+                    route = data["route"]
+                    status_placeholder.info(f"Routing via {route_colors.get(route, '❓')} {route} route...")
+                elif event == "sql":
+                    status_placeholder.info(f"🗃️ Running SQL: `{data['query']}`")
+                elif event == "documents":
+                    movies = sorted({doc.get("movie") or doc.get("source", "?") for doc in data["documents"]})
+                    status_placeholder.info(f"🔍 Retrieved {len(data['documents'])} passages from: {', '.join(map(str, movies))}")
+                elif event == "token":
+                    answer += data["text"]
+                    answer_placeholder.markdown(f"**🤖 Assistant:** {answer}▌")
+                elif event == "done":
+                    answer = data["answer"]
+                    route = data.get("route", route)
+                elif event == "error":
+                    error = data
+            
+            if error is not None:
+                # Failed turns are shown once but never kept as assistant answers in the history
+                status_placeholder.empty()
+                answer_placeholder.empty()
+                st.error(f"{route_colors['error']} {error.get('answer', 'Something went wrong.')}")
+            else:
+                # Add to chat history
+                st.session_state.chat_history.append((question.strip(), answer))
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    answer = result["answer"]
-                    route = result.get("route", "unknown")
-                    
-                    # Add to chat history
-                    st.session_state.chat_history.append((question.strip(), answer))
-                    
-                    # Save to persistent storage immediately
-                    save_current_session()
-                    
-                    # Show route info
-                    route_colors = {
-                        "sql": "🗃️",
-                        "vector": "🔍", 
-                        "general": "💭",
-                        "error": "❌"
-                    }
-                    st.success(f"Response generated via {route_colors.get(route, '❓')} {route} route")
-                    
-                    st.rerun()
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
-                    
-            except requests.exceptions.Timeout:
-                st.error("Request timed out. Please try again.")
-            except Exception as e:
-                st.error(f"Request failed: {e}")
+                # Save to persistent storage immediately
+                save_current_session()
+                
+                # Show route info
+                st.success(f"Response generated via {route_colors.get(route, '❓')} {route} route")
+                
+                st.rerun()
+                
+        except requests.exceptions.Timeout:
+            status_placeholder.empty()
+            st.error("Request timed out. Please try again.")
+        except requests.exceptions.HTTPError as e:
+            status_placeholder.empty()
+            st.error(f"Error: {e.response.status_code} - {e.response.text}")
+        except Exception as e:
+            status_placeholder.empty()
+            st.error(f"Request failed: {e}")
 
 # Chat history display
 if st.session_state.chat_history:
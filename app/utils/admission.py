@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, Set
+from ..core.config import settings
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Every bulkhead by backend name, for /metrics and /health
+bulkheads: Dict[str, "Bulkhead"] = {}
+
+BULKHEAD_WAIT = metrics.histogram(
+    "rag_bulkhead_wait_seconds", "Time calls waited for a backend slot", ["backend"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+
+class Overloaded(Exception):
+    """A backend call was shed: its queue is full or the wait would miss the queue deadline."""
+
+    def __init__(self, backend: str, reason: str, retry_after: float):
+        super().__init__(f"{backend} overloaded ({reason})")
+        self.backend = backend
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        # A full queue is back-pressure on the caller; a missed deadline means the backend is too slow
+        return 429 if self.reason == "queue_full" else 503
+
+
+class Bulkhead:
+    """Caps concurrent calls to one backend, with a bounded queue and a queue deadline.
+
+    At most ``max_concurrency`` calls run at once and at most ``max_queue``
+    wait for a slot. A call is shed with ``Overloaded`` when the queue is
+    full, when the expected wait (queue position x recent call time /
+    concurrency) already exceeds ``queue_timeout``, or when it has waited
+    ``queue_timeout`` seconds. ``max_concurrency <= 0`` disables the limit.
+
+    Inside an ``admission_scope`` (one per chat request), later calls of a
+    request this bulkhead already admitted skip the queue-full and expected
+    wait checks and get freed slots first, so work already spent on a request
+    is not thrown away by its next call to the same backend.
+    """
+
+    # Weight of the latest call in the moving average of call time
+    SERVICE_TIME_ALPHA = 0.2
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        # Waiting calls of admitted requests, then new ones
+        self._waiters: Dict[bool, Deque[asyncio.Future]] = {True: deque(), False: deque()}
+        self._service_time = 0.0
+        self._stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_deadline": 0, "shed_timeout": 0}
+        bulkheads[name] = self
+
+    @classmethod
+    def from_settings(cls, name: str) -> "Bulkhead":
+        """Bulkhead configured by ``<NAME>_MAX_CONCURRENCY``, ``_MAX_QUEUE`` and ``_QUEUE_TIMEOUT``."""
+        prefix = name.upper()
+        return cls(
+            name,
+            max_concurrency=getattr(settings, f"{prefix}_MAX_CONCURRENCY"),
+            max_queue=getattr(settings, f"{prefix}_MAX_QUEUE"),
+            queue_timeout=getattr(settings, f"{prefix}_QUEUE_TIMEOUT"),
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters[True]) + len(self._waiters[False])
+
+    def expected_wait(self) -> float:
+        """Seconds a call queued now would likely wait for a slot."""
+        return (self.waiting + 1) * self._service_time / max(self.max_concurrency, 1)
+
+    def _shed(self, reason: str, retry_after: float):
+        self._stats[f"shed_{reason}"] += 1
+        logger.warning(f"Shedding {self.name} call ({reason}): {self.in_flight} in flight, {self.waiting} queued")
+        raise Overloaded(self.name, reason, retry_after)
+
+    async def _acquire(self, admitted: bool):
+        if self.in_flight < self.max_concurrency and not self.waiting:
+            self.in_flight += 1
+            return
+        if not admitted:
+            if len(self._waiters[False]) >= self.max_queue:
+                self._shed("queue_full", self.expected_wait())
+            if self.expected_wait() > self.queue_timeout:
+                self._shed("deadline", self.expected_wait())
+
+        # _release hands the slot over by resolving the future (in_flight stays counted)
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters[admitted]
+        queue.append(waiter)
+        self._stats["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait timed out; it is ours, so take it
+                return
+            self._shed("timeout", self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in queue:
+                queue.remove(waiter)
+
+    def _release(self):
+        for queue in (self._waiters[True], self._waiters[False]):
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the backend's slots for the duration of the block."""
+        if self.max_concurrency <= 0:
+            yield
+            return
+
+        scope = _admission.get()
+        start = time.perf_counter()
+        await self._acquire(scope is not None and self.name in scope)
+        acquired = time.perf_counter()
+        if scope is not None:
+            scope.add(self.name)
+        if metrics.enabled:
+            BULKHEAD_WAIT.observe(acquired - start, self.name)
+        self._stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self._release()
+            elapsed = time.perf_counter() - acquired
+            self._service_time += self.SERVICE_TIME_ALPHA * (elapsed - self._service_time)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "avg_call_ms": round(1000 * self._service_time, 2),
+            **self._stats,
+        }
+
+
+# Names of the bulkheads that admitted the current request
+_admission: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("admission", default=None)
+
+
+@contextmanager
+def admission_scope() -> Iterator[None]:
+    """Group the backend calls of one request so a bulkhead favours requests it already admitted."""
+    token = _admission.set(set())
+    try:
+        yield
+    finally:
+        _admission.reset(token)
+
+
+def retry_after_header(error: Overloaded) -> Dict[str, str]:
+    """``Retry-After`` (whole seconds, at least 1) for a shed request."""
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+
+
+def limit_chat_model(model, bulkhead: Bulkhead):
+    """Run a chat model's async generation and streaming inside ``bulkhead`` slots (retries included)."""
+    agenerate, astream = model._agenerate, model._astream
+
+    # wraps() keeps the signatures LangChain inspects (e.g. whether to pass run_manager)
+    @functools.wraps(agenerate)
+    async def _agenerate(*args, **kwargs):
+        async with bulkhead.slot():
+            return await agenerate(*args, **kwargs)
+
+    @functools.wraps(astream)
+    async def _astream(*args, **kwargs):
+        async with bulkhead.slot():
+            async for chunk in astream(*args, **kwargs):
+                yield chunk
+
+    # Instance attributes shadow the class methods; pydantic would reject plain assignment
+    object.__setattr__(model, "_agenerate", _agenerate)
+    object.__setattr__(model, "_astream", _astream)
+    return model
+
+
+def collect_metrics():
+    """Queue depth, in-flight calls and shed counts of every bulkhead, read at scrape time."""
+    stats = {name: bulkhead.get_stats() for name, bulkhead in bulkheads.items()}
+    return [
+        ("rag_bulkhead_in_flight", "gauge", "Backend calls holding a slot",
+         [({"backend": name}, s["in_flight"]) for name, s in stats.items()]),
+        ("rag_bulkhead_queue_depth", "gauge", "Backend calls waiting for a slot",
+         [({"backend": name}, s["queue_depth"]) for name, s in stats.items()]),
+        ("rag_bulkhead_admitted_total", "counter", "Backend calls admitted",
+         [({"backend": name}, s["admitted"]) for name, s in stats.items()]),
+        ("rag_bulkhead_shed_total", "counter", "Backend calls shed, by reason",
+         [({"backend": name, "reason": reason}, s[f"shed_{reason}"])
+          for name, s in stats.items() for reason in ("queue_full", "deadline", "timeout")]),
+    ]
+
+
+metrics.add_collector(collect_metrics)
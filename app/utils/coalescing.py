@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs at most one computation per key; concurrent callers with the same key share its outcome.
+
+    The first caller (the leader) runs ``compute``; callers arriving while it
+    is in flight await the same result, or get the same exception. If the
+    leader is cancelled (its client went away), waiting callers run
+    ``compute`` themselves instead of failing.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "leader_cancelled": 0}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """``(result, shared)``; ``shared`` is True when the result came from another caller's computation."""
+        if not self.enabled:
+            return await compute(), False
+
+        future = self._calls.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            try:
+                # shield: a cancelled follower must not cancel the leader's result for the others
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    self._stats["leader_cancelled"] += 1
+                    return await compute(), False
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Followers may be gone by the time the leader fails; don't log "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        self._stats["leaders"] += 1
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def get_stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._calls), **self._stats}
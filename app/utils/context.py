@@ -0,0 +1,176 @@
+import asyncio
+import contextvars
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from .prompts import summary_prompt, condense_prompt
+
+logger = logging.getLogger(__name__)
+
+
+def format_transcript(messages: Sequence[BaseMessage]) -> str:
+    """Plain ``Human:``/``AI:`` transcript of the conversational messages."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"Human: {message.content}")
+        elif isinstance(message, AIMessage):
+            lines.append(f"AI: {message.content}")
+    return "\n".join(lines)
+
+
+def summary_message(summary: Optional[str]) -> List[SystemMessage]:
+    """The running summary as a system message to put before recent messages, if there is one."""
+    if not summary:
+        return []
+    return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")]
+
+
+class ContextSummarizer:
+    """Folds turns that overflow the state window into a running summary, off the response path.
+
+    ``schedule`` starts a background LLM call folding the overflow into the
+    summary it was given; ``collect`` hands a finished fold back, with the ids
+    of the messages it covers, so the next turn writes the summary and removes
+    exactly those messages in one state update. Nothing leaves the state
+    before its summary is in it: a fold lost to a restart, failed or based on
+    a summary that has changed since (another worker folded first) is simply
+    redone from the messages still in state. At most ``max_threads`` folds are
+    kept, pending or uncollected; the oldest finished ones are evicted first.
+    """
+
+    def __init__(self, llm: BaseChatModel, max_words: int = 200, max_threads: int = 10000):
+        self.llm = llm
+        self.max_words = max_words
+        self.max_threads = max_threads
+        # Per thread: the fold task, the summary it extends and the ids of the messages it folds
+        self._tasks: Dict[str, Tuple[asyncio.Task, Optional[str], List[str]]] = {}
+        # Finished folds waiting for their thread's next turn, oldest first
+        self._done: "OrderedDict[str, Tuple[str, Optional[str], List[str]]]" = OrderedDict()
+        self._stats = {"scheduled": 0, "completed": 0, "failed": 0, "stale": 0, "skipped": 0, "evicted": 0}
+
+    async def _fold(self, summary: Optional[str], messages: List[BaseMessage]) -> Optional[str]:
+        try:
+            response = await self.llm.ainvoke(summary_prompt.format(
+                summary=summary or "(none)",
+                transcript=format_transcript(messages),
+                max_words=self.max_words,
+            ))
+            self._stats["completed"] += 1
+            return response.content.strip() or None
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning(f"Conversation summarization failed: {e}")
+            return None
+
+    def _finished(self, thread_id: str, task: asyncio.Task):
+        entry = self._tasks.get(thread_id)
+        if entry is None or entry[0] is not task:
+            return
+        del self._tasks[thread_id]
+        result = None if task.cancelled() else task.result()
+        if result:
+            self._done[thread_id] = (result, entry[1], entry[2])
+            self._done.move_to_end(thread_id)
+            while len(self._done) > self.max_threads:
+                self._done.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def pending(self, thread_id: str) -> bool:
+        """Whether a fold for ``thread_id`` is running or waiting to be collected."""
+        return thread_id in self._tasks or thread_id in self._done
+
+    def schedule(self, thread_id: str, summary: Optional[str], messages: List[BaseMessage]):
+        """Start folding ``messages`` into ``summary`` for ``thread_id`` in the background."""
+        if self.pending(thread_id):
+            return
+        if len(self._tasks) + len(self._done) >= self.max_threads:
+            if not self._done:
+                # Every slot is a running fold; the messages stay in state until a later turn
+                self._stats["skipped"] += 1
+                return
+            self._done.popitem(last=False)
+            self._stats["evicted"] += 1
+        # A fresh context keeps the call out of the current run's callbacks (and its streamed events)
+        task = asyncio.get_running_loop().create_task(self._fold(summary, messages), context=contextvars.Context())
+        self._tasks[thread_id] = (task, summary, [msg.id for msg in messages])
+        task.add_done_callback(lambda t: self._finished(thread_id, t))
+        self._stats["scheduled"] += 1
+
+    def collect(self, thread_id: str, summary: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+        """``(new summary, folded message ids)`` of a finished fold that extends ``summary``, or None."""
+        entry = self._done.pop(thread_id, None)
+        if entry is None:
+            return None
+        result, base, message_ids = entry
+        if base != summary:
+            # The state summary moved on without this fold; its messages are folded again if still there
+            self._stats["stale"] += 1
+            return None
+        return result, message_ids
+
+    def forget(self, thread_id: str):
+        """Drop any fold for ``thread_id`` (its conversation was cleared)."""
+        entry = self._tasks.pop(thread_id, None)
+        if entry is not None:
+            entry[0].cancel()
+        self._done.pop(thread_id, None)
+
+    def get_stats(self) -> dict:
+        """Get summarization statistics."""
+        return {"pending": len(self._tasks), "uncollected": len(self._done), **self._stats}
+
+
+class QuestionCondenser:
+    """Rewrites a follow-up into a standalone question for retrieval, SQL generation and answer caches.
+
+    Questions with no conversation before them are returned as-is without an
+    LLM call. Rewrites are cached per thread and turn (the last history
+    message), so every consumer of one turn shares a single call.
+    """
+
+    def __init__(self, llm: BaseChatModel, history_messages: int = 6, max_entries: int = 10000,
+                 enabled: bool = True):
+        self.llm = llm
+        self.history_messages = history_messages
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._stats = {"skipped": 0, "hits": 0, "rewrites": 0, "failed": 0}
+
+    async def condense(self, thread_id: str, question: str, history: Sequence[BaseMessage]) -> str:
+        """Standalone form of ``question`` given the messages before it."""
+        history = [msg for msg in history if isinstance(msg, (HumanMessage, AIMessage))]
+        if not self.enabled or not history:
+            self._stats["skipped"] += 1
+            return question
+
+        key = (thread_id, str(history[-1].content), question)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._stats["hits"] += 1
+            return cached
+
+        try:
+            response = await self.llm.ainvoke(condense_prompt.format(
+                transcript=format_transcript(history[-self.history_messages:]),
+                question=question,
+            ))
+            standalone = response.content.strip() or question
+            self._stats["rewrites"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning(f"Question condensation failed, using the raw question: {e}")
+            return question
+
+        self._cache[key] = standalone
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return standalone
+
+    def get_stats(self) -> dict:
+        """Get condensation statistics."""
+        return {"cached": len(self._cache), **self._stats}
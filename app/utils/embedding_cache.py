@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+import redis
+import redis.asyncio as aredis
+from langchain_core.embeddings import Embeddings
+from .metrics import track
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed embedding cache: in-process LRU in front of an optional Redis tier.
+
+    Keys are ``emb:<model>:<kind>:<sha256(text)>`` where ``kind`` separates
+    query from document embeddings (Cohere embeds them differently). Vectors
+    are stored as raw float32 bytes in both tiers.
+
+    ``abatch_query`` embeds several queries in one provider call; without it
+    ``aembed_queries`` falls back to concurrent single-query calls.
+    ``limiter`` (a ``Bulkhead``) caps concurrent async provider calls.
+    """
+
+    REDIS_RETRY_SECONDS = 60
+
+    def __init__(self, embeddings: Embeddings, model_name: str, max_entries: int = 10000,
+                 redis_url: Optional[str] = None, ttl: Optional[int] = None,
+                 abatch_query: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+                 limiter=None):
+        self.embeddings = embeddings
+        self.abatch_query = abatch_query
+        self.limiter = limiter
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._redis_url = redis_url
+        self._redis: Optional[redis.Redis] = None
+        self._aredis: Optional[aredis.Redis] = None
+        self._redis_retry_at = 0.0
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0}
+
+    # Keys and serialization
+
+    def _key(self, kind: str, text: str) -> str:
+        return f"emb:{self.model_name}:{kind}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def _to_bytes(vector: np.ndarray) -> bytes:
+        return vector.astype(np.float32, copy=False).tobytes()
+
+    @staticmethod
+    def _from_bytes(data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype=np.float32)
+
+    # In-process tier
+
+    def _memory_get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # Redis tier
+
+    def _redis_available(self) -> bool:
+        return self._redis_url is not None and time.monotonic() >= self._redis_retry_at
+
+    def _redis_failed(self, e: Exception):
+        """Skip the Redis tier for a while after an error; the LRU keeps serving."""
+        self._stats["redis_errors"] += 1
+        logger.warning(f"Embedding cache Redis tier unavailable for {self.REDIS_RETRY_SECONDS}s: {e}")
+        self._redis_retry_at = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def _get_redis(self) -> Optional[redis.Redis]:
+        if not self._redis_available():
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, socket_connect_timeout=2, socket_timeout=2)
+        return self._redis
+
+    def _get_aredis(self) -> Optional[aredis.Redis]:
+        if not self._redis_available():
+            return None
+        if self._aredis is None:
+            self._aredis = aredis.Redis.from_url(self._redis_url, socket_connect_timeout=2, socket_timeout=2)
+        return self._aredis
+
+    # Lookup / fill
+
+    def _lookup_memory(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        for key in keys:
+            vector = self._memory_get(key)
+            if vector is not None:
+                found[key] = vector
+        self._stats["memory_hits"] += len(found)
+        return found
+
+    def _accept_redis(self, keys: List[str], values: List[Optional[bytes]], found: Dict[str, np.ndarray]):
+        for key, value in zip(keys, values):
+            if value is not None:
+                vector = self._from_bytes(value)
+                found[key] = vector
+                self._memory_put(key, vector)
+                self._stats["redis_hits"] += 1
+
+    def _embed_cached(self, kind: str, texts: List[str], embed_fn) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup_memory(keys)
+
+        pending = [key for key in dict.fromkeys(keys) if key not in found]
+        client = self._get_redis() if pending else None
+        if client is not None:
+            try:
+                with track("redis", "embedding_cache_get"):
+                    self._accept_redis(pending, client.mget(pending), found)
+            except Exception as e:
+                self._redis_failed(e)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            self._stats["misses"] += len(missing)
+            with track("embedder", self.model_name):
+                vectors = embed_fn(list(missing.values()))
+            self._store(found, list(missing), vectors)
+            client = self._get_redis()
+            if client is not None:
+                try:
+                    with client.pipeline(transaction=False) as pipe:
+                        for key in missing:
+                            pipe.set(key, self._to_bytes(found[key]), ex=self.ttl)
+                        pipe.execute()
+                except Exception as e:
+                    self._redis_failed(e)
+
+        return [found[key].tolist() for key in keys]
+
+    async def _aembed_cached(self, kind: str, texts: List[str], aembed_fn) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup_memory(keys)
+
+        pending = [key for key in dict.fromkeys(keys) if key not in found]
+        client = self._get_aredis() if pending else None
+        if client is not None:
+            try:
+                with track("redis", "embedding_cache_get"):
+                    self._accept_redis(pending, await client.mget(pending), found)
+            except Exception as e:
+                self._redis_failed(e)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            self._stats["misses"] += len(missing)
+            async with self.limiter.slot() if self.limiter else nullcontext():
+                with track("embedder", self.model_name):
+                    vectors = await aembed_fn(list(missing.values()))
+            self._store(found, list(missing), vectors)
+            client = self._get_aredis()
+            if client is not None:
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        for key in missing:
+                            pipe.set(key, self._to_bytes(found[key]), ex=self.ttl)
+                        await pipe.execute()
+                except Exception as e:
+                    self._redis_failed(e)
+
+        return [found[key].tolist() for key in keys]
+
+    def _store(self, found: Dict[str, np.ndarray], keys: List[str], vectors: List[List[float]]):
+        for key, vector in zip(keys, vectors):
+            array = np.asarray(vector, dtype=np.float32)
+            found[key] = array
+            self._memory_put(key, array)
+
+    # Embeddings interface
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached("doc", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached("query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed_cached("doc", texts, self.embeddings.aembed_documents)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def _aembed(texts: List[str]) -> List[List[float]]:
+            return [await self.embeddings.aembed_query(texts[0])]
+        return (await self._aembed_cached("query", [text], _aembed))[0]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries, sending only the cache misses to the provider in one call."""
+        async def _aembed(missing: List[str]) -> List[List[float]]:
+            if self.abatch_query is not None:
+                return await self.abatch_query(missing)
+            return list(await asyncio.gather(*(self.embeddings.aembed_query(text) for text in missing)))
+        return await self._aembed_cached("query", texts, _aembed)
+
+    def get_cache_stats(self) -> dict:
+        """Get embedding cache statistics."""
+        lookups = self._stats["memory_hits"] + self._stats["redis_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            "model": self.model_name,
+            "entries": len(self._lru),
+            "redis_tier": "disabled" if self._redis_url is None else ("enabled" if self._redis_available() else "backoff"),
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from qdrant_client import AsyncQdrantClient, models
+
+logger = logging.getLogger(__name__)
+
+# Screenplay scene headings: "INT. TRENCH - DAY", "12 EXT. NO MAN'S LAND - CONTINUOUS", "I/E CAR - NIGHT"
+SCENE_HEADING = re.compile(r"^\s*(?:\d+[A-Z]?\s+)?(?:INT\.?/EXT|EXT\.?/INT|INT|EXT|I/E)[\.\s]")
+# Page furniture repeated on every page of a shooting script
+PAGE_NOISE = re.compile(r"^\s*(?:\d+\.?|\(?CONTINUED\)?:?|\(MORE\)|CONT'D)\s*$")
+
+# Point ids are derived from chunk content, so re-ingesting unchanged text is a no-op
+POINT_NAMESPACE = uuid.UUID("9b3e4f6a-5d1c-4e2b-8f7a-1c0d2e3f4a5b")
+
+PageReader = Callable[[str], Iterator[Tuple[int, str]]]
+
+
+def iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield ``(page_number, text)`` one page at a time; only the current page's text is held."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise RuntimeError("PDF ingestion needs pypdf: pip install pypdf") from e
+
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, start=1):
+        yield number, page.extract_text() or ""
+
+
+def movie_title(path: str) -> str:
+    """Movie name from a script file name, e.g. ``blade-runner-2049_merged.pdf`` -> ``blade runner 2049``."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    name = re.sub(r"_merged$|\s*\(\d+\)", "", name)
+    return re.sub(r"[-_]+", " ", name).strip()
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: dict
+
+    @property
+    def content_hash(self) -> str:
+        return self.metadata["content_hash"]
+
+    @property
+    def point_id(self) -> str:
+        return str(uuid.uuid5(POINT_NAMESPACE, f"{self.metadata['source']}:{self.content_hash}"))
+
+
+class SceneChunker:
+    """Splits a screenplay into chunks at scene headings, streaming page by page.
+
+    A scene longer than ``max_chars`` is split on line boundaries with about
+    ``overlap`` characters carried over; continuation chunks repeat the scene
+    heading so they still say where they are.
+    """
+
+    def __init__(self, max_chars: int = 1500, overlap: int = 150):
+        self.max_chars = max_chars
+        self.overlap = overlap
+
+    def _split(self, heading: Optional[str], lines: List[str]) -> Iterator[str]:
+        text = "\n".join(lines).strip()
+        if len(text) <= self.max_chars:
+            if text:
+                yield text
+            return
+
+        current: List[str] = []
+        size = 0
+        for line in lines:
+            if current and size + len(line) + 1 > self.max_chars:
+                yield "\n".join(current).strip()
+                # Restate the scene, then carry trailing lines over for continuity
+                carried: List[str] = []
+                carried_size = 0
+                for previous in reversed(current):
+                    if previous == heading or carried_size + len(previous) + 1 > self.overlap:
+                        break
+                    carried.insert(0, previous)
+                    carried_size += len(previous) + 1
+                current = ([heading] if heading else []) + carried
+                size = sum(len(item) + 1 for item in current)
+            current.append(line)
+            size += len(line) + 1
+        yield "\n".join(current).strip()
+
+    def chunk(self, pages: Iterable[Tuple[int, str]], source: str, movie: str) -> Iterator[Chunk]:
+        """Yield chunks as scenes complete; pages are consumed lazily."""
+        heading: Optional[str] = None
+        lines: List[str] = []
+        start_page = 1
+
+        def emit():
+            for text in self._split(heading, lines):
+                digest = hashlib.sha256(f"{movie}\n{text}".encode("utf-8")).hexdigest()
+                yield Chunk(text=text, metadata={
+                    "source": source,
+                    "movie": movie,
+                    "page": start_page,
+                    "scene": heading or "",
+                    "content_hash": digest,
+                })
+
+        for number, text in pages:
+            for raw in text.splitlines():
+                line = raw.rstrip()
+                if not line.strip() or PAGE_NOISE.match(line):
+                    continue
+                if SCENE_HEADING.match(line):
+                    yield from emit()
+                    heading, lines, start_page = line.strip(), [line.strip()], number
+                    continue
+                if not lines:
+                    start_page = number
+                lines.append(line)
+        yield from emit()
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    pages: int = 0
+    chunks: int = 0
+    unchanged: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    deleted: int = 0
+    embed_calls: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.files,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "unchanged": self.unchanged,
+            "embedded": self.embedded,
+            "upserted": self.upserted,
+            "deleted": self.deleted,
+            "embed_calls": self.embed_calls,
+            "seconds": round(self.seconds, 3),
+            "pages_per_sec": round(self.pages / self.seconds, 1) if self.seconds else 0.0,
+            "chunks_per_sec": round(self.chunks / self.seconds, 1) if self.seconds else 0.0,
+        }
+
+
+class ScriptIngestor:
+    """(Re)builds the movie scripts collection from PDFs, incrementally.
+
+    Each chunk's point id is a UUID of its source and content hash. Ids
+    already in the collection are skipped; new chunks are embedded in
+    batches of ``embed_batch_size`` with at most ``embed_concurrency``
+    provider calls in flight and upserted ``upsert_batch_size`` points at a
+    time. Points of a file that are no longer produced by it are deleted.
+    Skipped chunks keep the metadata (e.g. ``page``) they were embedded with.
+    Payloads use the layout ``QdrantVectorStore`` reads
+    (``page_content`` + ``metadata``).
+    """
+
+    def __init__(self, client: AsyncQdrantClient, collection_name: str, embeddings: Embeddings,
+                 chunker: Optional[SceneChunker] = None, read_pages: PageReader = iter_pdf_pages,
+                 embed_batch_size: int = 96, embed_concurrency: int = 4, upsert_batch_size: int = 512):
+        self.client = client
+        self.collection_name = collection_name
+        self.embeddings = embeddings
+        self.chunker = chunker or SceneChunker()
+        self.read_pages = read_pages
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self._embed_semaphore = asyncio.Semaphore(embed_concurrency)
+        self._collection_lock = asyncio.Lock()
+        self._collection_ready = False
+
+    def _load_chunks(self, path: str) -> Tuple[List[Chunk], int]:
+        page_count = 0
+
+        def counted_pages():
+            nonlocal page_count
+            for page in self.read_pages(path):
+                page_count += 1
+                yield page
+
+        # Identical text twice in one script maps to the same point
+        chunks: Dict[str, Chunk] = {}
+        for chunk in self.chunker.chunk(counted_pages(), source=os.path.basename(path), movie=movie_title(path)):
+            chunks.setdefault(chunk.point_id, chunk)
+        return list(chunks.values()), page_count
+
+    async def _ensure_collection(self, dimension: int):
+        async with self._collection_lock:
+            if self._collection_ready:
+                return
+            if not await self.client.collection_exists(self.collection_name):
+                await self.client.create_collection(
+                    self.collection_name,
+                    vectors_config=models.VectorParams(size=dimension, distance=models.Distance.COSINE),
+                )
+                logger.info(f"Created Qdrant collection {self.collection_name} ({dimension} dimensions)")
+            self._collection_ready = True
+
+    async def _existing_ids(self, ids: List[str]) -> set:
+        if not await self.client.collection_exists(self.collection_name):
+            return set()
+        found = set()
+        for i in range(0, len(ids), self.upsert_batch_size):
+            records = await self.client.retrieve(
+                self.collection_name, ids=ids[i:i + self.upsert_batch_size], with_payload=False, with_vectors=False
+            )
+            found.update(str(record.id) for record in records)
+        return found
+
+    async def _embed(self, chunks: List[Chunk], stats: IngestStats) -> Tuple[List[Chunk], List[List[float]]]:
+        async with self._embed_semaphore:
+            stats.embed_calls += 1
+            return chunks, await self.embeddings.aembed_documents([chunk.text for chunk in chunks])
+
+    async def _embed_and_upsert(self, chunks: List[Chunk], stats: IngestStats):
+        batches = [chunks[i:i + self.embed_batch_size] for i in range(0, len(chunks), self.embed_batch_size)]
+        pending: List[models.PointStruct] = []
+        # Upserts overlap the embedding calls still in flight; points are flushed in large batches
+        for completed in asyncio.as_completed([self._embed(batch, stats) for batch in batches]):
+            batch, vectors = await completed
+            await self._ensure_collection(len(vectors[0]))
+            pending.extend(
+                models.PointStruct(id=chunk.point_id, vector=vector,
+                                   payload={"page_content": chunk.text, "metadata": chunk.metadata})
+                for chunk, vector in zip(batch, vectors)
+            )
+            while len(pending) >= self.upsert_batch_size:
+                await self.client.upsert(self.collection_name, points=pending[:self.upsert_batch_size], wait=True)
+                stats.upserted += self.upsert_batch_size
+                pending = pending[self.upsert_batch_size:]
+        if pending:
+            await self.client.upsert(self.collection_name, points=pending, wait=True)
+            stats.upserted += len(pending)
+        stats.embedded += len(chunks)
+
+    async def _delete_stale(self, source: str, keep: set) -> int:
+        if not await self.client.collection_exists(self.collection_name):
+            return 0
+        source_filter = models.Filter(must=[
+            models.FieldCondition(key="metadata.source", match=models.MatchValue(value=source))
+        ])
+        stale = []
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                self.collection_name, scroll_filter=source_filter, limit=1024, offset=offset,
+                with_payload=False, with_vectors=False,
+            )
+            stale.extend(point.id for point in points if str(point.id) not in keep)
+            if offset is None:
+                break
+        if stale:
+            await self.client.delete(self.collection_name, points_selector=models.PointIdsList(points=stale), wait=True)
+        return len(stale)
+
+    async def ingest_file(self, path: str, stats: IngestStats):
+        """Chunk one PDF and bring its points in the collection up to date."""
+        source = os.path.basename(path)
+        chunks, page_count = await asyncio.to_thread(self._load_chunks, path)
+        ids = [chunk.point_id for chunk in chunks]
+        existing = await self._existing_ids(ids)
+        new_chunks = [chunk for chunk in chunks if chunk.point_id not in existing]
+
+        if new_chunks:
+            await self._embed_and_upsert(new_chunks, stats)
+        deleted = await self._delete_stale(source, set(ids))
+
+        stats.files += 1
+        stats.pages += page_count
+        stats.chunks += len(chunks)
+        stats.unchanged += len(chunks) - len(new_chunks)
+        stats.deleted += deleted
+        logger.info(f"{source}: {page_count} pages, {len(chunks)} chunks, "
+                    f"{len(new_chunks)} embedded, {deleted} stale removed")
+
+    async def ingest(self, paths: List[str]) -> IngestStats:
+        """Ingest several PDFs concurrently (embedding concurrency is shared)."""
+        stats = IngestStats()
+        start = time.perf_counter()
+        await asyncio.gather(*(self.ingest_file(path, stats) for path in paths))
+        stats.seconds = time.perf_counter() - start
+        return stats
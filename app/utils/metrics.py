@@ -0,0 +1,282 @@
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from .tracing import trace_call
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans in-process lookups (sub-ms) up to slow LLM answers
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (labels, value) pairs of one metric family
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def lines(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(dict(zip(self.labelnames, labels)))} {value}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with a fixed set of label names."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def lines(self) -> Iterator[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels({**base, 'le': le})} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(base)} {total}"
+            yield f"{self.name}_count{_format_labels(base)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text format.
+
+    Hot-path metrics are ``Counter``/``Histogram`` instances updated in place.
+    Collectors are called only at scrape time and turn the existing
+    ``get_stats()`` dicts into samples, so cache counters cost nothing per
+    request.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        """Register ``collector() -> [(name, kind, documentation, samples)]``, called on every scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {float(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.histogram(
+    "rag_request_duration_seconds", "End-to-end chat request latency by route", ["route"])
+NODE_LATENCY = metrics.histogram(
+    "rag_node_duration_seconds", "LangGraph node latency", ["node"])
+BACKEND_LATENCY = metrics.histogram(
+    "rag_backend_duration_seconds", "Backend call latency (LLM, embedder, vector store, SQLite, MongoDB, Redis)",
+    ["backend", "operation"])
+BACKEND_ERRORS = metrics.counter(
+    "rag_backend_errors_total", "Backend calls that raised", ["backend", "operation"])
+LLM_FIRST_TOKEN = metrics.histogram(
+    "rag_llm_first_token_seconds", "Time to the first streamed LLM token", ["model"])
+LLM_TOKENS = metrics.counter(
+    "rag_llm_tokens_total", "LLM tokens reported by the provider", ["model", "kind"])
+
+# Per-request timings (seconds per "<backend>.<operation>" / "node.<name>"), set by RAGService
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    """Collect the node and backend timings of everything awaited inside the block."""
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def _record(key: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[key] = timings.get(key, 0.0) + seconds
+    trace_call(key, seconds)
+
+
+class track:
+    """Time a backend call into ``rag_backend_duration_seconds`` and the request timings.
+
+    A plain class rather than ``@contextmanager``: it wraps every backend call,
+    and skipping the generator machinery keeps it to a few hundred nanoseconds.
+    """
+
+    __slots__ = ("backend", "operation", "start")
+
+    def __init__(self, backend: str, operation: str):
+        self.backend = backend
+        self.operation = operation
+        self.start = None
+
+    def __enter__(self):
+        if metrics.enabled:
+            self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is None:
+            return
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None:
+            BACKEND_ERRORS.inc(self.backend, self.operation)
+        BACKEND_LATENCY.observe(elapsed, self.backend, self.operation)
+        _record(f"{self.backend}.{self.operation}", elapsed)
+
+
+def timed_async(fn: Callable, backend: str, operation: str) -> Callable:
+    """Wrap an async callable with ``track``."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with track(backend, operation):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+
+def timed_node(name: str, fn: Callable) -> Callable:
+    """Wrap an async LangGraph node so its latency lands in ``rag_node_duration_seconds``."""
+    @functools.wraps(fn)
+    async def wrapper(state):
+        if not metrics.enabled:
+            return await fn(state)
+        start = time.perf_counter()
+        try:
+            return await fn(state)
+        finally:
+            elapsed = time.perf_counter() - start
+            NODE_LATENCY.observe(elapsed, name)
+            _record(f"node.{name}", elapsed)
+    return wrapper
+
+
+def observe_request(route: Optional[str], seconds: float):
+    if metrics.enabled:
+        REQUEST_LATENCY.observe(seconds, route or "unknown")
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback attached to a chat model: call latency, time to first token and token usage."""
+
+    # Trivial bookkeeping; run on the caller instead of a thread-pool hop
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._starts: Dict[Any, float] = {}
+        self._streaming: set = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id not in self._streaming and run_id in self._starts and metrics.enabled:
+            self._streaming.add(run_id)
+            LLM_FIRST_TOKEN.observe(time.perf_counter() - self._starts[run_id], self.model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        self._streaming.discard(run_id)
+        if start is None or not metrics.enabled:
+            return
+        elapsed = time.perf_counter() - start
+        BACKEND_LATENCY.observe(elapsed, "llm", self.model)
+        _record("llm", elapsed)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc(self.model, "input", amount=usage.get("input_tokens", 0))
+                    LLM_TOKENS.inc(self.model, "output", amount=usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        self._streaming.discard(run_id)
+        BACKEND_ERRORS.inc("llm", self.model)
+
+
+def stats_samples(stats: Dict[str, Any], keys: Sequence[str], **labels: str) -> List[Tuple[Dict[str, str], float]]:
+    """Samples for the numeric ``keys`` of a ``get_stats()`` dict, labelled ``event=<key>``."""
+    return [({**labels, "event": key}, stats[key]) for key in keys if isinstance(stats.get(key), (int, float))]
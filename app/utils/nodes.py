@@ -1,43 +1,149 @@
 from .states import QueryOutput, State
-from ..factories.models import llm, db, vectorstore
+from ..factories.models import llm, embedder, hybrid_retriever, schema_context, sql_executor
+from ..core.config import settings
 from .prompts import router_prompt, sql_prompt, vectordb_prompt
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage 
-from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, RemoveMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.retrievers import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langgraph.graph import START, StateGraph, END
 from ..services.memory_service import memory_service
+from .retrieval import HYBRID_RETRIEVER_TAG, SpeculativeRetriever
+from .routing import TieredRouter, schema_terms
+from .context import ContextSummarizer, QuestionCondenser, summary_message
+from .metrics import timed_node
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Nodes whose LLM output is the user-facing answer (streamed token by token)
+ANSWER_NODE_BY_ROUTE = {
+    "sql": "generate_sql_answer",
+    "vector": "generate_vector_answer",
+    "general": "generate_general_answer",
+}
+ANSWER_NODES = tuple(ANSWER_NODE_BY_ROUTE.values())
 
+# Hybrid retrieval that the router can start before the route is known
+speculative_retriever = SpeculativeRetriever(retriever=hybrid_retriever, max_age=settings.SPECULATIVE_RETRIEVAL_MAX_AGE)
 
-def router(state: State):
+# Vector-route chain, built once: hybrid retrieval -> stuffed prompt -> LLM
+rag_prompt = ChatPromptTemplate.from_messages([
+    ("system", vectordb_prompt),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("human", "{input}"),
+])
+rag_chain = create_retrieval_chain(speculative_retriever, create_stuff_documents_chain(llm, rag_prompt))
+
+# Local routing tiers; the LLM router only sees questions they can't decide
+tiered_router = TieredRouter(
+    embedder,
+    extra_sql_terms=schema_terms(schema_context.get_columns()),
+    min_similarity=settings.ROUTER_EMBEDDING_MIN_SIMILARITY,
+    margin=settings.ROUTER_EMBEDDING_MARGIN,
+    enabled=settings.ROUTER_FAST_PATH_ENABLED,
+)
+
+# Background folding of trimmed turns into the running conversation summary
+context_summarizer = ContextSummarizer(
+    llm,
+    max_words=settings.CONTEXT_SUMMARY_MAX_WORDS,
+    max_threads=settings.CONTEXT_SUMMARY_MAX_THREADS,
+)
+
+# Follow-ups rewritten to standalone questions (called by RAGService before the graph runs)
+question_condenser = QuestionCondenser(
+    llm,
+    history_messages=settings.QUERY_CONDENSE_HISTORY_MESSAGES,
+    max_entries=settings.QUERY_CONDENSE_CACHE_MAX_ENTRIES,
+    enabled=settings.QUERY_CONDENSE_ENABLED,
+)
+
+
+def standalone_question(state: State) -> str:
+    """The latest message as a standalone question, falling back to its raw text."""
+    messages = state["messages"]
+    return state.get("standalone_question") or (messages[-1].content if messages else "")
+
+
+async def manage_context(state: State):
+    """Bound the message window, folding trimmed turns into the running summary.
+
+    With summaries on, messages leave the state only together with the
+    summary that folds them, so a lost fold never loses turns.
+    """
+    messages = state["messages"]
+    thread_id = state.get("thread_id") or ""
+    window = settings.CONTEXT_WINDOW_MESSAGES
+    if not window or len(messages) <= window:
+        return {}
+    
+    overflow = list(messages[:-window])
+    if not settings.CONTEXT_SUMMARY_ENABLED:
+        return {"messages": [RemoveMessage(id=msg.id) for msg in overflow]}
+    
+    # Pick up a fold finished since the last turn: store its summary and trim what it covers
+    collected = context_summarizer.collect(thread_id, state.get("summary"))
+    if collected:
+        summary, folded_ids = collected
+        present = {msg.id for msg in messages}
+        removed = [RemoveMessage(id=msg_id) for msg_id in folded_ids if msg_id in present]
+        # A fold of none of these messages belongs to an earlier conversation on this thread
+        if removed:
+            return {"summary": summary, "messages": removed}
+    
+    # Summarized off the response path; this turn answers from the window and current summary
+    context_summarizer.schedule(thread_id, state.get("summary"), overflow)
+    return {}
+
+
+async def router(state: State):
     """Route the conversation based on the latest user message."""
-    print("Routing decision...")
     messages = state["messages"]
     
-    # Get the latest user message
-    latest_message = messages[-1].content if messages else ""
+    # Follow-ups are classified in their standalone form
+    question = standalone_question(state)
+    
+    route, tier = await tiered_router.classify(question)
+    if route:
+        logger.info(f"Router decision ({tier}): {route}")
+        return {"route": route}
     
     recent_messages = messages[-8:] if len(messages) > 8 else messages
 
-    response = llm.invoke(router_prompt.format(question=latest_message, context=recent_messages))
-    answer = response.content.strip().lower()
-    print(f"Router Decision (LLM): {answer}")
+    # Speculate while the LLM decides: vector retrieval runs and the SQL schema is refreshed off the loop
+    speculative = settings.ROUTER_SPECULATIVE_ENABLED
+    if speculative:
+        speculative_retriever.start(question)
+        schema_task = asyncio.create_task(asyncio.to_thread(schema_context.refresh))
+
+    route = "general"
+    try:
+        start = time.perf_counter()
+        context = summary_message(state.get("summary")) + list(recent_messages)
+        response = await llm.ainvoke(router_prompt.format(question=question, context=context))
+        tiered_router.record_llm_decision(time.perf_counter() - start)
+        answer = response.content.strip().lower()
+        logger.info(f"Router decision (llm): {answer}")
 
-    if "sql" in answer:
-        return {"route": "sql"}
-    elif "vector" in answer:
-        return {"route": "vector"}
-    else:
-        return {"route": "general"}
+        if "sql" in answer:
+            route = "sql"
+        elif "vector" in answer:
+            route = "vector"
+    finally:
+        if speculative:
+            if route != "vector":
+                speculative_retriever.cancel(question)
+            if route == "sql":
+                await schema_task
+            else:
+                schema_task.cancel()
 
-def write_query(state: State):
+    return {"route": route}
+
+async def write_query(state: State):
     """Generate SQL query to fetch information with context awareness."""
     messages = state["messages"]
     
@@ -45,34 +151,36 @@ def write_query(state: State):
     latest_message = messages[-1].content if messages else ""
     
     # Build context from recent conversation
-    context_messages = []
+    context_messages = [msg.content for msg in summary_message(state.get("summary"))]
     for msg in messages[-8:]:  # Last 3 exchanges (6 messages)
         if isinstance(msg, (HumanMessage, AIMessage)):
             context_messages.append(f"{msg.__class__.__name__}: {msg.content}")
     
+    question = standalone_question(state)
+    if question != latest_message:
+        context_messages.append(f"Standalone question: {question}")
     context_str = "\n".join(context_messages) if context_messages else latest_message
         
     prompt = sql_prompt.format(
-        dialect=db.dialect,
+        dialect=schema_context.dialect,
         top_k=10,
-        table_info=db.get_context(),
+        table_info=schema_context.get_table_info(context_str),
         input=context_str,
     )    
     structured_llm = llm.with_structured_output(QueryOutput)
-    result = structured_llm.invoke(prompt)
+    result = await structured_llm.ainvoke(prompt)
     return {"query": result["query"]}
 
-def execute_query(state: State):
+async def execute_query(state: State):
     """Execute SQL query."""
     query = state["query"]
     
-    # Execute query - Redis cache will handle LLM response caching automatically
-    execute_query_tool = QuerySQLDatabaseTool(db=db)
-    result = execute_query_tool.invoke(query)
+    # Read-only pooled execution; repeated SQL is served from the result cache
+    result = await sql_executor.arun(query)
     
     return {"result": result}
 
-def generate_sql_answer(state: State):
+async def generate_sql_answer(state: State):
     """Generate SQL answer with conversation context."""
     messages = state["messages"]
     latest_message = messages[-1].content if messages else ""
@@ -85,11 +193,12 @@ def generate_sql_answer(state: State):
     context_messages = [
         SystemMessage(content="You are an AI assistant. Answer based on the SQL query and result.")
     ]
+    context_messages.extend(summary_message(state.get("summary")))
     context_messages.extend(recent_messages)
     
     # Add current task
     current_task = f"""
-    Question: {latest_message}
+    Question: {standalone_question(state)}
     SQL Query: {state['query']}
     Result: {state['result']}
     
@@ -97,17 +206,17 @@ def generate_sql_answer(state: State):
     """
     context_messages.append(HumanMessage(content=current_task))
     
-    response = llm.invoke(context_messages)
+    response = await llm.ainvoke(context_messages)
     
-    # Save to memory
-    memory_service.save_conversation(thread_id, latest_message, response.content, "sql")
+    # Persisted in the background; the answer returns without waiting on MongoDB
+    memory_service.enqueue_conversation(thread_id, latest_message, response.content, "sql")
     
     return {
         "answer": response.content,
         "messages": [AIMessage(content=response.content)]
     }
 
-def generate_vector_answer(state: State):
+async def generate_vector_answer(state: State):
     """Generate vector answer with chat history context."""
     messages = state["messages"]
     latest_message = messages[-1].content if messages else ""
@@ -116,49 +225,21 @@ def generate_vector_answer(state: State):
     # Get chat history for context
     chat_history = messages[-6:] if len(messages) > 6 else messages
 
-    # Perform vector search - LLM responses automatically cached by Redis
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k": 10,
-            "fetch_k": 20,
-            "lambda_mult": 0.7,
-        }
-    )
-
-    docs = vectorstore.similarity_search(latest_message, k=20)
-    
-    bm25_retriever = BM25Retriever.from_documents(docs)
-    bm25_retriever.k = 10 
-    
-    hybrid_retriever = EnsembleRetriever(
-        retrievers=[bm25_retriever, retriever],
-        weights=[0.3, 0.7]  
-    )
-
-    rag_prompt = ChatPromptTemplate.from_messages([
-        ("system", vectordb_prompt),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-    ])
-
-    question_answer_chain = create_stuff_documents_chain(llm, rag_prompt)
-    rag_chain = create_retrieval_chain(hybrid_retriever, question_answer_chain)
-    
-    result = rag_chain.invoke({
-        "input": latest_message,
-        "chat_history": chat_history
+    # Hybrid retrieval on the standalone question + answer - LLM responses automatically cached by Redis
+    result = await rag_chain.ainvoke({
+        "input": standalone_question(state),
+        "chat_history": summary_message(state.get("summary")) + list(chat_history)
     })
     
     answer = result["answer"]
-    memory_service.save_conversation(thread_id, latest_message, answer, "vector")
+    memory_service.enqueue_conversation(thread_id, latest_message, answer, "vector")
     
     return {
         "answer": answer,
         "messages": [AIMessage(content=answer)]
     }
 
-def generate_general_answer(state: State):
+async def generate_general_answer(state: State):
     """Generate general answer with conversation context."""
     messages = state["messages"]
     latest_message = messages[-1].content if messages else ""
@@ -175,11 +256,12 @@ def generate_general_answer(state: State):
         - For general questions, provide helpful responses.
         - Use conversation history for context.""")
     ]
+    context_messages.extend(summary_message(state.get("summary")))
     context_messages.extend(recent_messages)
     context_messages.append(HumanMessage(content=latest_message))
     
-    response = llm.invoke(context_messages)
-    memory_service.save_conversation(thread_id, latest_message, response.content, "general")
+    response = await llm.ainvoke(context_messages)
+    memory_service.enqueue_conversation(thread_id, latest_message, response.content, "general")
     
     return {
         "answer": response.content,
@@ -191,16 +273,14 @@ def build_graph():
     """Build and return the compiled graph."""
     graph_builder = StateGraph(State)
     
-    # Add nodes
-    graph_builder.add_node("router", router)
-    graph_builder.add_node("write_query", write_query)
-    graph_builder.add_node("execute_query", execute_query)
-    graph_builder.add_node("generate_sql_answer", generate_sql_answer)
-    graph_builder.add_node("generate_vector_answer", generate_vector_answer)
-    graph_builder.add_node("generate_general_answer", generate_general_answer)
+    # Add nodes (each timed into rag_node_duration_seconds)
+    for node in (manage_context, router, write_query, execute_query,
+                 generate_sql_answer, generate_vector_answer, generate_general_answer):
+        graph_builder.add_node(node.__name__, timed_node(node.__name__, node))
     
     # Add edges
-    graph_builder.add_edge(START, "router")
+    graph_builder.add_edge(START, "manage_context")
+    graph_builder.add_edge("manage_context", "router")
     graph_builder.add_conditional_edges(
         "router",
         lambda x: x["route"],
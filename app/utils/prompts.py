@@ -51,3 +51,32 @@ User Question:
 Q: {question}
 A:
 """
+
+summary_prompt = """
+You maintain a running summary of a conversation between a user and a movie assistant.
+
+Extend the existing summary with the new lines of conversation below. Keep the facts the user may refer back to later: movies, people, titles, numbers and the user's stated preferences. Drop greetings and filler. Write at most {max_words} words of plain prose.
+
+Existing summary: {summary}
+
+New lines of conversation:
+{transcript}
+
+Updated summary:
+"""
+
+condense_prompt = """
+Rewrite the follow-up question from a conversation about movies as a standalone question that can be understood without the conversation.
+
+Instructions:
+- Replace pronouns and references such as "he", "that movie" or "the second one" with the names they refer to.
+- Keep the user's wording otherwise; do not answer the question or add information.
+- If the question is already standalone, return it unchanged.
+- Return only the question.
+
+Conversation:
+{transcript}
+
+Follow-up question: {question}
+Standalone question:
+"""
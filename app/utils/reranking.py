@@ -0,0 +1,108 @@
+import logging
+import math
+from typing import List, Optional, Sequence
+from langchain_core.documents import Document
+from .retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+class ContextReranker:
+    """Reorders fused retrieval candidates and trims them to a prompt budget.
+
+    Candidates are scored with a local cross-encoder when ``model_name`` is
+    set and ``sentence-transformers`` is installed, otherwise lexically: the
+    IDF-weighted share of query terms a chunk contains (IDF over the
+    candidates), blended with its fused rank so dense-only matches are not
+    buried. Going down the ranking, a chunk
+    is dropped when most of its words already appear in a kept chunk of the
+    same scene (overlapping splits of one long scene; the same movie for
+    chunks without scene metadata), and chunks are kept until ``top_k`` or
+    ``token_budget`` estimated tokens is reached.
+    """
+
+    def __init__(self, top_k: int = 6, token_budget: int = 2000, dedupe_overlap: float = 0.6,
+                 model_name: Optional[str] = None, lexical_weight: float = 0.5):
+        self.top_k = top_k
+        self.lexical_weight = lexical_weight
+        self.token_budget = token_budget
+        self.dedupe_overlap = dedupe_overlap
+        self._cross_encoder = self._load_cross_encoder(model_name) if model_name else None
+
+    @staticmethod
+    def _load_cross_encoder(model_name: str):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            logger.warning("sentence-transformers not installed, reranking lexically")
+            return None
+        try:
+            return CrossEncoder(model_name, device="cpu")
+        except Exception as e:
+            logger.warning(f"Could not load reranker {model_name}, reranking lexically: {e}")
+            return None
+
+    @property
+    def uses_model(self) -> bool:
+        return self._cross_encoder is not None
+
+    def _lexical_scores(self, query: str, token_sets: List[set]) -> List[float]:
+        terms = set(tokenize(query))
+        if not terms:
+            return [-float(rank) for rank in range(len(token_sets))]
+        n = len(token_sets)
+        idf = {term: math.log(1 + n / (1 + sum(term in tokens for tokens in token_sets))) for term in terms}
+        total = sum(idf.values())
+        return [
+            self.lexical_weight * sum(idf[term] for term in terms & tokens) / total
+            + (1 - self.lexical_weight) * (1 - rank / n)
+            for rank, tokens in enumerate(token_sets)
+        ]
+
+    def _scores(self, query: str, documents: Sequence[Document], token_sets: List[set]) -> List[float]:
+        if self._cross_encoder is not None:
+            try:
+                return [float(score) for score in self._cross_encoder.predict(
+                    [(query, doc.page_content) for doc in documents]
+                )]
+            except Exception as e:
+                logger.warning(f"Cross-encoder reranking failed, using lexical scores: {e}")
+        return self._lexical_scores(query, token_sets)
+
+    @staticmethod
+    def _scene_key(doc: Document) -> tuple:
+        return doc.metadata.get("source") or doc.metadata.get("movie"), doc.metadata.get("scene") or None
+
+    def rerank(self, query: str, documents: Sequence[Document]) -> List[Document]:
+        """Best candidates first, deduplicated and cut to ``top_k`` / ``token_budget``."""
+        if not documents:
+            return []
+
+        token_sets = [set(tokenize(doc.page_content)) for doc in documents]
+        scores = self._scores(query, documents, token_sets)
+        order = sorted(range(len(documents)), key=lambda i: -scores[i])
+
+        kept: List[int] = []
+        used_tokens = 0
+        for i in order:
+            if len(kept) >= self.top_k:
+                break
+            key = self._scene_key(documents[i])
+            if any(self._overlaps(token_sets[i], token_sets[j])
+                   for j in kept if self._scene_key(documents[j]) == key):
+                continue
+            tokens = estimate_tokens(documents[i].page_content)
+            if kept and used_tokens + tokens > self.token_budget:
+                continue
+            kept.append(i)
+            used_tokens += tokens
+        return [documents[i] for i in kept]
+
+    def _overlaps(self, a: set, b: set) -> bool:
+        smaller = min(len(a), len(b))
+        return smaller > 0 and len(a & b) / smaller >= self.dedupe_overlap
@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import pickle
+import re
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from pydantic import PrivateAttr
+from .metrics import track
+from .tracing import trace_documents
+from .vector_index import EmbeddedVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Tag on the top-level retriever so its results can be picked out of the event stream
+HYBRID_RETRIEVER_TAG = "hybrid_retriever"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def document_key(doc: Document) -> str:
+    """Stable identity of a chunk: the vector store point id, else its text."""
+    point_id = doc.metadata.get("_id")
+    return str(point_id) if point_id is not None else doc.page_content
+
+
+class BM25Index:
+    """BM25 inverted index over the whole chunk corpus.
+
+    Per-term BM25 contributions are precomputed at build time, so a query is a
+    scatter-add over the postings of its terms rather than a pass over every
+    document.
+    """
+
+    def __init__(self, documents: List[Document], fingerprint: str = "", k1: float = 1.5, b: float = 0.75):
+        self.documents = list(documents)
+        self.fingerprint = fingerprint
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        term_freqs: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(self.documents), dtype=np.float32)
+        for doc_id, doc in enumerate(self.documents):
+            tokens = tokenize(doc.page_content)
+            lengths[doc_id] = len(tokens)
+            for token in tokens:
+                postings = term_freqs.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+
+        n_docs = len(self.documents)
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        for term, postings in term_freqs.items():
+            doc_ids = np.fromiter(postings.keys(), dtype=np.int32, count=len(postings))
+            freqs = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            idf = math.log((n_docs - len(postings) + 0.5) / (len(postings) + 0.5) + 1.0)
+            norm = freqs * (k1 + 1) / (freqs + k1 * (1 - b + b * lengths[doc_ids] / (avg_length or 1.0)))
+            self._postings[term] = (doc_ids, (idf * norm).astype(np.float32))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int) -> List[Document]:
+        """Return up to ``k`` documents with a positive BM25 score, best first."""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        matched = False
+        for token in tokenize(query):
+            postings = self._postings.get(token)
+            if postings is not None:
+                np.add.at(scores, postings[0], postings[1])
+                matched = True
+
+        if not matched or k <= 0:
+            return []
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.documents[i] for i in top if scores[i] > 0]
+
+    def save(self, path: str):
+        """Persist the index so restarts skip the corpus scan."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> Optional["BM25Index"]:
+        """Load a persisted index if it was built from the same corpus."""
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable BM25 index at {path}: {e}")
+            return None
+
+        if not isinstance(index, cls) or index.fingerprint != fingerprint:
+            logger.info("Persisted BM25 index is stale, rebuilding")
+            return None
+        return index
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense MMR search fused with corpus-wide BM25 via weighted reciprocal rank fusion.
+
+    The query is embedded once and the vector store is hit once (MMR runs on
+    the vectors returned with the candidates); BM25 and fusion run in-process.
+    With a ``reranker`` (``ContextReranker``) the fused list is reordered and
+    cut to its chunk/token budget before it reaches the prompt. A ``limiter``
+    (``Bulkhead``) caps concurrent async vector searches.
+    """
+
+    vectorstore: VectorStore
+    bm25: BM25Index
+    k: int = 10
+    fetch_k: int = 20
+    lambda_mult: float = 0.7
+    bm25_weight: float = 0.3
+    dense_weight: float = 0.7
+    rrf_k: int = 60
+    reranker: Optional[Any] = None
+    limiter: Optional[Any] = None
+    tags: Optional[List[str]] = [HYBRID_RETRIEVER_TAG]
+
+    def _fuse(self, sparse: List[Document], dense: List[Document]) -> List[Document]:
+        """Weighted reciprocal rank fusion of both result lists."""
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for weight, results in ((self.bm25_weight, sparse), (self.dense_weight, dense)):
+            for rank, doc in enumerate(results, start=1):
+                key = document_key(doc)
+                scores[key] = scores.get(key, 0.0) + weight / (self.rrf_k + rank)
+                documents.setdefault(key, doc)
+
+        return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.vectorstore.embeddings.embed_query(query)
+        with track("vectorstore", "mmr_search"):
+            dense = self.vectorstore.max_marginal_relevance_search_by_vector(
+                embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+        trace_documents(dense)
+        documents = self._fuse(self.bm25.search(query, self.k), dense)
+        return self.reranker.rerank(query, documents) if self.reranker else documents
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = await self.vectorstore.embeddings.aembed_query(query)
+        async with self.limiter.slot() if self.limiter else nullcontext():
+            with track("vectorstore", "mmr_search"):
+                dense = await self.vectorstore.amax_marginal_relevance_search_by_vector(
+                    embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+                )
+        trace_documents(dense)
+        documents = self._fuse(self.bm25.search(query, self.k), dense)
+        if self.reranker is None:
+            return documents
+        if self.reranker.uses_model:
+            # Cross-encoder inference is CPU-bound; keep it off the event loop
+            return await asyncio.to_thread(self.reranker.rerank, query, documents)
+        return self.reranker.rerank(query, documents)
+
+
+class SpeculativeRetriever(BaseRetriever):
+    """Wraps the hybrid retriever so retrieval can start before the route is known.
+
+    ``start(query)`` runs retrieval in the background (while the LLM router is
+    in flight); the next ``ainvoke`` with the same query awaits that result
+    instead of searching again, and ``cancel(query)`` drops it when another
+    route wins. Background runs emit no callbacks, so the stream only sees the
+    retrieval of the vector route. Unclaimed results expire after ``max_age``
+    seconds.
+    """
+
+    retriever: HybridRetriever
+    max_age: float = 60.0
+    tags: Optional[List[str]] = [HYBRID_RETRIEVER_TAG]
+    _pending: Dict[str, Tuple[asyncio.Task, float]] = PrivateAttr(default_factory=dict)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"started": 0, "used": 0, "cancelled": 0, "failed": 0})
+
+    def start(self, query: str):
+        """Begin retrieving ``query`` in the background."""
+        self._expire()
+        if query in self._pending:
+            return
+        task = asyncio.get_running_loop().create_task(self.retriever._aget_relevant_documents(
+            query, run_manager=AsyncCallbackManagerForRetrieverRun.get_noop_manager()
+        ))
+        # Unclaimed failures are logged here rather than as "exception never retrieved"
+        task.add_done_callback(self._log_failure)
+        self._pending[query] = (task, time.monotonic())
+        self._stats["started"] += 1
+
+    def cancel(self, query: str):
+        """Drop a background retrieval another route made unnecessary."""
+        entry = self._pending.pop(query, None)
+        if entry:
+            entry[0].cancel()
+            self._stats["cancelled"] += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age
+        for query in [query for query, (_, started) in self._pending.items() if started < cutoff]:
+            self._pending.pop(query)[0].cancel()
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Speculative retrieval failed: {task.exception()}")
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.retriever._get_relevant_documents(query, run_manager=run_manager)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        entry = self._pending.pop(query, None)
+        if entry:
+            try:
+                documents = await entry[0]
+                self._stats["used"] += 1
+                return documents
+            except Exception:
+                # Already logged by the done callback; retrieve again on the request path
+                self._stats["failed"] += 1
+        return await self.retriever._aget_relevant_documents(query, run_manager=run_manager)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "pending": len(self._pending)}
+
+
+def load_qdrant_corpus(vectorstore, batch_size: int = 1024) -> List[Document]:
+    """Scroll every chunk of a Qdrant collection (payloads only, no vectors)."""
+    documents = []
+    offset = None
+    while True:
+        points, offset = vectorstore.client.scroll(
+            collection_name=vectorstore.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for point in points:
+            metadata = point.payload.get(vectorstore.metadata_payload_key) or {}
+            metadata["_id"] = point.id
+            metadata["_collection_name"] = vectorstore.collection_name
+            documents.append(Document(page_content=point.payload.get(vectorstore.content_payload_key, ""), metadata=metadata))
+        if offset is None:
+            return documents
+
+
+def qdrant_corpus_fingerprint(vectorstore, batch_size: int = 1024) -> str:
+    """Digest of every point id and content hash in a Qdrant collection.
+
+    Uses the ``content_hash`` that ingestion writes into each chunk's
+    metadata, so only ids and that field are scrolled; points without it
+    (ingested elsewhere) are hashed from their page content instead. Edits
+    that keep the point count, or a re-ingest of other text, change the digest.
+    """
+    hash_field = f"{vectorstore.metadata_payload_key}.content_hash"
+    entries = []
+    unhashed = []
+    offset = None
+    while True:
+        points, offset = vectorstore.client.scroll(
+            collection_name=vectorstore.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=[hash_field],
+            with_vectors=False,
+        )
+        for point in points:
+            content_hash = ((point.payload or {}).get(vectorstore.metadata_payload_key) or {}).get("content_hash")
+            if content_hash:
+                entries.append(f"{point.id}:{content_hash}")
+            else:
+                unhashed.append(point.id)
+        if offset is None:
+            break
+
+    for i in range(0, len(unhashed), batch_size):
+        for point in vectorstore.client.retrieve(
+            collection_name=vectorstore.collection_name,
+            ids=unhashed[i:i + batch_size],
+            with_payload=[vectorstore.content_payload_key],
+            with_vectors=False,
+        ):
+            content = (point.payload or {}).get(vectorstore.content_payload_key, "")
+            entries.append(f"{point.id}:{hashlib.sha256(content.encode('utf-8')).hexdigest()}")
+
+    digest = hashlib.sha256()
+    for entry in sorted(entries):
+        digest.update(entry.encode("utf-8") + b"\n")
+    return f"{vectorstore.collection_name}:{len(entries)}:{digest.hexdigest()}"
+
+
+def build_hybrid_retriever(vectorstore, index_path: str, reranker=None, limiter=None) -> HybridRetriever:
+    """Build the hybrid retriever, reusing the persisted BM25 index when the collection is unchanged."""
+    embedded = isinstance(vectorstore, EmbeddedVectorIndex)
+    if embedded:
+        fingerprint = f"snapshot:{vectorstore.fingerprint}"
+    else:
+        fingerprint = qdrant_corpus_fingerprint(vectorstore)
+
+    bm25 = BM25Index.load(index_path, fingerprint)
+    if bm25 is None:
+        corpus = vectorstore.documents if embedded else load_qdrant_corpus(vectorstore)
+        bm25 = BM25Index(corpus, fingerprint=fingerprint)
+        try:
+            bm25.save(index_path)
+        except OSError as e:
+            logger.warning(f"Could not persist BM25 index: {e}")
+        logger.info(f"BM25 index built over {len(bm25)} chunks")
+
+    return HybridRetriever(vectorstore=vectorstore, bm25=bm25, reranker=reranker, limiter=limiter)
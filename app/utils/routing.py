@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("sql", "vector", "general")
+
+# Messages made only of these tokens are small talk
+SMALL_TALK_TOKENS = {
+    "hi", "hello", "hey", "yo", "thanks", "thank", "you", "thx", "ty", "so", "much", "a", "lot",
+    "ok", "okay", "bye", "goodbye", "good", "morning", "afternoon", "evening", "night", "there",
+    "cool", "great", "nice", "awesome", "cheers", "sure", "how", "are", "whats", "up", "again",
+}
+
+# Content questions answered from the script collection
+VECTOR_TERMS = {
+    "plot", "story", "storyline", "theme", "themes", "character", "characters", "motivation",
+    "motivations", "emotion", "emotions", "emotional", "scene", "scenes", "ending", "dialogue",
+    "quote", "quotes", "happens", "happened", "meaning", "symbolism", "relationship", "tone",
+    "summarize", "summary",
+}
+
+# Structured facts answered from the movie database; schema column/table names are added at runtime
+SQL_TERMS = {
+    "directed", "director", "directors", "released", "release", "genre", "genres",
+    "cast", "actor", "actors", "actress", "starring", "starred",
+}
+
+# Everyday words ("How many people...", "list files", "What country...") that only point to SQL
+# when the question is also about movies
+GENERIC_SQL_TERMS = {
+    "year", "years", "country", "origin", "many", "list", "count", "oldest", "newest", "latest",
+}
+MOVIE_TERMS = {"movie", "movies", "film", "films"}
+
+# Schema words too generic to signal the SQL route on their own
+GENERIC_SCHEMA_TERMS = {"id", "name", "title", "movie", "movies"} | GENERIC_SQL_TERMS
+
+# Labelled examples for the embedding-similarity tier
+ROUTER_EXAMPLES = {
+    "sql": [
+        "Which movies were directed by Denis Villeneuve?",
+        "What year was Get Out released?",
+        "List all horror movies in the database",
+        "Who are the actors in 1917?",
+        "How many movies came out after 2015?",
+        "Which country is Blade Runner 2049 from?",
+        "Who directed Get Out?",
+        "What genres does 1917 belong to?",
+        "Show me movies starring Ryan Gosling",
+        "What is the newest movie you have?",
+        "Which director has the most movies?",
+        "Give me the cast of Blade Runner 2049",
+    ],
+    "vector": [
+        "What is the plot of 1917?",
+        "Why does K believe he is special in Blade Runner 2049?",
+        "How does Chris feel when he meets Rose's family?",
+        "What happens at the end of Get Out?",
+        "Describe the relationship between Schofield and Blake",
+        "What are the main themes of Blade Runner 2049?",
+        "What does the sunken place symbolize?",
+        "Summarize the opening scene of 1917",
+        "What is Deckard's motivation?",
+        "What does Joi say to K?",
+        "How is tension built during the garden party?",
+        "What is the emotional tone of the final act?",
+    ],
+    "general": [
+        "Hi, how are you?",
+        "Thanks for the help!",
+        "What can you do?",
+        "Tell me a joke",
+        "What's the weather like today?",
+        "Goodbye",
+        "Who are you?",
+        "Can you help me with my homework?",
+        "What is the capital of France?",
+        "Nice, that was useful",
+        "How do I bake bread?",
+        "What time is it?",
+    ],
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower().replace("'", ""))
+
+
+def schema_terms(table_columns: Dict[str, Iterable[str]]) -> set:
+    """Words from table and column names (``release_year`` -> ``release``, ``year``)."""
+    terms = set()
+    for table, columns in table_columns.items():
+        for name in [table, *columns]:
+            terms.update(_tokens(name.replace("_", " ")))
+    return terms - GENERIC_SCHEMA_TERMS
+
+
+class TieredRouter:
+    """Local routing tiers in front of the LLM router.
+
+    Tier 1 matches small talk and schema/content keywords (generic words such
+    as "many" or "year" count for SQL only next to "movie"/"film"); tier 2 compares the
+    question embedding with labelled examples. A tier answers only when exactly
+    one route is a clear winner; anything else is left to the LLM.
+    """
+
+    def __init__(self, embedder: Embeddings, extra_sql_terms: Iterable[str] = (),
+                 min_similarity: float = 0.55, margin: float = 0.08, top_k: int = 3, enabled: bool = True):
+        self.embedder = embedder
+        self.sql_terms = SQL_TERMS | set(extra_sql_terms)
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.top_k = top_k
+        self.enabled = enabled
+        self._example_matrix: Optional[np.ndarray] = None
+        self._example_labels: Optional[np.ndarray] = None
+        self._examples_lock = asyncio.Lock()
+        self._stats = {tier: {"decisions": 0, "seconds": 0.0} for tier in ("rules", "embedding", "llm")}
+
+    def classify_rules(self, question: str) -> Optional[str]:
+        """Keyword tier: small talk, or exactly one of SQL/vector vocabularies matched."""
+        tokens = _tokens(question)
+        if not tokens:
+            return "general"
+        if all(token in SMALL_TALK_TOKENS for token in tokens):
+            return "general"
+
+        token_set = set(tokens)
+        sql_hit = bool(token_set & self.sql_terms) or bool(
+            token_set & GENERIC_SQL_TERMS and token_set & MOVIE_TERMS)
+        vector_hit = bool(token_set & VECTOR_TERMS)
+        if sql_hit != vector_hit:
+            return "sql" if sql_hit else "vector"
+        return None
+
+    async def _ensure_examples(self) -> bool:
+        if self._example_matrix is not None:
+            return True
+        async with self._examples_lock:
+            if self._example_matrix is not None:
+                return True
+            try:
+                labels, questions = zip(*[(route, q) for route in ROUTES for q in ROUTER_EXAMPLES[route]])
+                vectors = await asyncio.gather(*(self.embedder.aembed_query(q) for q in questions))
+                matrix = np.asarray(vectors, dtype=np.float32)
+                matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+                self._example_labels = np.asarray(labels)
+                self._example_matrix = matrix
+                return True
+            except Exception as e:
+                logger.warning(f"Router example embedding failed, skipping embedding tier: {e}")
+                return False
+
+    async def classify_embedding(self, question: str) -> Optional[str]:
+        """Embedding tier: mean of the top-k example similarities per route, with a margin."""
+        if not await self._ensure_examples():
+            return None
+
+        vector = np.asarray(await self.embedder.aembed_query(question), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        similarities = self._example_matrix @ vector
+
+        scores = {}
+        for route in ROUTES:
+            route_scores = similarities[self._example_labels == route]
+            top = np.sort(route_scores)[-self.top_k:]
+            scores[route] = float(top.mean())
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best, runner_up = ranked[0], ranked[1]
+        if scores[best] >= self.min_similarity and scores[best] - scores[runner_up] >= self.margin:
+            return best
+        return None
+
+    async def classify(self, question: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return ``(route, tier)`` from the local tiers, or ``(None, None)`` to defer to the LLM."""
+        if not self.enabled:
+            return None, None
+
+        start = time.perf_counter()
+        route = self.classify_rules(question)
+        if route:
+            self._record("rules", time.perf_counter() - start)
+            return route, "rules"
+
+        try:
+            route = await self.classify_embedding(question)
+        except Exception as e:
+            logger.warning(f"Embedding router tier failed: {e}")
+            route = None
+        if route:
+            self._record("embedding", time.perf_counter() - start)
+            return route, "embedding"
+        return None, None
+
+    def record_llm_decision(self, seconds: float):
+        """Record an LLM router call so saved latency can be estimated."""
+        self._record("llm", seconds)
+
+    def _record(self, tier: str, seconds: float):
+        self._stats[tier]["decisions"] += 1
+        self._stats[tier]["seconds"] += seconds
+
+    def get_stats(self) -> dict:
+        """Per-tier decision counts and latency, plus LLM time saved by the local tiers."""
+        llm = self._stats["llm"]
+        avg_llm = llm["seconds"] / llm["decisions"] if llm["decisions"] else None
+        local_decisions = self._stats["rules"]["decisions"] + self._stats["embedding"]["decisions"]
+        local_seconds = self._stats["rules"]["seconds"] + self._stats["embedding"]["seconds"]
+
+        stats = {
+            tier: {
+                "decisions": values["decisions"],
+                "avg_ms": round(1000 * values["seconds"] / values["decisions"], 3) if values["decisions"] else 0.0,
+            }
+            for tier, values in self._stats.items()
+        }
+        stats["enabled"] = self.enabled
+        stats["estimated_saved_seconds"] = (
+            round(local_decisions * avg_llm - local_seconds, 3) if avg_llm is not None else None
+        )
+        return stats
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from .metrics import track
+
+logger = logging.getLogger(__name__)
+
+# Quoted literals/identifiers are kept verbatim; everything else is case- and whitespace-folded
+_SQL_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+
+
+def normalize_sql(query: str) -> str:
+    """Canonical form of a query for cache keys: one space between tokens, keywords lowercased."""
+    parts = []
+    for token in _SQL_TOKEN_PATTERN.findall(query.strip().rstrip(";").strip()):
+        if token.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif token[0] in "'\"":
+            parts.append(token)
+        else:
+            parts.append(token.lower())
+    return "".join(parts).strip()
+
+
+def _truncate(value, length: int):
+    if isinstance(value, str) and len(value) > length:
+        return value[:length - 3] + "..."
+    return value
+
+
+class ReadOnlySQLExecutor:
+    """Runs generated SQL on a pool of read-only SQLite connections with a result cache.
+
+    Connections open the file with ``mode=ro`` and ``PRAGMA query_only``, so a
+    generated ``DELETE``/``UPDATE`` fails instead of touching the data. Each
+    query has a wall-clock timeout (enforced with a progress handler) and a
+    row cap. Results are cached by normalized SQL text and database file
+    version, so an edited database never serves stale rows.
+
+    Output matches ``QuerySQLDatabaseTool``: ``str`` of a list of row tuples,
+    ``""`` for no rows, and ``"Error: ..."`` on failure.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 4, timeout: float = 5.0, max_rows: int = 100,
+                 max_string_length: int = 300, cache_max_entries: int = 512, mmap_size: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.max_string_length = max_string_length
+        self.cache_max_entries = cache_max_entries
+        self.mmap_size = mmap_size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, Tuple[int, int]], str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "errors": 0, "timeouts": 0, "truncated": 0}
+
+    # Connection pool
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=self.timeout)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no database connection free within {self.timeout}s") from None
+
+    def _release(self, conn: sqlite3.Connection):
+        self._pool.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._pool_lock:
+            self._opened -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                self._discard(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+    # Cache
+
+    def _file_version(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.db_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return 0, 0
+
+    def _cache_get(self, key) -> Optional[str]:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _cache_put(self, key, result: str):
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    # Execution
+
+    def _execute(self, query: str) -> str:
+        with track("sqlite", "query"):
+            return self._execute_query(query)
+
+    def _execute_query(self, query: str) -> str:
+        conn = self._acquire()
+        deadline = time.monotonic() + self.timeout
+        conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 1000)
+        try:
+            cursor = conn.execute(query)
+            rows = cursor.fetchmany(self.max_rows + 1) if cursor.description else []
+            cursor.close()
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                self._stats["timeouts"] += 1
+                raise TimeoutError(f"query exceeded {self.timeout}s") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+        if len(rows) > self.max_rows:
+            self._stats["truncated"] += 1
+            logger.info(f"SQL result truncated to {self.max_rows} rows")
+            rows = rows[:self.max_rows]
+        if not rows:
+            return ""
+        return str([tuple(_truncate(value, self.max_string_length) for value in row) for row in rows])
+
+    def run(self, query: str) -> str:
+        """Execute ``query``, serving repeats of the same SQL from the cache."""
+        key = (normalize_sql(query), self._file_version())
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached
+
+        self._stats["misses"] += 1
+        try:
+            result = self._execute(query)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"SQL execution failed: {e}")
+            return f"Error: {e}"
+
+        self._cache_put(key, result)
+        return result
+
+    async def arun(self, query: str) -> str:
+        """Async ``run``; cache hits return without leaving the event loop."""
+        key = (normalize_sql(query), self._file_version())
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return cached
+        return await asyncio.to_thread(self.run, query)
+
+    def get_cache_stats(self) -> dict:
+        """Get SQL result cache and pool statistics."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._cache),
+            "pool_size": self.pool_size,
+            "open_connections": self._opened,
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
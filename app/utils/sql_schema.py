@@ -0,0 +1,138 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set
+from langchain_community.utilities import SQLDatabase
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ed", "or", "er", "es", "s", "e")
+
+# Question words that refer to a schema term under another name
+SCHEMA_SYNONYMS = {
+    "actor": "cast", "actors": "cast", "actress": "cast", "star": "cast", "starring": "cast", "starred": "cast",
+    "film": "movie", "films": "movie", "when": "year", "country": "origin", "type": "genre", "category": "genre",
+}
+
+
+# Column/table words that say nothing about which table is meant
+GENERIC_TERMS = {"id", "name"}
+
+
+def _stem(token: str) -> str:
+    """Crude suffix stripping so ``directed``/``director`` and ``genre``/``genres`` meet."""
+    for _ in range(2):
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+                token = token[:-len(suffix)]
+                break
+    return token
+
+
+def _terms(text: str) -> Set[str]:
+    tokens = _TOKEN_PATTERN.findall(text.lower().replace("_", " "))
+    return {_stem(SCHEMA_SYNONYMS.get(token, token)) for token in tokens}
+
+
+class SchemaContext:
+    """SQL prompt schema, computed once and refreshed when the database file changes.
+
+    ``SQLDatabase.get_context()`` reflects the schema and runs a sampling query
+    per table on every call. This caches each table's info (DDL + sample rows)
+    keyed on the file's mtime and, for schemas of at least ``prune_min_tables``
+    tables, keeps only the tables whose names or columns the question mentions,
+    the hub table(s) most referenced by foreign keys, and any join table
+    linking two kept tables.
+    """
+
+    def __init__(self, db_uri: str, db_path: str, sample_rows: int = 3, prune_min_tables: int = 8):
+        self.db_uri = db_uri
+        self.db_path = db_path
+        self.sample_rows = sample_rows
+        self.prune_min_tables = prune_min_tables
+        self.dialect: Optional[str] = None
+        self._version: Optional[int] = None
+        self._tables: List[str] = []
+        self._table_info: Dict[str, str] = {}
+        self._columns: Dict[str, List[str]] = {}
+        self._index: Dict[str, Set[str]] = {}
+        self._links: Dict[str, Set[str]] = {}
+        self._hubs: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _file_version(self) -> Optional[int]:
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_if_changed(self):
+        version = self._file_version()
+        if self._table_info and version == self._version:
+            return
+
+        with self._lock:
+            if self._table_info and version == self._version:
+                return
+
+            db = SQLDatabase.from_uri(self.db_uri, sample_rows_in_table_info=self.sample_rows)
+            tables = sorted(db.get_usable_table_names())
+            table_info = {table: db.get_table_info([table]) for table in tables}
+            columns = {table: [column["name"] for column in db._inspector.get_columns(table)] for table in tables}
+
+            index: Dict[str, Set[str]] = {}
+            links: Dict[str, Set[str]] = {table: set() for table in tables}
+            referenced = {table: 0 for table in tables}
+            for table in tables:
+                for term in _terms(" ".join([table, *columns[table]])) - GENERIC_TERMS:
+                    index.setdefault(term, set()).add(table)
+                for fk in db._inspector.get_foreign_keys(table):
+                    referred = fk.get("referred_table")
+                    if referred in links:
+                        links[table].add(referred)
+                        referenced[referred] += 1
+            # Terms shared by most tables (e.g. "movie" in movies/movie_cast/movie_genre) don't discriminate
+            index = {term: names for term, names in index.items() if len(names) <= len(tables) / 2}
+            top_references = max(referenced.values(), default=0)
+
+            self.dialect = db.dialect
+            self._tables, self._table_info, self._columns = tables, table_info, columns
+            self._index, self._links = index, links
+            self._hubs = {table for table, count in referenced.items() if top_references and count == top_references}
+            self._version = version
+            logger.info(f"SQL schema context cached for {len(tables)} tables")
+
+    def refresh(self):
+        """Reload the schema if the database file changed; a stat call otherwise."""
+        self._refresh_if_changed()
+
+    def get_columns(self) -> Dict[str, List[str]]:
+        """Column names per usable table."""
+        self._refresh_if_changed()
+        return dict(self._columns)
+
+    def select_tables(self, text: str) -> List[str]:
+        """Tables relevant to ``text``; all tables if nothing in it matches the schema."""
+        self._refresh_if_changed()
+        matched = set()
+        for term in _terms(text):
+            matched |= self._index.get(term, set())
+        if not matched:
+            return list(self._tables)
+
+        selected = matched | self._hubs
+        # Keep join paths intact: add tables whose foreign keys all point into the selection
+        for table, referred in self._links.items():
+            if len(referred) >= 2 and referred <= selected:
+                selected.add(table)
+        return [table for table in self._tables if table in selected]
+
+    def get_table_info(self, text: Optional[str] = None) -> str:
+        """Schema text for the SQL prompt, pruned to the relevant tables for large schemas."""
+        self._refresh_if_changed()
+        tables = self._tables
+        if text and len(tables) >= self.prune_min_tables:
+            tables = self.select_tables(text)
+        return "\n\n".join(self._table_info[table] for table in tables)
@@ -8,9 +8,15 @@ class State(TypedDict):
     # Message history with proper accumulation
     messages: Annotated[Sequence[BaseMessage], add_messages]
     
+    # Running summary of turns trimmed from the message window
+    summary: Optional[str]
+    
     # Thread identification for caching
     thread_id: Optional[str]
     
+    # Latest message rewritten to stand on its own (routing, retrieval, SQL generation)
+    standalone_question: Optional[str]
+    
     # Current processing state
     route: Optional[Literal["sql", "vector", "general"]]
     query: Optional[str]
@@ -0,0 +1,157 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+
+class RequestTrace:
+    """Everything a replay needs from one request: LLM outputs, retrieved chunk ids and per-call timings."""
+
+    __slots__ = ("thread_id", "question", "started", "route", "llm", "documents", "calls")
+
+    def __init__(self, thread_id: str, question: str):
+        self.thread_id = thread_id
+        self.question = question
+        self.started = time.time()
+        self.route: Optional[str] = None
+        # [node, ms, output]; output is the text, or the arguments of a structured (tool-call) reply
+        self.llm: List[list] = []
+        # One [[chunk id, content length], ...] list per vector search
+        self.documents: List[list] = []
+        # [key, ms] per backend call and node, keyed like the request timings
+        self.calls: List[list] = []
+
+    def to_json(self, total_seconds: float) -> str:
+        return json.dumps({
+            "v": TRACE_VERSION,
+            "t": round(self.started, 3),
+            "id": self.thread_id,
+            "q": self.question,
+            "route": self.route,
+            "ms": round(1000 * total_seconds, 2),
+            "llm": self.llm,
+            "docs": self.documents,
+            "calls": self.calls,
+        }, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+_active_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("active_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _active_trace.get()
+
+
+def trace_call(key: str, seconds: float):
+    """Add one timed call to the request being recorded, if any."""
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.calls.append([key, round(1000 * seconds, 2)])
+
+
+def trace_documents(documents: list):
+    """Add the chunks one vector search returned to the request being recorded, if any."""
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.documents.append([
+            [doc.metadata.get("_id"), len(doc.page_content)] for doc in documents
+        ])
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Chat model callback that adds each LLM reply (node, latency, output) to the request being recorded."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[Any, tuple] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        if _active_trace.get() is not None:
+            self._starts[run_id] = (time.perf_counter(), (metadata or {}).get("langgraph_node"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        entry = self._starts.pop(run_id, None)
+        trace = _active_trace.get()
+        if entry is None or trace is None:
+            return
+        start, node = entry
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        tool_calls = getattr(message, "tool_calls", None)
+        output = tool_calls[0]["args"] if tool_calls else (message.content if message else response.generations[0][0].text)
+        trace.llm.append([node, round(1000 * (time.perf_counter() - start), 2), output])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+
+
+class TraceRecorder:
+    """Samples chat requests into a compact JSONL recording for ``python -m benchmarks.replay``.
+
+    Disabled when ``path`` is empty. Each sampled request becomes one line;
+    recording stops once the file reaches ``max_bytes``.
+    """
+
+    def __init__(self, path: str = "", sample_rate: float = 0.01, max_bytes: int = 100_000_000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._file = None
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.sample_rate > 0
+
+    @contextmanager
+    def record(self, thread_id: str, question: str) -> Iterator[Optional[RequestTrace]]:
+        """Trace the block if this request is sampled; yields the trace (or None) and writes it on exit."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = RequestTrace(thread_id, question)
+        token = _active_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            _active_trace.reset(token)
+            self._write(trace.to_json(time.perf_counter() - start))
+
+    def _write(self, line: str):
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                if self._file.tell() >= self.max_bytes:
+                    logger.warning(f"Trace recording {self.path} reached {self.max_bytes} bytes, stopping")
+                    self.path = ""
+                    return
+                self._file.write(line + "\n")
+                self._file.flush()
+                self._stats["recorded"] += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"Failed to write request trace: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> dict:
+        return {"enabled": self.enabled, "path": self.path, "sample_rate": self.sample_rate, **self._stats}
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+META_FILE = "meta.json"
+
+
+async def export_snapshot(client, collection_name: str, directory: str, embedding_model: str = "",
+                          batch_size: int = 1024) -> dict:
+    """Export a Qdrant collection (vectors + payloads) to a snapshot ``EmbeddedVectorIndex`` can load.
+
+    ``client`` is an ``AsyncQdrantClient``. Vectors are L2-normalized and
+    written straight into a float32 ``.npy`` file as the collection is
+    scrolled; ``meta.json`` is written last, so a snapshot is only valid once
+    complete.
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = (await client.count(collection_name, exact=True)).count
+    vectors_path = os.path.join(directory, VECTORS_FILE)
+    documents_path = os.path.join(directory, DOCUMENTS_FILE)
+
+    matrix = None
+    row = 0
+    offset = None
+    with open(f"{documents_path}.tmp", "w", encoding="utf-8") as documents:
+        while row < count:
+            points, offset = await client.scroll(
+                collection_name, limit=batch_size, offset=offset, with_payload=True, with_vectors=True
+            )
+            for point in points[:count - row]:
+                vector = np.asarray(point.vector, dtype=np.float32)
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(f"{vectors_path}.tmp", mode="w+", dtype=np.float32,
+                                                       shape=(count, vector.shape[0]))
+                norm = np.linalg.norm(vector)
+                matrix[row] = vector / norm if norm else vector
+                payload = point.payload or {}
+                documents.write(json.dumps({
+                    "id": point.id,
+                    "page_content": payload.get("page_content", ""),
+                    "metadata": payload.get("metadata") or {},
+                }) + "\n")
+                row += 1
+            if offset is None:
+                break
+
+    if matrix is None:
+        raise ValueError(f"Qdrant collection {collection_name} is empty")
+    matrix.flush()
+    del matrix
+    os.replace(f"{vectors_path}.tmp", vectors_path)
+    os.replace(f"{documents_path}.tmp", documents_path)
+
+    meta = {
+        "collection": collection_name,
+        "count": row,
+        "embedding_model": embedding_model,
+        "exported_at": time.time(),
+    }
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def _mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """Maximal marginal relevance over unit vectors (dot product is cosine similarity)."""
+    if not len(candidates) or k <= 0:
+        return []
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * pairwise[:, selected].max(axis=1)
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+class EmbeddedVectorIndex(VectorStore):
+    """Read-only in-process vector store over a snapshot exported from Qdrant.
+
+    The normalized float32 vectors are memory-mapped, so startup does not
+    copy them and workers on one host share the pages. Search is a
+    brute-force matrix-vector product, or an HNSW graph when ``use_hnsw`` is
+    set and ``hnswlib`` is installed. Documents carry ``_id`` and
+    ``_collection_name`` like ``QdrantVectorStore`` results.
+    """
+
+    def __init__(self, embedding: Embeddings, vectors: np.ndarray, documents: List[Document],
+                 fingerprint: str = "", use_hnsw: bool = False, hnsw_ef: int = 64):
+        if len(vectors) != len(documents):
+            raise ValueError(f"Snapshot has {len(vectors)} vectors but {len(documents)} documents")
+        self._embedding = embedding
+        self.vectors = vectors
+        self.documents = documents
+        self.fingerprint = fingerprint
+        self._hnsw = self._build_hnsw(hnsw_ef) if use_hnsw else None
+
+    @classmethod
+    def from_snapshot(cls, directory: str, embedding: Embeddings, embedding_model: str = "",
+                      use_hnsw: bool = False) -> "EmbeddedVectorIndex":
+        """Load a snapshot written by ``export_snapshot``."""
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if embedding_model and meta.get("embedding_model") and meta["embedding_model"] != embedding_model:
+            logger.warning(f"Vector snapshot was embedded with {meta['embedding_model']}, queries use {embedding_model}")
+
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        documents = []
+        with open(os.path.join(directory, DOCUMENTS_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                metadata = record["metadata"]
+                metadata["_id"] = record["id"]
+                metadata["_collection_name"] = meta["collection"]
+                documents.append(Document(page_content=record["page_content"], metadata=metadata))
+
+        logger.info(f"Embedded vector index loaded: {len(documents)} chunks from {meta['collection']}")
+        return cls(embedding, vectors, documents, fingerprint=f"{meta['collection']}:{meta['count']}:{meta['exported_at']}",
+                   use_hnsw=use_hnsw)
+
+    def _build_hnsw(self, ef: int):
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("hnswlib not installed, embedded vector index uses brute-force search")
+            return None
+        index = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+        index.init_index(max_elements=len(self.vectors), ef_construction=200, M=16)
+        index.add_items(np.asarray(self.vectors), np.arange(len(self.vectors)))
+        index.set_ef(ef)
+        return index
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    def _query(self, embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def _top(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and cosine similarities of the ``k`` nearest vectors, best first."""
+        k = min(k, len(self.vectors))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self._hnsw is not None:
+            ef = max(k, self._hnsw.ef)
+            self._hnsw.set_ef(ef)
+            labels, distances = self._hnsw.knn_query(query, k=k)
+            return labels[0].astype(np.int64), 1.0 - distances[0]
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        indices, scores = self._top(self._query(embedding), k)
+        return [(self.documents[i], float(score)) for i, score in zip(indices, scores)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        query = self._query(embedding)
+        candidates, _ = self._top(query, fetch_k)
+        selected = _mmr(query, np.asarray(self.vectors[candidates]), k, lambda_mult)
+        return [self.documents[candidates[i]] for i in selected]
+
+    async def amax_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                       lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        # Sub-millisecond for this corpus size; cheaper inline than a thread-pool hop
+        return self.max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, **kwargs)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(embedding, k)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("EmbeddedVectorIndex is read-only; ingest into Qdrant and export a new snapshot")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "EmbeddedVectorIndex":
+        raise NotImplementedError("Build an EmbeddedVectorIndex with from_snapshot")
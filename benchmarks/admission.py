@@ -0,0 +1,149 @@
+"""
+Admission control benchmark: an overload burst with and without the backend bulkheads.
+
+The stub LLM stands in for a provider with limited capacity: beyond
+``--llm-capacity`` concurrent calls every call slows down in proportion
+(processor sharing), which is roughly what rate-limited Gemini calls with
+client retries look like from the outside. Requests arrive open-loop at
+``--rate`` per second for ``--duration`` seconds through ``POST /api/chat``.
+
+- ``unlimited``: every bulkhead disabled; all requests are admitted and
+  queue inside the overloaded provider.
+- ``bulkhead``: the LLM bulkhead is set to ``--llm-capacity`` slots with
+  ``--llm-queue`` waiting and a ``--queue-timeout`` deadline; excess
+  requests are shed with 429/503 and a ``Retry-After`` header.
+
+Reports status counts, latency of the successful requests and goodput
+(successful answers within ``--slo`` seconds per second). Keep ``--rate``
+below what one event loop can process with ``--llm-capacity 1000``, or the
+run measures CPU saturation instead of the provider.
+
+Usage:
+    python -m benchmarks.admission --rate 60 --duration 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+
+from .chat_load import QUESTIONS
+from .harness import percentile
+from .stubs import StubChatModel, install_stub_models, use_memory_checkpointer
+
+# Calls currently inside the simulated provider
+_provider = {"active": 0}
+
+
+class SaturatingChatModel(StubChatModel):
+    """Stub LLM whose calls slow down once more than ``capacity`` run at once."""
+
+    capacity: int = 4
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        _provider["active"] += 1
+        try:
+            # Beyond capacity each call gets a capacity/active share of the provider
+            await asyncio.sleep(self.latency * max(0.0, _provider["active"] / self.capacity - 1))
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        finally:
+            _provider["active"] -= 1
+
+
+def configure(name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+    """Resize a bulkhead between runs (no calls are in flight)."""
+    from app.utils.admission import bulkheads
+
+    bulkhead = bulkheads[name]
+    bulkhead.max_concurrency = max_concurrency
+    bulkhead.max_queue = max_queue
+    bulkhead.queue_timeout = queue_timeout
+
+
+async def burst(client, args, tag: str) -> dict:
+    statuses: Counter = Counter()
+    latencies = []
+
+    async def _one(i: int):
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={
+            "question": QUESTIONS[i % len(QUESTIONS)], "thread_id": f"admission-{tag}-{i}",
+        })
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(args.rate * args.duration)):
+        # Open loop: arrivals keep coming at --rate whatever the latency
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "statuses": statuses,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "goodput": sum(seconds <= args.slo for seconds in latencies) / elapsed,
+    }
+
+
+async def main(args):
+    # Every request reaches the graph; answer caches would hide the overload
+    os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency,
+                        llm_class=SaturatingChatModel)
+    await use_memory_checkpointer()
+
+    import httpx
+    from app.factories import models
+    from app.main import app
+
+    object.__setattr__(models.llm, "capacity", args.llm_capacity)
+    logging.disable(logging.WARNING)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = {}
+        for mode in ("unlimited", "bulkhead"):
+            for name in ("llm", "embedder", "vectorstore"):
+                configure(name, 0, 0, 0.0)
+            if mode == "bulkhead":
+                configure("llm", args.llm_capacity, args.llm_queue, args.queue_timeout)
+            results[mode] = await burst(client, args, mode)
+
+    offered = int(args.rate * args.duration)
+    print(f"\n{offered} requests at {args.rate:g}/s; LLM capacity {args.llm_capacity} calls "
+          f"of {1000 * args.llm_latency:.0f} ms; SLO {args.slo:g}s")
+    print(f"{'mode':<11}{'200':>6}{'429':>6}{'503':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'goodput/s':>11}")
+    for mode, result in results.items():
+        statuses = result["statuses"]
+        print(f"{mode:<11}{statuses[200]:>6}{statuses[429]:>6}{statuses[503]:>6}"
+              f"{1000 * result['p50']:>9.0f}{1000 * result['p95']:>9.0f}{1000 * result['p99']:>9.0f}"
+              f"{result['goodput']:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=60.0, help="arrivals per second")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of arrivals")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="seconds per stub LLM call at capacity")
+    parser.add_argument("--llm-capacity", type=int, default=4, help="concurrent LLM calls before calls slow down")
+    parser.add_argument("--llm-queue", type=int, default=16, help="LLM calls allowed to wait for a slot")
+    parser.add_argument("--queue-timeout", type=float, default=0.5, help="seconds an LLM call may wait")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="seconds per stub embedding call")
+    parser.add_argument("--slo", type=float, default=1.0, help="latency target for goodput, seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Batch benchmark: a sequential loop over POST /api/chat vs one POST /api/chat/batch.
+
+The loop is what the nightly evaluation and pre-warm jobs did: one HTTP call
+per question, each waiting for the previous one. Every question is made
+unique (suffix) and sent on its own thread so neither path benefits from the
+semantic answer cache. Embedding calls to the stub provider are counted to
+show the effect of batching them.
+
+Usage:
+    python -m benchmarks.chat_batch --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from .stubs import install_stub_models, use_memory_checkpointer
+from .chat_load import QUESTIONS
+
+
+def _payload(prefix: str, total: int) -> list:
+    return [
+        {"question": f"{QUESTIONS[i % len(QUESTIONS)]} #{prefix}{i}", "thread_id": f"{prefix}-{i}"}
+        for i in range(total)
+    ]
+
+
+def _count_calls(embeddings, counter: Counter):
+    """Wrap the stub provider's async methods to count calls."""
+    for name in ("aembed_query", "aembed_documents"):
+        original = getattr(embeddings, name)
+
+        async def counted(arg, _original=original, _name=name):
+            counter[_name] += 1
+            return await _original(arg)
+
+        setattr(embeddings, name, counted)
+
+
+async def main(args):
+    models = install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+    await use_memory_checkpointer()
+
+    import httpx
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    calls = Counter()
+    _count_calls(models.embedder.embeddings, calls)
+    models.embedder.abatch_query = models.embedder.embeddings.aembed_documents
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'mode':<12}{'requests':>10}{'seconds':>10}{'req/s':>10}{'embed calls':>13}  routes")
+
+        calls.clear()
+        routes = Counter()
+        start = time.perf_counter()
+        for item in _payload("loop", args.requests):
+            response = await client.post("/api/chat", json=item)
+            response.raise_for_status()
+            routes[response.json()["route"]] += 1
+        elapsed = time.perf_counter() - start
+        print(f"{'loop':<12}{args.requests:>10}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}"
+              f"{sum(calls.values()):>13}  {dict(routes)}")
+
+        calls.clear()
+        start = time.perf_counter()
+        response = await client.post("/api/chat/batch", json={
+            "requests": _payload("batch", args.requests),
+            "max_concurrency": args.concurrency,
+        })
+        response.raise_for_status()
+        elapsed = time.perf_counter() - start
+        results = response.json()["results"]
+        routes = Counter(result["route"] for result in results)
+        item_ms = sorted(result["elapsed_ms"] for result in results)
+        print(f"{'batch':<12}{args.requests:>10}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}"
+              f"{sum(calls.values()):>13}  {dict(routes)}")
+        print(f"batch per-item ms: p50 {item_ms[len(item_ms) // 2]:.1f}, max {item_ms[-1]:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stub LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="seconds per stub embedding call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Load benchmark for POST /api/chat against stubbed LLM/vector backends.
+
+Runs the same workload twice through the FastAPI app in-process:
+
+- ``sequential``: one request in flight at a time. This is the throughput the
+  old synchronous ``process_question`` gave a single uvicorn worker, because
+  ``graph.invoke`` blocked the event loop for the whole pipeline.
+- ``concurrent``: ``--concurrency`` requests in flight on one event loop,
+  which is what the ``ainvoke`` path allows.
+
+Usage:
+    python -m benchmarks.chat_load --requests 200 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from .stubs import install_stub_models, use_memory_checkpointer
+
+QUESTIONS = [
+    "Hi there!",
+    "Which movies were directed by Sam Mendes?",
+    "What is the plot of Blade Runner 2049?",
+    "List the genres of Get Out",
+    "What is Chris's motivation in Get Out?",
+    "Thanks, that helps",
+]
+
+
+async def _run(client, total: int, concurrency: int, routes: Counter) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(i: int):
+        async with semaphore:
+            response = await client.post("/api/chat", json={
+                "question": QUESTIONS[i % len(QUESTIONS)],
+                "thread_id": f"bench-{concurrency}-{i}",
+            })
+            response.raise_for_status()
+            routes[response.json().get("route")] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+    await use_memory_checkpointer()
+
+    import httpx
+    from app.main import app
+
+    logging.disable(logging.INFO)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'mode':<12}{'requests':>10}{'in-flight':>11}{'seconds':>10}{'req/s':>10}  routes")
+        for mode, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+            routes = Counter()
+            elapsed = await _run(client, args.requests, concurrency, routes)
+            print(f"{mode:<12}{args.requests:>10}{concurrency:>11}{elapsed:>10.2f}"
+                  f"{args.requests / elapsed:>10.1f}  {dict(routes)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stub LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="seconds per stub embedding call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""
+Request coalescing benchmark: a spike of identical questions from fresh threads.
+
+``--requests`` requests spread over ``--distinct`` popular questions arrive
+at once (as after a release announcement), each on its own thread, through
+``RAGService.process_question``. The run is repeated with coalescing off and
+on, starting from empty semantic and embedding caches each time, and reports LLM calls,
+embedding calls, requests shed by the LLM bulkhead and latency percentiles
+of the answered ones.
+
+Usage:
+    python -m benchmarks.coalescing --requests 200 --distinct 4
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+
+from .chat_load import QUESTIONS
+from .harness import percentile
+from .stubs import StubChatModel, StubEmbeddings, install_stub_models, use_memory_checkpointer
+
+_calls = {"llm": 0, "embed": 0}
+
+
+class CountingChatModel(StubChatModel):
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        _calls["llm"] += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+class CountingEmbeddings(StubEmbeddings):
+    async def aembed_documents(self, texts):
+        _calls["embed"] += 1
+        return await super().aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        _calls["embed"] += 1
+        return await super().aembed_query(text)
+
+
+async def spike(args, tag: str) -> dict:
+    from app.factories import models
+    from app.schemas.chat import ChatRequest
+    from app.services.rag_service import rag_service
+    from app.services.semantic_cache_service import semantic_cache_service
+    from app.utils.admission import Overloaded
+
+    semantic_cache_service.clear()
+    models.embedder._lru.clear()
+    _calls.update(llm=0, embed=0)
+    questions = QUESTIONS[1:1 + args.distinct]
+    latencies = []
+    shed = 0
+
+    async def _one(i: int):
+        nonlocal shed
+        start = time.perf_counter()
+        try:
+            await rag_service.process_question(ChatRequest(
+                question=questions[i % len(questions)], thread_id=f"coalesce-{tag}-{i}",
+            ))
+        except Overloaded:
+            shed += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        **_calls,
+        "shed": shed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "elapsed": elapsed,
+    }
+
+
+async def main(args):
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency,
+                        llm_class=CountingChatModel, embeddings_class=CountingEmbeddings)
+    await use_memory_checkpointer()
+
+    from app.services.rag_service import rag_service
+
+    logging.disable(logging.WARNING)
+    results = {}
+    for enabled in (False, True):
+        rag_service.inflight.enabled = enabled
+        results[enabled] = await spike(args, "on" if enabled else "off")
+
+    print(f"\n{args.requests} concurrent requests over {args.distinct} questions; "
+          f"{rag_service.inflight.get_stats()}")
+    print(f"{'coalescing':<12}{'llm calls':>10}{'embeds':>8}{'shed':>6}{'p50 ms':>9}{'p99 ms':>9}{'seconds':>9}")
+    for enabled, result in results.items():
+        print(f"{'on' if enabled else 'off':<12}{result['llm']:>10}{result['embed']:>8}{result['shed']:>6}"
+              f"{1000 * result['p50']:>9.0f}{1000 * result['p99']:>9.0f}{result['elapsed']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=4, help="distinct questions in the spike")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stub LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per stub embedding call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""
+Context window benchmark: checkpoint size and turn latency as a conversation grows.
+
+Runs one long conversation per mode through ``RAGService.process_question``:
+
+- ``unbounded``: ``CONTEXT_WINDOW_MESSAGES=0``, every message stays in the
+  checkpoint - what the graph did before the ``manage_context`` node.
+- ``window``: the configured window (``--window``), older turns folded into
+  the running summary in the background.
+
+Every ``--report-every`` turns it prints the serialized size of the latest
+checkpoint, the p50 of the turns since the last report and the p50 of the
+checkpointer's ``aput``. The checkpointer is LangGraph's in-memory saver and
+the LLM the stub model; the semantic answer cache is off and every question
+is distinct, so each turn runs the whole graph.
+
+Usage:
+    python -m benchmarks.context_window --turns 100 --window 12
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from .stubs import install_stub_models, use_memory_checkpointer
+from .chat_load import QUESTIONS
+
+
+def _time_aput(saver, samples: list):
+    original = saver.aput
+
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    saver.aput = timed
+
+
+def _checkpoint_bytes(saver, thread_id: str) -> int:
+    checkpoint = saver.get_tuple({"configurable": {"thread_id": thread_id}}).checkpoint
+    return len(saver.serde.dumps_typed(checkpoint)[1])
+
+
+async def main(args):
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=0.0)
+    rag_service = await use_memory_checkpointer()
+    logging.disable(logging.WARNING)
+
+    from app.core.config import settings
+    from app.schemas.chat import ChatRequest
+    from app.services.redis_checkpointer import redis_checkpointer
+    from app.services.semantic_cache_service import semantic_cache_service
+
+    semantic_cache_service.enabled = False
+    saver = redis_checkpointer.get_checkpointer()
+    aput_samples = []
+    _time_aput(saver, aput_samples)
+
+    print(f"{'mode':<11}{'turn':>6}{'messages':>10}{'ckpt KB':>10}{'turn p50 ms':>13}{'aput p50 ms':>13}")
+    for mode, window in (("unbounded", 0), ("window", args.window)):
+        settings.CONTEXT_WINDOW_MESSAGES = window
+        thread_id = f"context-{mode}"
+        turn_samples = []
+        for turn in range(1, args.turns + 1):
+            question = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn})"
+            start = time.perf_counter()
+            await rag_service.process_question(ChatRequest(question=question, thread_id=thread_id))
+            turn_samples.append(time.perf_counter() - start)
+
+            if turn % args.report_every == 0:
+                state = await rag_service.graph.aget_state({"configurable": {"thread_id": thread_id}})
+                print(f"{mode:<11}{turn:>6}{len(state.values['messages']):>10}"
+                      f"{_checkpoint_bytes(saver, thread_id) / 1024:>10.1f}"
+                      f"{1000 * statistics.median(turn_samples):>13.2f}"
+                      f"{1000 * statistics.median(aput_samples):>13.3f}")
+                turn_samples.clear()
+                aput_samples.clear()
+        # Let pending summaries finish so the next mode starts quiet
+        await asyncio.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--window", type=int, default=12, help="messages kept in state in the windowed run")
+    parser.add_argument("--report-every", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,280 @@
+"""
+Offline benchmark harness: replay a question workload against deterministic backends.
+
+Every remote dependency is swapped for a local stand-in from ``stubs`` with a
+fixed injected latency: Gemini (``--llm-latency``), Cohere (``--embed-latency``),
+Qdrant (``--vector-latency``), generated SQL on the real SQLite file
+(``--sql-latency``), the Redis embedding tier and checkpointer
+(``--redis-latency``) and MongoDB chat history (``--mongo-latency``).
+
+The workload is a set of conversations, either generated from ``--seed`` or
+read from a JSONL file of ``{"thread_id": ..., "question": ...}`` lines. Turns
+of one conversation run in order and conversations run concurrently, up to
+``--concurrency``. It is replayed against each ``--targets`` entry:
+
+- ``service``: ``RAGService.process_question`` directly.
+- ``http``: ``POST /api/chat`` through the FastAPI app (in-process ASGI).
+
+Each target reports per-route p50/p95/p99 latency and throughput. With
+``--allocations`` the workload runs once more under ``tracemalloc`` and
+reports peak traced memory, memory retained per request and the top
+allocation sites. The semantic answer cache is cleared before every pass.
+
+``--save`` writes the results as JSON. ``--baseline`` compares against such
+a file and exits non-zero when a route's p95 or the throughput regresses by
+more than ``--max-regression``, so it can gate deploys.
+
+Usage:
+    python -m benchmarks.harness --threads 40 --turns 5 --concurrency 16
+    python -m benchmarks.harness --save baseline.json
+    python -m benchmarks.harness --baseline baseline.json --allocations
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .stubs import install_stub_models, use_memory_checkpointer, use_stub_memory
+
+MOVIES = ["1917", "Blade Runner 2049", "Get Out"]
+
+TEMPLATES = {
+    "sql": ["Who directed {movie}?", "What year was {movie} released?", "List the genres of {movie}"],
+    "vector": ["What is the plot of {movie}?", "What is the main character's motivation in {movie}?",
+               "Describe the opening scene of {movie}"],
+    "general": ["Hi there!", "Thanks, that helps", "What can you do?"],
+}
+ROUTE_WEIGHTS = {"sql": 0.4, "vector": 0.4, "general": 0.2}
+
+# (thread_id, questions in order)
+Workload = List[Tuple[str, List[str]]]
+
+
+def generate_workload(threads: int, turns: int, seed: int) -> Workload:
+    """Conversations drawn from ``TEMPLATES``; the same seed always yields the same workload."""
+    rng = random.Random(seed)
+    routes, weights = list(ROUTE_WEIGHTS), list(ROUTE_WEIGHTS.values())
+    workload = []
+    for i in range(threads):
+        questions = []
+        for _ in range(turns):
+            template = rng.choice(TEMPLATES[rng.choices(routes, weights)[0]])
+            questions.append(template.format(movie=rng.choice(MOVIES)))
+        workload.append((f"thread-{i}", questions))
+    return workload
+
+
+def load_workload(path: str) -> Workload:
+    """Conversations from a JSONL file, in file order."""
+    threads: Dict[str, List[str]] = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                threads.setdefault(entry.get("thread_id") or "default", []).append(entry["question"])
+    return list(threads.items())
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples: List[Tuple[str, float]], elapsed: float) -> dict:
+    by_route: Dict[str, List[float]] = defaultdict(list)
+    for route, seconds in samples:
+        by_route[route].append(seconds)
+    by_route["all"] = [seconds for _, seconds in samples]
+
+    routes = {}
+    for route, values in by_route.items():
+        values.sort()
+        routes[route] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "mean": sum(values) / len(values) if values else 0.0,
+        }
+    return {"requests": len(samples), "seconds": elapsed,
+            "throughput": len(samples) / elapsed if elapsed else 0.0, "routes": routes}
+
+
+def _service_target():
+    from app.schemas.chat import ChatRequest
+    from app.services.rag_service import rag_service
+
+    async def ask(thread_id: str, question: str) -> str:
+        response = await rag_service.process_question(ChatRequest(question=question, thread_id=thread_id))
+        return response.route or "unknown"
+    return ask
+
+
+def _http_target(client):
+    async def ask(thread_id: str, question: str) -> str:
+        response = await client.post("/api/chat", json={"question": question, "thread_id": thread_id})
+        response.raise_for_status()
+        return response.json().get("route") or "unknown"
+    return ask
+
+
+async def replay(ask, workload: Workload, concurrency: int, prefix: str) -> Tuple[List[Tuple[str, float]], float]:
+    """Run every conversation through ``ask``; returns ``(route, seconds)`` per request and the wall time."""
+    from app.services.semantic_cache_service import semantic_cache_service
+
+    semantic_cache_service.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Tuple[str, float]] = []
+
+    async def _conversation(thread_id: str, questions: List[str]):
+        async with semaphore:
+            for question in questions:
+                start = time.perf_counter()
+                route = await ask(f"{prefix}-{thread_id}", question)
+                samples.append((route, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_conversation(thread_id, questions) for thread_id, questions in workload))
+    return samples, time.perf_counter() - start
+
+
+async def measure_allocations(ask, workload: Workload, concurrency: int, prefix: str, top: int) -> dict:
+    """Replay under ``tracemalloc``: peak traced memory, retained memory per request and top sites."""
+    gc.collect()
+    tracemalloc.start(1)
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    samples, _ = await replay(ask, workload, concurrency, prefix)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    requests = max(len(samples), 1)
+    return {
+        "peak_kib": peak / 1024,
+        "retained_kib_per_request": sum(s.size_diff for s in stats) / 1024 / requests,
+        "retained_blocks_per_request": sum(s.count_diff for s in stats) / requests,
+        "top_sites": [{"site": str(s.traceback), "size_kib": s.size_diff / 1024, "blocks": s.count_diff}
+                      for s in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:top]],
+    }
+
+
+def print_report(target: str, result: dict):
+    print(f"\n[{target}] {result['requests']} requests in {result['seconds']:.2f}s "
+          f"-> {result['throughput']:.1f} req/s")
+    print(f"  {'route':<10}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for route, stats in sorted(result["routes"].items(), key=lambda item: item[0] == "all"):
+        print(f"  {route:<10}{stats['count']:>7}{1000 * stats['p50']:>10.1f}{1000 * stats['p95']:>10.1f}"
+              f"{1000 * stats['p99']:>10.1f}{1000 * stats['mean']:>10.1f}")
+    allocations = result.get("allocations")
+    if allocations:
+        print(f"  allocations: peak {allocations['peak_kib']:.0f} KiB, retained "
+              f"{allocations['retained_kib_per_request']:.1f} KiB / "
+              f"{allocations['retained_blocks_per_request']:.0f} blocks per request")
+        for site in allocations["top_sites"]:
+            print(f"    {site['size_kib']:>9.1f} KiB {site['blocks']:>7} blocks  {site['site']}")
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Regressions beyond ``max_regression`` (a fraction) in p95 per route or in throughput."""
+    failures = []
+    for target, result in results["targets"].items():
+        base = baseline.get("targets", {}).get(target)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - max_regression):
+            failures.append(f"{target}: throughput {result['throughput']:.1f} req/s vs baseline {base['throughput']:.1f}")
+        for route, stats in result["routes"].items():
+            base_route = base["routes"].get(route)
+            if base_route and stats["p95"] > base_route["p95"] * (1 + max_regression):
+                failures.append(f"{target}/{route}: p95 {1000 * stats['p95']:.1f} ms vs baseline "
+                                f"{1000 * base_route['p95']:.1f} ms")
+    return failures
+
+
+async def main(args) -> int:
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency,
+                        vector_latency=args.vector_latency, sql_latency=args.sql_latency,
+                        redis_latency=args.redis_latency)
+    memory_service = use_stub_memory(latency=args.mongo_latency)
+    await use_memory_checkpointer(latency=args.redis_latency)
+
+    import httpx
+    from app.main import app
+
+    logging.disable(logging.WARNING)
+
+    workload = load_workload(args.workload) if args.workload else generate_workload(args.threads, args.turns, args.seed)
+    results = {"config": {key: value for key, value in vars(args).items() if key not in ("save", "baseline")},
+               "targets": {}}
+    print(f"workload: {len(workload)} conversations, {sum(len(q) for _, q in workload)} requests, "
+          f"concurrency {args.concurrency}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        targets = {"service": _service_target(), "http": _http_target(client)}
+        for target in args.targets.split(","):
+            ask = targets[target]
+            # Unmeasured pass over a few conversations so first-call costs stay out of the numbers
+            await replay(ask, workload[:args.concurrency], args.concurrency, f"{target}-warmup")
+            samples, elapsed = await replay(ask, workload, args.concurrency, target)
+            result = summarize(samples, elapsed)
+            if args.allocations:
+                result["allocations"] = await measure_allocations(ask, workload, args.concurrency,
+                                                                  f"{target}-alloc", args.top)
+            results["targets"][target] = result
+            print_report(target, result)
+
+    await memory_service.drain(timeout=5.0)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            return 1
+        print(f"\nwithin {100 * args.max_regression:.0f}% of baseline {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", help="JSONL of {thread_id, question}; generated when omitted")
+    parser.add_argument("--threads", type=int, default=40, help="generated conversations")
+    parser.add_argument("--turns", type=int, default=5, help="questions per generated conversation")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=16, help="conversations in flight")
+    parser.add_argument("--targets", default="service,http", help="comma-separated: service, http")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="seconds per embedding call")
+    parser.add_argument("--vector-latency", type=float, default=0.005, help="seconds per vector search")
+    parser.add_argument("--sql-latency", type=float, default=0.002, help="seconds added per uncached SQL query")
+    parser.add_argument("--redis-latency", type=float, default=0.001, help="seconds per Redis round trip")
+    parser.add_argument("--mongo-latency", type=float, default=0.002, help="seconds per MongoDB operation")
+    parser.add_argument("--allocations", action="store_true", help="extra pass under tracemalloc")
+    parser.add_argument("--top", type=int, default=5, help="allocation sites to list")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed p95/throughput regression vs baseline (fraction)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
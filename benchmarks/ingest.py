@@ -0,0 +1,112 @@
+"""
+Script ingestion benchmark: throughput of ``ScriptIngestor`` against an in-memory Qdrant.
+
+Runs the pipeline with the stub embedder (fixed latency per provider call):
+
+- ``serial``: one embedding call in flight, one upsert per embedding batch.
+- ``concurrent``: ``--concurrency`` calls in flight, ``--upsert-batch`` points per upsert.
+- ``rerun``: the concurrent pipeline again over the same files; every chunk
+  is unchanged and skipped.
+- ``one edit``: one scene in one file changed.
+
+Reads the PDFs in data/pdf (needs pypdf), or with ``--synthetic N``
+generates N screenplay-shaped scripts instead.
+
+Usage:
+    python -m benchmarks.ingest --embed-latency 0.2 --concurrency 8
+    python -m benchmarks.ingest --synthetic 20 --pages 120
+"""
+
+import argparse
+import asyncio
+import glob
+import logging
+import os
+import random
+
+from .stubs import ROOT_DIR, STUB_ENV, StubEmbeddings
+
+
+def _synthetic_scripts(count: int, pages: int) -> dict:
+    rng = random.Random(7)
+    words = ("the", "door", "rain", "gun", "light", "she", "he", "runs", "looks", "back", "slowly", "trench",
+             "letter", "car", "night", "voice", "silence", "brother", "field", "smoke", "replicant", "house")
+    scripts = {}
+    for s in range(count):
+        script = []
+        scene = 0
+        for _ in range(pages):
+            lines = []
+            for _ in range(rng.randint(25, 40)):
+                if rng.random() < 0.06:
+                    scene += 1
+                    lines.append(f"{scene} {rng.choice(('INT.', 'EXT.'))} LOCATION {scene} - {rng.choice(('DAY', 'NIGHT'))}")
+                elif rng.random() < 0.25:
+                    lines.append(rng.choice(("SCHOFIELD", "K", "CHRIS", "ROSE", "DECKARD")))
+                else:
+                    lines.append(" ".join(rng.choice(words) for _ in range(rng.randint(6, 14))))
+            script.append("\n".join(lines))
+        scripts[f"synthetic-{s}_merged.pdf"] = script
+    return scripts
+
+
+async def _run(name: str, ingestor, paths):
+    stats = (await ingestor.ingest(paths)).as_dict()
+    print(f"{name:<12}{stats['pages']:>7}{stats['chunks']:>8}{stats['embedded']:>10}{stats['deleted']:>9}"
+          f"{stats['embed_calls']:>8}{stats['seconds']:>9.2f}{stats['pages_per_sec']:>9.1f}{stats['chunks_per_sec']:>10.1f}")
+
+
+async def main(args):
+    for name, value in STUB_ENV.items():
+        os.environ.setdefault(name, value)
+    import sys
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    logging.disable(logging.INFO)
+
+    from qdrant_client import AsyncQdrantClient
+    from app.utils.ingestion import ScriptIngestor, SceneChunker, iter_pdf_pages
+
+    if args.synthetic:
+        scripts = _synthetic_scripts(args.synthetic, args.pages)
+        paths = sorted(scripts)
+
+        def read_pages(path):
+            return enumerate(scripts[os.path.basename(path)], start=1)
+    else:
+        paths = sorted(glob.glob(os.path.join(ROOT_DIR, "data", "pdf", "*.pdf")))
+        # Parse once up front so the runs compare the pipeline, not pypdf
+        scripts = {os.path.basename(path): [text for _, text in iter_pdf_pages(path)] for path in paths}
+
+        def read_pages(path):
+            return enumerate(scripts[os.path.basename(path)], start=1)
+
+    embeddings = StubEmbeddings(size=args.dimensions, latency=args.embed_latency)
+
+    def ingestor(client, concurrency: int, upsert_batch: int):
+        return ScriptIngestor(client, "MovieScriptsBench", embeddings, chunker=SceneChunker(),
+                              read_pages=read_pages, embed_batch_size=96,
+                              embed_concurrency=concurrency, upsert_batch_size=upsert_batch)
+
+    print(f"{'run':<12}{'pages':>7}{'chunks':>8}{'embedded':>10}{'deleted':>9}{'calls':>8}"
+          f"{'seconds':>9}{'pages/s':>9}{'chunks/s':>10}")
+    await _run("serial", ingestor(AsyncQdrantClient(location=":memory:"), 1, 96), paths)
+
+    client = AsyncQdrantClient(location=":memory:")
+    await _run("concurrent", ingestor(client, args.concurrency, args.upsert_batch), paths)
+    await _run("rerun", ingestor(client, args.concurrency, args.upsert_batch), paths)
+
+    first = os.path.basename(paths[0])
+    scripts[first] = [scripts[first][0] + "\nAN EXTRA LINE THAT CHANGES ONE SCENE"] + scripts[first][1:]
+    await _run("one edit", ingestor(client, args.concurrency, args.upsert_batch), paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="generate this many scripts instead of reading data/pdf")
+    parser.add_argument("--pages", type=int, default=120, help="pages per synthetic script")
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="seconds per stub embedding call")
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upsert-batch", type=int, default=512)
+    asyncio.run(main(parser.parse_args()))
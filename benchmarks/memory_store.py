@@ -0,0 +1,146 @@
+"""
+MongoDB chat history benchmark: per-call clients vs the pooled MemoryService.
+
+Needs a reachable mongod (a local ``mongod --dbpath /tmp/db`` or
+``docker run -p 27017:27017 mongo`` is enough); without one, ``--wire-stub``
+runs against the loopback wire-protocol stand-in in ``benchmarks.mongo_wire``,
+which measures the client side (per-call clients, handshakes, pooling) but
+not mongod's storage engine. Reports p50/p99 latency for
+saving a turn, loading a session's history and summarizing a session (the
+old summary loaded every message to count them):
+
+- ``legacy``: a new ``MongoDBChatMessageHistory`` (and ``MongoClient``) per
+  call, two inserts per turn - what MemoryService used to do.
+- ``pooled``: ``MemoryService`` with its shared client and one
+  ``insert_many`` per turn.
+- ``pooled async``: the ``asave_conversation``/``aget_messages_for_langchain``
+  path used by the graph.
+
+Usage:
+    python -m benchmarks.memory_store --mongodb-url mongodb://localhost:27017 --iterations 200
+    python -m benchmarks.memory_store --wire-stub --server-latency 0.0005
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+from .stubs import ROOT_DIR, STUB_ENV
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))]
+    return 1000 * statistics.median(ordered), 1000 * p99
+
+
+def _timed(fn, iterations: int):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _atimed(fn, iterations: int):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(name: str, operation: str, samples):
+    p50, p99 = _percentiles(samples)
+    print(f"{name:<14}{operation:<9}{p50:>10.2f}{p99:>10.2f}")
+
+
+async def main(args):
+    for name, value in STUB_ENV.items():
+        os.environ.setdefault(name, value)
+    stop_server = None
+    if args.wire_stub:
+        from .mongo_wire import start_server
+
+        args.mongodb_url, stop_server, _ = start_server(args.server_latency)
+    os.environ["MONGODB_URL"] = args.mongodb_url
+    os.environ["MONGODB_DATABASE"] = args.database
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
+    from app.services.memory_service import MemoryService
+
+    service = MemoryService()
+    if not service.connect():
+        raise SystemExit(f"MongoDB not reachable at {args.mongodb_url}")
+
+    run_id = uuid.uuid4().hex[:8]
+
+    def legacy_history(session_id: str):
+        return MongoDBChatMessageHistory(
+            connection_string=args.mongodb_url,
+            session_id=session_id,
+            database_name=args.database,
+            collection_name=service.collection_name,
+        )
+
+    def legacy_save(i: int):
+        history = legacy_history(f"legacy-{run_id}-{i % args.sessions}")
+        history.add_user_message(f"question {i}")
+        history.add_ai_message(f"answer {i}")
+
+    def legacy_load(i: int):
+        return legacy_history(f"legacy-{run_id}-{i % args.sessions}").messages
+
+    def pooled_save(i: int):
+        service.save_conversation(f"pooled-{run_id}-{i % args.sessions}", f"question {i}", f"answer {i}", "general")
+
+    def legacy_summary(i: int):
+        return len(legacy_load(i))
+
+    def pooled_summary(i: int):
+        return service.get_session_summary(f"pooled-{run_id}-{i % args.sessions}")
+
+    def pooled_load(i: int):
+        return service.get_messages_for_langchain(f"pooled-{run_id}-{i % args.sessions}")
+
+    async def async_save(i: int):
+        await service.asave_conversation(f"async-{run_id}-{i % args.sessions}", f"question {i}", f"answer {i}", "general")
+
+    async def async_load(i: int):
+        return await service.aget_messages_for_langchain(f"async-{run_id}-{i % args.sessions}")
+
+    print(f"{'mode':<14}{'op':<9}{'p50 ms':>10}{'p99 ms':>10}")
+    try:
+        _report("legacy", "save", _timed(legacy_save, args.iterations))
+        _report("legacy", "load", _timed(legacy_load, args.iterations))
+        _report("legacy", "summary", _timed(legacy_summary, args.iterations))
+        _report("pooled", "save", _timed(pooled_save, args.iterations))
+        _report("pooled", "load", _timed(pooled_load, args.iterations))
+        _report("pooled", "summary", _timed(pooled_summary, args.iterations))
+        _report("pooled async", "save", await _atimed(async_save, args.iterations))
+        _report("pooled async", "load", await _atimed(async_load, args.iterations))
+    finally:
+        service._get_collection().delete_many({"SessionId": {"$regex": f"-{run_id}-"}})
+        service._get_meta_collection().delete_many({"_id": {"$regex": f"-{run_id}-"}})
+        await service.close()
+        if stop_server is not None:
+            stop_server()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="rag_memory_bench")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=20, help="distinct sessions the turns are spread over")
+    parser.add_argument("--wire-stub", action="store_true", help="use the in-process wire-protocol stand-in, not a mongod")
+    parser.add_argument("--server-latency", type=float, default=0.0, help="seconds added per request by --wire-stub")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+"""
+Metrics overhead benchmark: cost of the instrumentation on the request path.
+
+- ``micro``: per-call cost of ``track()`` (the wrapper around every backend
+  call) with metrics enabled and disabled, against an empty ``with`` block.
+- ``chat``: ``POST /api/chat`` throughput through the FastAPI app with stub
+  backends, alternating ``METRICS_ENABLED`` on/off over the same workload,
+  plus the size and render time of one ``/metrics`` scrape.
+
+Usage:
+    python -m benchmarks.metrics_overhead --calls 200000 --requests 300
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+
+from .chat_load import QUESTIONS
+from .stubs import install_stub_models, use_memory_checkpointer
+
+
+def micro(calls: int):
+    from app.utils.metrics import metrics, request_timings, track
+
+    def _loop(factory) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            with factory():
+                pass
+        return (time.perf_counter() - start) / calls * 1e9
+
+    baseline = _loop(nullcontext)
+    print(f"{'mode':<28}{'ns/call':>10}")
+    print(f"{'empty with-block':<28}{baseline:>10.0f}")
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        print(f"{'track() ' + ('enabled' if enabled else 'disabled'):<28}{_loop(lambda: track('bench', 'op')):>10.0f}")
+    with request_timings():
+        print(f"{'track() + request timings':<28}{_loop(lambda: track('bench', 'op')):>10.0f}")
+
+
+async def chat(args):
+    install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+    await use_memory_checkpointer()
+
+    import httpx
+    from app.main import app
+    from app.utils.metrics import metrics
+
+    logging.disable(logging.INFO)
+
+    async def _run(client, tag: str) -> float:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def _one(i: int):
+            async with semaphore:
+                response = await client.post("/api/chat", json={
+                    "question": QUESTIONS[i % len(QUESTIONS)], "thread_id": f"metrics-{tag}-{i}",
+                })
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_one(i) for i in range(args.requests)))
+        return args.requests / (time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # One unmeasured pass warms the caches and the graph; order alternates per round
+        await _run(client, "warmup")
+        throughput = {True: [], False: []}
+        for round_ in range(args.rounds):
+            for enabled in ((False, True) if round_ % 2 else (True, False)):
+                metrics.enabled = enabled
+                throughput[enabled].append(await _run(client, f"{round_}-{enabled}"))
+        print(f"\n{'metrics':<12}{'req/s (best of ' + str(args.rounds) + ')':>22}")
+        for enabled in (False, True):
+            print(f"{'enabled' if enabled else 'disabled':<12}{max(throughput[enabled]):>22.1f}")
+
+        start = time.perf_counter()
+        response = await client.get("/metrics")
+        elapsed = time.perf_counter() - start
+        print(f"\n/metrics scrape: {len(response.text.splitlines())} lines, {len(response.content)} bytes, "
+              f"{elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000, help="track() calls per micro-benchmark mode")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stub LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per stub embedding call")
+    args = parser.parse_args()
+    micro(args.calls)
+    asyncio.run(chat(args))
@@ -0,0 +1,234 @@
+"""
+Loopback MongoDB wire-protocol server backed by mongomock, for benchmarks without a mongod.
+
+``start_server()`` listens on 127.0.0.1 in a background thread and answers
+the handshake and the commands ``MemoryService`` and ``MongoDBChatMessageHistory``
+send (hello, ping, insert, find, update, delete, aggregate, count,
+createIndexes, endSessions), storing documents in memory. Clients connect
+over real TCP and run their real handshake, server monitoring and pooling,
+so client-side costs (creating a ``MongoClient`` per call, connecting,
+reusing a pool) are measured faithfully; storage and query execution are
+not those of a mongod. ``latency`` adds a fixed delay per request to stand
+in for the network round trip.
+
+Needs ``mongomock`` (``pip install mongomock``), which is not an app dependency.
+"""
+
+import asyncio
+import itertools
+import struct
+import threading
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+import bson
+
+OP_REPLY, OP_QUERY, OP_MSG = 1, 2004, 2013
+_HEADER = struct.Struct("<iiii")
+
+# What a standalone mongod 7.0 reports; no topologyVersion, so clients poll instead of streaming hello
+_HELLO = {
+    "helloOk": True,
+    "ismaster": True,
+    "isWritablePrimary": True,
+    "maxBsonObjectSize": 16 * 1024 * 1024,
+    "maxMessageSizeBytes": 48000000,
+    "maxWriteBatchSize": 100000,
+    "logicalSessionTimeoutMinutes": 30,
+    "minWireVersion": 0,
+    "maxWireVersion": 21,
+    "readOnly": False,
+}
+
+
+class _Store:
+    """Runs decoded commands against a mongomock client."""
+
+    def __init__(self):
+        import mongomock
+
+        self.client = mongomock.MongoClient()
+        self.connections = itertools.count(1)
+        self.stats = {"connections": 0, "requests": 0}
+        self.writers = set()
+
+    def run(self, db_name: str, command: dict) -> dict:
+        name = next(iter(command))
+        database = self.client[db_name]
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return {"ok": 0.0, "errmsg": f"no such command: '{name}'", "code": 59}
+        try:
+            return {**handler(database, command), "ok": 1.0}
+        except Exception as e:
+            return {"ok": 0.0, "errmsg": str(e), "code": 2}
+
+    def _cmd_hello(self, database, command):
+        return {**_HELLO, "localTime": datetime.now(timezone.utc), "connectionId": next(self.connections)}
+
+    _cmd_ismaster = _cmd_hello
+
+    def _cmd_ping(self, database, command):
+        return {}
+
+    _cmd_endsessions = _cmd_killcursors = _cmd_ping
+
+    def _cmd_buildinfo(self, database, command):
+        return {"version": "7.0.0", "versionArray": [7, 0, 0, 0]}
+
+    def _cmd_insert(self, database, command):
+        documents = command["documents"]
+        database[command["insert"]].insert_many(documents, ordered=command.get("ordered", True))
+        return {"n": len(documents)}
+
+    def _cmd_find(self, database, command):
+        cursor = database[command["find"]].find(command.get("filter", {}), command.get("projection"))
+        if command.get("sort"):
+            cursor = cursor.sort(list(command["sort"].items()))
+        if command.get("skip"):
+            cursor = cursor.skip(command["skip"])
+        if command.get("limit"):
+            cursor = cursor.limit(abs(command["limit"]))
+        return {"cursor": {"id": bson.int64.Int64(0), "ns": f"{database.name}.{command['find']}",
+                           "firstBatch": list(cursor)}}
+
+    def _cmd_aggregate(self, database, command):
+        documents = list(database[command["aggregate"]].aggregate(command["pipeline"]))
+        return {"cursor": {"id": bson.int64.Int64(0), "ns": f"{database.name}.{command['aggregate']}",
+                           "firstBatch": documents}}
+
+    def _cmd_count(self, database, command):
+        return {"n": database[command["count"]].count_documents(command.get("query") or {})}
+
+    def _cmd_update(self, database, command):
+        collection = database[command["update"]]
+        matched = modified = 0
+        upserted = []
+        for index, update in enumerate(command["updates"]):
+            method = collection.update_many if update.get("multi") else collection.update_one
+            result = method(update["q"], update["u"], upsert=update.get("upsert", False))
+            matched += result.matched_count
+            modified += result.modified_count
+            if result.upserted_id is not None:
+                upserted.append({"index": index, "_id": result.upserted_id})
+        return {"n": matched + len(upserted), "nModified": modified, **({"upserted": upserted} if upserted else {})}
+
+    def _cmd_delete(self, database, command):
+        collection = database[command["delete"]]
+        deleted = 0
+        for delete in command["deletes"]:
+            method = collection.delete_one if delete.get("limit") == 1 else collection.delete_many
+            deleted += method(delete["q"]).deleted_count
+        return {"n": deleted}
+
+    def _cmd_createindexes(self, database, command):
+        collection = database[command["createIndexes"]]
+        before = len(collection.index_information())
+        for index in command["indexes"]:
+            collection.create_index(list(index["key"].items()), name=index.get("name"))
+        return {"numIndexesBefore": before, "numIndexesAfter": len(collection.index_information()),
+                "createdCollectionAutomatically": False}
+
+
+def _parse_msg(body: bytes) -> Tuple[str, dict]:
+    """Command document of an ``OP_MSG`` body, with document-sequence sections merged in."""
+    flags = struct.unpack_from("<I", body)[0]
+    end = len(body) - (4 if flags & 1 else 0)
+    offset, command, sequences = 4, None, {}
+    while offset < end:
+        kind = body[offset]
+        offset += 1
+        if kind == 0:
+            size = struct.unpack_from("<i", body, offset)[0]
+            command = bson.decode(body[offset:offset + size])
+            offset += size
+        else:
+            size = struct.unpack_from("<i", body, offset)[0]
+            section_end = offset + size
+            name_end = body.index(b"\x00", offset + 4)
+            identifier = body[offset + 4:name_end].decode()
+            sequences[identifier] = bson.decode_all(body[name_end + 1:section_end])
+            offset = section_end
+    command.update(sequences)
+    return command.pop("$db", "admin"), command
+
+
+def _parse_query(body: bytes) -> Tuple[str, dict]:
+    """Database and command of a legacy ``OP_QUERY`` (the initial handshake)."""
+    name_end = body.index(b"\x00", 4)
+    namespace = body[4:name_end].decode()
+    offset = name_end + 1 + 8
+    size = struct.unpack_from("<i", body, offset)[0]
+    command = bson.decode(body[offset:offset + size])
+    return namespace.split(".", 1)[0], command.get("$query", command)
+
+
+async def _serve_connection(store: _Store, latency: float, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+    store.stats["connections"] += 1
+    store.writers.add(writer)
+    request_ids = itertools.count(1)
+    try:
+        while True:
+            header = await reader.readexactly(_HEADER.size)
+            length, request_id, _, op_code = _HEADER.unpack(header)
+            body = await reader.readexactly(length - _HEADER.size)
+            store.stats["requests"] += 1
+            if latency:
+                await asyncio.sleep(latency)
+
+            if op_code == OP_QUERY:
+                db_name, command = _parse_query(body)
+                payload = struct.pack("<iqii", 0, 0, 0, 1) + bson.encode(store.run(db_name, command))
+                reply_op = OP_REPLY
+            elif op_code == OP_MSG:
+                db_name, command = _parse_msg(body)
+                payload = struct.pack("<IB", 0, 0) + bson.encode(store.run(db_name, command))
+                reply_op = OP_MSG
+            else:
+                break
+            writer.write(_HEADER.pack(_HEADER.size + len(payload), next(request_ids), request_id, reply_op) + payload)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        store.writers.discard(writer)
+        writer.close()
+
+
+def start_server(latency: float = 0.0) -> Tuple[str, Callable[[], None], dict]:
+    """Start the server in a daemon thread; returns ``(mongodb_url, stop, stats)``."""
+    store = _Store()
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state: List = []
+
+    async def _start():
+        server = await asyncio.start_server(
+            lambda reader, writer: _serve_connection(store, latency, reader, writer), "127.0.0.1", 0)
+        state.append(server)
+        ready.set()
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(_start())
+        loop.run_forever()
+
+    threading.Thread(target=_run, name="mongo-wire", daemon=True).start()
+    ready.wait()
+    port = state[0].sockets[0].getsockname()[1]
+
+    async def _shutdown():
+        state[0].close()
+        # Closing the sockets ends each connection's read loop
+        for writer in list(store.writers):
+            writer.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return f"mongodb://127.0.0.1:{port}/?directConnection=true", stop, store.stats
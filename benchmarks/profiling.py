@@ -0,0 +1,141 @@
+"""
+Profiling hooks for benchmark runs.
+
+``profiled(mode)`` wraps a block with either profiler and prints hot spots on exit:
+
+- ``cprofile``: deterministic ``cProfile`` of the calling thread. Prints the
+  top functions by own time; ``out`` gets a ``.prof`` file for
+  ``snakeviz``/``pstats``.
+- ``sample``: a background thread snapshots every thread's Python stack every
+  ``interval`` seconds, so it also sees ``asyncio.to_thread`` work (SQL,
+  reranking) and costs almost nothing. Idle samples (event loop in
+  ``select``, pool workers waiting) are counted apart, and event-loop
+  plumbing frames are dropped from the stacks. Prints the top
+  functions by own and inclusive samples; ``out`` gets collapsed stacks
+  (``a;b;c count`` lines) for flamegraph.pl or speedscope. The sampler only
+  runs when the profiled thread releases the GIL, so C calls that release it
+  (``os.urandom``, file and socket I/O) are over-represented; use
+  ``cprofile`` for exact per-function cost.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+# Leaf frames of threads that are waiting, not working
+IDLE_FRAMES = {("selectors.py", "select"), ("thread.py", "_worker"), ("threading.py", "wait")}
+
+# Frames shared by every sample (event loop, module runner) that would crowd out the inclusive list
+_PLUMBING = (os.path.dirname(asyncio.__file__) + os.sep, "<frozen runpy>")
+
+
+def _label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples the Python stacks of all other threads on a timer."""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                self.samples += 1
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    self.idle += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    if not frame.f_code.co_filename.startswith(_PLUMBING):
+                        stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def hot_spots(self, top: int) -> Tuple[list, list]:
+        """``(own, inclusive)`` top lists of ``(function, samples)``."""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        return own.most_common(top), inclusive.most_common(top)
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+@contextmanager
+def profiled(mode: Optional[str], out: Optional[str] = None, top: int = 25,
+             interval: float = 0.002) -> Iterator[None]:
+    """Profile the block with ``mode`` (``None``, ``"cprofile"`` or ``"sample"``) and print hot spots."""
+    if not mode:
+        yield
+        return
+
+    if mode == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("tottime").print_stats(top)
+            print(f"\ncProfile hot spots (by own time):\n{stream.getvalue()}")
+            if out:
+                profile.dump_stats(out)
+                print(f"profile written to {out}")
+        return
+
+    if mode != "sample":
+        raise ValueError(f"unknown profile mode {mode!r}")
+
+    sampler = StackSampler(interval)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        busy = max(sampler.samples - sampler.idle, 1)
+        print(f"\nsampled {sampler.samples} thread stacks over {time.perf_counter() - start:.2f}s "
+              f"every {1000 * interval:.0f} ms; {100 * sampler.idle / max(sampler.samples, 1):.0f}% idle")
+        own, inclusive = sampler.hot_spots(top)
+        for title, rows in (("own", own), ("inclusive", inclusive)):
+            print(f"hot spots by {title} samples (% of busy):")
+            for function, count in rows:
+                print(f"  {100 * count / busy:>6.1f}%  {function}")
+        if out:
+            sampler.write_collapsed(out)
+            print(f"collapsed stacks written to {out}")
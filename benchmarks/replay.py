@@ -0,0 +1,283 @@
+"""
+Replay recorded production traffic against the current code, without Gemini, Cohere or Qdrant.
+
+Record with ``TRACE_RECORD_PATH=traces.jsonl`` (and ``TRACE_SAMPLE_RATE``)
+on a running deployment. Each sampled ``/api/chat`` request becomes one JSONL
+line with the question, the route taken, every LLM reply (node, latency,
+output or structured SQL), the chunk ids and sizes each vector search returned,
+and the latency of each backend call.
+
+Replay feeds those recordings back through ``RAGService.process_question``.
+Conversations keep their recorded turn order:
+
+- The LLM stand-in answers each call with the next recorded reply for the
+  same graph node, after the recorded latency.
+- Embedding and vector search calls take their recorded latencies.
+- Vector searches return chunks with the recorded ids and sizes, filled with
+  deterministic text so BM25, fusion and reranking do real work.
+- Generated SQL runs on the local SQLite file.
+- MongoDB and Redis use the median latencies of the recording.
+
+``--latency-scale`` multiplies every injected latency. ``0`` gives a CPU-only
+run that shows only in-process cost (routing, prompts, retrieval fusion,
+checkpoint serialization). Combine it with ``--profile cprofile`` or
+``--profile sample`` to dump hot spots for the replay.
+
+The report compares replayed and recorded per-route latency and per-node
+mean time. It also gives the share of requests that took the recorded route
+and the number of LLM calls and searches the recording had no entry for.
+Both show how far the current code has drifted from the recorded traffic.
+
+Usage:
+    python -m benchmarks.replay traces.jsonl
+    python -m benchmarks.replay traces.jsonl --latency-scale 0 --profile sample --profile-out stacks.txt
+    python -m benchmarks.replay traces.jsonl --latency-scale 0 --profile cprofile --profile-out replay.prof
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .harness import percentile, print_report, summarize
+from .profiling import profiled
+from .stubs import (SCRIPT_SNIPPETS, StubChatModel, StubEmbeddings, StubVectorStore, install_stub_models,
+                    use_memory_checkpointer, use_stub_memory)
+
+# Filler for recorded chunks, drawn from the stub scripts so BM25 finds overlaps
+_VOCABULARY = sorted({word.strip(".,;'").lower() for _, text in SCRIPT_SNIPPETS for word in text.split()})
+
+
+class ReplayScript:
+    """The recorded calls of one request, consumed in order as the replay makes them."""
+
+    def __init__(self, trace: dict, scale: float):
+        self.trace = trace
+        self.scale = scale
+        self.llm: Dict[Optional[str], Deque[Tuple[float, Any]]] = defaultdict(deque)
+        for node, ms, output in trace.get("llm", []):
+            self.llm[node].append((ms / 1000, output))
+        self.documents: Deque[list] = deque(trace.get("docs", []))
+        self.calls: Dict[str, Deque[float]] = defaultdict(deque)
+        for key, ms in trace.get("calls", []):
+            self.calls[key.split(".", 1)[0] if key.startswith("embedder.") else key].append(ms / 1000)
+        self.unscripted = 0
+
+    def next_llm(self, node: Optional[str]) -> Optional[Tuple[float, Any]]:
+        queue = self.llm.get(node)
+        if queue:
+            return queue.popleft()
+        self.unscripted += 1
+        return None
+
+    def next_latency(self, key: str, default: float) -> float:
+        queue = self.calls.get(key)
+        return (queue.popleft() if queue else default) * self.scale
+
+    def next_documents(self) -> Optional[list]:
+        if self.documents:
+            return self.documents.popleft()
+        self.unscripted += 1
+        return None
+
+
+_script: contextvars.ContextVar[Optional[ReplayScript]] = contextvars.ContextVar("replay_script", default=None)
+
+
+def _node(metadata: Optional[dict]) -> Optional[str]:
+    return (metadata or {}).get("langgraph_node")
+
+
+class ReplayChatModel(StubChatModel):
+    """Answers each call with the recorded reply for its graph node, after the recorded latency."""
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        script = _script.get()
+        entry = script.next_llm(_node(run_manager.metadata if run_manager else None)) if script else None
+        if entry is None:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        seconds, output = entry
+        await asyncio.sleep(seconds * script.scale)
+        if isinstance(output, dict):
+            message = AIMessage(content="", tool_calls=[{"name": "QueryOutput", "args": output, "id": "replay"}])
+        else:
+            message = AIMessage(content=output)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayEmbeddings(StubEmbeddings):
+    """Hash embeddings that take the recorded embedding-call latencies."""
+
+    async def _delay(self):
+        script = _script.get()
+        await asyncio.sleep(script.next_latency("embedder", self.latency) if script else self.latency)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await self._delay()
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await self._delay()
+        return self._embed(text)
+
+
+class ReplayVectorStore(StubVectorStore):
+    """Returns the recorded chunks (ids and sizes) of each search after the recorded latency."""
+
+    _texts: Dict[Tuple[Any, int], str] = {}
+
+    @classmethod
+    def _text(cls, chunk_id: Any, length: int) -> str:
+        key = (chunk_id, length)
+        if key not in cls._texts:
+            rng = random.Random(str(chunk_id))
+            words, size = [], 0
+            while size < length:
+                word = rng.choice(_VOCABULARY)
+                words.append(word)
+                size += len(word) + 1
+            cls._texts[key] = " ".join(words)[:length]
+        return cls._texts[key]
+
+    async def amax_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                       lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        script = _script.get()
+        chunks = script.next_documents() if script else None
+        if chunks is None:
+            return await super().amax_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, **kwargs)
+        await asyncio.sleep(script.next_latency("vectorstore.mmr_search", self.latency))
+        return [Document(page_content=self._text(chunk_id, length), metadata={"_id": chunk_id})
+                for chunk_id, length in chunks]
+
+
+def load_traces(path: str) -> List[dict]:
+    """Recorded requests, oldest first."""
+    with open(path) as f:
+        traces = [json.loads(line) for line in f if line.strip()]
+    return sorted(traces, key=lambda trace: trace.get("t", 0))
+
+
+def median_latency(traces: List[dict], prefix: str, default: float) -> float:
+    """Median recorded latency (seconds) of calls whose key starts with ``prefix``."""
+    values = [ms / 1000 for trace in traces for key, ms in trace.get("calls", []) if key.startswith(prefix)]
+    return statistics.median(values) if values else default
+
+
+def node_means(timings: List[Dict[str, float]]) -> Dict[str, float]:
+    """Mean milliseconds per ``node.*`` key over the requests that ran the node."""
+    totals: Dict[str, List[float]] = defaultdict(list)
+    for request in timings:
+        for key, ms in request.items():
+            if key.startswith("node."):
+                totals[key[5:]].append(ms)
+    return {node: sum(values) / len(values) for node, values in totals.items()}
+
+
+async def replay(traces: List[dict], concurrency: int, scale: float):
+    """Replay every conversation; returns per-request ``(route, seconds)``, the wall time and statistics."""
+    from app.schemas.chat import ChatRequest
+    from app.services.rag_service import rag_service
+
+    conversations: Dict[str, List[dict]] = defaultdict(list)
+    for trace in traces:
+        conversations[trace.get("id") or "default"].append(trace)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Tuple[str, float]] = []
+    timings: List[Dict[str, float]] = []
+    stats = {"route_matches": 0, "unscripted": 0}
+
+    async def _conversation(thread_id: str, turns: List[dict]):
+        async with semaphore:
+            for trace in turns:
+                script = ReplayScript(trace, scale)
+                _script.set(script)
+                start = time.perf_counter()
+                response = await rag_service.process_question(
+                    ChatRequest(question=trace["q"], thread_id=f"replay-{thread_id}", include_timings=True))
+                samples.append((response.route or "unknown", time.perf_counter() - start))
+                timings.append(response.timings or {})
+                stats["route_matches"] += response.route == trace.get("route")
+                stats["unscripted"] += script.unscripted
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_conversation(thread_id, turns) for thread_id, turns in conversations.items()))
+    return samples, time.perf_counter() - start, timings, stats
+
+
+def recorded_summary(traces: List[dict]) -> dict:
+    """Per-route latency as recorded in production."""
+    by_route: Dict[str, List[float]] = defaultdict(list)
+    for trace in traces:
+        by_route[trace.get("route") or "unknown"].append(trace.get("ms", 0.0) / 1000)
+    return {route: {"count": len(values), "p50": percentile(sorted(values), 50), "p95": percentile(sorted(values), 95)}
+            for route, values in by_route.items()}
+
+
+async def main(args):
+    traces = load_traces(args.traces)
+    if args.limit:
+        traces = traces[:args.limit]
+    scale = args.latency_scale
+
+    install_stub_models(llm_latency=args.fallback_llm_latency * scale, embed_latency=0.0,
+                        redis_latency=median_latency(traces, "redis.embedding", 0.0) * scale,
+                        llm_class=ReplayChatModel, embeddings_class=ReplayEmbeddings,
+                        vectorstore_class=ReplayVectorStore)
+    memory_service = use_stub_memory(latency=median_latency(traces, "mongodb.", 0.0) * scale)
+    await use_memory_checkpointer(latency=median_latency(traces, "redis.checkpoint", 0.0) * scale)
+
+    logging.disable(logging.WARNING)
+    from app.services.semantic_cache_service import semantic_cache_service
+
+    print(f"replaying {len(traces)} recorded requests from {args.traces} "
+          f"(latency scale {scale:g}, concurrency {args.concurrency})")
+
+    semantic_cache_service.clear()
+    with profiled(args.profile, args.profile_out, args.top):
+        samples, elapsed, timings, stats = await replay(traces, args.concurrency, scale)
+
+    result = summarize(samples, elapsed)
+    print_report("replay", result)
+
+    recorded = recorded_summary(traces)
+    print(f"\n  {'route':<10}{'recorded p50':>14}{'replay p50':>12}{'recorded p95':>14}{'replay p95':>12}")
+    for route, before in sorted(recorded.items()):
+        after = result["routes"].get(route, {})
+        print(f"  {route:<10}{1000 * before['p50']:>14.1f}{1000 * after.get('p50', 0):>12.1f}"
+              f"{1000 * before['p95']:>14.1f}{1000 * after.get('p95', 0):>12.1f}")
+
+    recorded_nodes = node_means([{key: ms for key, ms in trace.get("calls", [])} for trace in traces])
+    replayed_nodes = node_means(timings)
+    print(f"\n  {'node':<26}{'recorded ms':>12}{'replay ms':>12}")
+    for node in sorted(set(recorded_nodes) | set(replayed_nodes)):
+        print(f"  {node:<26}{recorded_nodes.get(node, 0):>12.1f}{replayed_nodes.get(node, 0):>12.1f}")
+
+    print(f"\nroute agreement: {stats['route_matches']}/{len(samples)}; "
+          f"unscripted LLM calls / searches: {stats['unscripted']}")
+    await memory_service.drain(timeout=5.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", help="JSONL recording (TRACE_RECORD_PATH)")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations in flight")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for recorded latencies; 0 replays CPU-only")
+    parser.add_argument("--fallback-llm-latency", type=float, default=0.05,
+                        help="seconds for LLM calls the recording has no reply for")
+    parser.add_argument("--profile", choices=("cprofile", "sample"), help="profile the replay")
+    parser.add_argument("--profile-out", help="cProfile .prof file or collapsed stacks for sampling")
+    parser.add_argument("--top", type=int, default=20, help="hot spots to print")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+Reranking benchmark: prompt tokens stuffed into the vector-route prompt, with and without ``ContextReranker``.
+
+Builds a small screenplay corpus offline: every scene of the stub snippets
+is padded with filler action lines and split with ``SceneChunker`` (small
+chunks, so long scenes produce overlapping splits), plus filler-only
+scenes. Each eval question has a gold line that answers it. Retrieval is
+the real ``HybridRetriever`` (BM25 + dense MMR over the stub embedder).
+
+Reported per configuration: average chunks and estimated tokens handed to
+the prompt, and context recall (share of questions whose gold line is
+still in the context). Context recall stands in for answer quality here;
+judging answers needs the real LLM.
+
+Usage:
+    python -m benchmarks.rerank --top-k 6 --token-budget 800
+"""
+
+import argparse
+import asyncio
+import random
+
+from .stubs import install_stub_models, SCRIPT_SNIPPETS, StubEmbeddings
+
+# (question, gold line) - each gold line is one of the stub script snippets
+EVAL_SET = [
+    ("Who crosses no man's land to deliver the message?", SCRIPT_SNIPPETS[0][1]),
+    ("Who stabs Blake and what happens to Schofield afterwards?", SCRIPT_SNIPPETS[1][1]),
+    ("What does Schofield do when the first wave goes over the top?", SCRIPT_SNIPPETS[2][1]),
+    ("What does K discover about the replicant remains?", SCRIPT_SNIPPETS[3][1]),
+    ("What does Joi tell K about being special?", SCRIPT_SNIPPETS[4][1]),
+    ("Where do Deckard and K fight?", SCRIPT_SNIPPETS[5][1]),
+    ("How is Chris sent into the sunken place?", SCRIPT_SNIPPETS[6][1]),
+    ("What happens at the garden party auction?", SCRIPT_SNIPPETS[7][1]),
+    ("Who rescues Chris from the Armitage estate?", SCRIPT_SNIPPETS[8][1]),
+]
+
+FILLER = ("wind moves across the field", "a door slams somewhere below", "he checks the map again",
+          "smoke drifts over the ruins", "she looks away for a moment", "the radio crackles with static",
+          "footsteps echo down the corridor", "rain streaks the window", "a dog barks in the distance",
+          "the engine ticks as it cools", "someone laughs in the next room", "light flickers overhead")
+
+
+def _corpus(rng: random.Random, chunk_chars: int):
+    from app.utils.ingestion import SceneChunker
+
+    movies = {}
+    for scene, (movie, line) in enumerate(SCRIPT_SNIPPETS):
+        lines = [f"{scene + 1} INT. {movie.upper()} SET {scene} - NIGHT"]
+        lines += [rng.choice(FILLER).capitalize() + "." for _ in range(rng.randint(6, 10))]
+        lines.insert(rng.randint(2, len(lines)), line)
+        lines += [rng.choice(FILLER).capitalize() + "." for _ in range(rng.randint(6, 10))]
+        movies.setdefault(movie, []).append("\n".join(lines))
+    for movie in list(movies):
+        for extra in range(6):
+            lines = [f"{100 + extra} EXT. {movie.upper()} LOT {extra} - DAY"]
+            lines += [rng.choice(FILLER).capitalize() + "." for _ in range(rng.randint(10, 20))]
+            movies[movie].append("\n".join(lines))
+
+    chunker = SceneChunker(max_chars=chunk_chars, overlap=chunk_chars // 3)
+    documents = []
+    for movie, scenes in movies.items():
+        for chunk in chunker.chunk(enumerate(scenes, start=1), source=f"{movie}.pdf", movie=movie):
+            chunk.metadata["_id"] = len(documents)
+            documents.append(chunk)
+    return documents
+
+
+async def main(args):
+    install_stub_models(llm_latency=0.0, embed_latency=0.0)
+
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import InMemoryVectorStore
+    from app.utils.retrieval import BM25Index, HybridRetriever
+    from app.utils.reranking import ContextReranker, estimate_tokens
+
+    chunks = _corpus(random.Random(args.seed), args.chunk_chars)
+    documents = [Document(page_content=chunk.text, metadata=chunk.metadata) for chunk in chunks]
+    store = InMemoryVectorStore(StubEmbeddings(latency=0.0))
+    store.add_documents(documents)
+    bm25 = BM25Index(documents)
+    print(f"corpus: {len(documents)} chunks, {len(EVAL_SET)} questions")
+
+    configurations = [
+        ("fused (no rerank)", None),
+        ("lexical rerank", ContextReranker(top_k=args.top_k, token_budget=args.token_budget)),
+    ]
+    if args.model:
+        configurations.append(("cross-encoder", ContextReranker(top_k=args.top_k, token_budget=args.token_budget,
+                                                                model_name=args.model)))
+
+    print(f"{'configuration':<20}{'chunks':>8}{'tokens':>9}{'recall':>8}")
+    for name, reranker in configurations:
+        retriever = HybridRetriever(vectorstore=store, bm25=bm25, reranker=reranker)
+        chunk_total = token_total = hits = 0
+        for question, gold in EVAL_SET:
+            context = await retriever.ainvoke(question)
+            chunk_total += len(context)
+            token_total += sum(estimate_tokens(doc.page_content) for doc in context)
+            hits += any(gold in doc.page_content for doc in context)
+        n = len(EVAL_SET)
+        print(f"{name:<20}{chunk_total / n:>8.1f}{token_total / n:>9.0f}{hits / n:>8.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--token-budget", type=int, default=800)
+    parser.add_argument("--chunk-chars", type=int, default=300)
+    parser.add_argument("--model", help="local cross-encoder to compare (needs sentence-transformers)")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
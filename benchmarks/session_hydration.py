@@ -0,0 +1,157 @@
+"""
+Session hydration benchmark: Redis checkpoint and MongoDB round trips per request.
+
+Runs the same conversations through ``RAGService.process_question`` twice:
+
+- ``legacy``: the old input builder (``graph.aget_state`` before every turn,
+  then the whole MongoDB history of a cold thread sliced to the last 10).
+- ``hydrator``: ``session_hydrator.build_input``.
+
+Each thread starts cold in the checkpointer with ``--history`` messages
+already in MongoDB. The checkpointer is LangGraph's in-memory saver and
+MongoDB an in-memory collection, both wrapped to count calls.
+
+Usage:
+    python -m benchmarks.session_hydration --threads 20 --turns 5 --history 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+from .stubs import install_stub_models, use_memory_checkpointer
+
+
+class _Cursor:
+    def __init__(self, docs, counter: Counter):
+        self._docs = docs
+        self._counter = counter
+
+    def sort(self, keys):
+        # Stable sorts applied from the last key to the first give a compound ordering
+        for key, direction in reversed(keys):
+            self._docs = sorted(self._docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def __aiter__(self):
+        self._counter["mongo_docs_read"] += len(self._docs)
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class CountingCollection:
+    """Just enough of an async MongoDB collection for the memory service, counting round trips."""
+
+    def __init__(self, counter: Counter):
+        self.counter = counter
+        self.docs = []
+
+    def find(self, query, projection=None):
+        self.counter["mongo_queries"] += 1
+        return _Cursor([doc for doc in self.docs if doc["SessionId"] == query["SessionId"]], self.counter)
+
+    async def insert_many(self, docs):
+        self.counter["mongo_writes"] += 1
+        for doc in docs:
+            self.docs.append({**doc, "_id": len(self.docs)})
+
+    async def bulk_write(self, requests, ordered=True):
+        self.counter["mongo_writes"] += 1
+
+
+def _count_checkpointer(saver, counter: Counter):
+    for name, label in (("aget_tuple", "checkpoint_reads"), ("aput", "checkpoint_writes"),
+                        ("aput_writes", "checkpoint_writes")):
+        original = getattr(saver, name)
+
+        async def counted(*args, _original=original, _label=label, **kwargs):
+            counter[_label] += 1
+            return await _original(*args, **kwargs)
+
+        setattr(saver, name, counted)
+
+
+async def _legacy_build_input(rag_service, memory_service, thread_id: str, question: str) -> dict:
+    from langchain_core.messages import HumanMessage
+
+    config = {"configurable": {"thread_id": thread_id}}
+    current_state = await rag_service.graph.aget_state(config)
+    if current_state and current_state.values.get("messages"):
+        return {"messages": [HumanMessage(content=question)], "thread_id": thread_id}
+    chat_history = (await memory_service.aget_messages_for_langchain(thread_id))[-10:]
+    return {"messages": chat_history + [HumanMessage(content=question)], "thread_id": thread_id}
+
+
+def _seed_history(collection: CountingCollection, thread_id: str, history: int):
+    from langchain_core.messages import AIMessage, HumanMessage, message_to_dict
+
+    timestamp = datetime.now(timezone.utc)
+    for i in range(history):
+        message = HumanMessage(content=f"old question {i}") if i % 2 == 0 else AIMessage(content=f"old answer {i}")
+        collection.docs.append({"SessionId": thread_id, "History": json.dumps(message_to_dict(message)),
+                                "timestamp": timestamp, "_id": len(collection.docs)})
+
+
+async def main(args):
+    install_stub_models(llm_latency=0.0, embed_latency=0.0)
+    rag_service = await use_memory_checkpointer()
+    logging.disable(logging.WARNING)
+
+    from app.schemas.chat import ChatRequest
+    from app.services.memory_service import memory_service
+    from app.services.redis_checkpointer import redis_checkpointer
+    from app.services.semantic_cache_service import semantic_cache_service
+    from app.services.session_service import session_hydrator
+
+    semantic_cache_service.enabled = False
+    counter = Counter()
+    collection = CountingCollection(counter)
+    memory_service._validated = True
+    memory_service._get_async_collection = lambda: collection
+    memory_service._get_async_meta_collection = lambda: collection
+    _count_checkpointer(redis_checkpointer.get_checkpointer(), counter)
+    hydrator_build_input = session_hydrator.build_input
+
+    print(f"{'mode':<10}{'requests':>10}{'ckpt reads':>12}{'ckpt writes':>13}"
+          f"{'mongo queries':>15}{'mongo docs':>12}{'mongo writes':>14}   (per request)")
+    for mode in ("legacy", "hydrator"):
+        if mode == "legacy":
+            session_hydrator.build_input = lambda thread_id, question: _legacy_build_input(
+                rag_service, memory_service, thread_id, question)
+        else:
+            session_hydrator.build_input = hydrator_build_input
+
+        threads = [f"{mode}-{t}" for t in range(args.threads)]
+        for thread_id in threads:
+            _seed_history(collection, thread_id, args.history)
+        counter.clear()
+
+        for turn in range(args.turns):
+            for thread_id in threads:
+                await rag_service.process_question(ChatRequest(question=f"Hello again {turn}", thread_id=thread_id))
+        await memory_service.drain()
+
+        total = args.threads * args.turns
+        print(f"{mode:<10}{total:>10}" + "".join(
+            f"{counter[key] / total:>{width}.2f}" for key, width in (
+                ("checkpoint_reads", 12), ("checkpoint_writes", 13), ("mongo_queries", 15),
+                ("mongo_docs_read", 12), ("mongo_writes", 14))
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--history", type=int, default=200, help="messages already in MongoDB per thread")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""
+Speculative retrieval benchmark: per-route latency with the router run strictly before retrieval vs alongside it.
+
+Every question goes to the LLM router (the local router tiers are off), so
+each turn pays the router round trip. With ``ROUTER_SPECULATIVE_ENABLED``
+the vector retrieval (query embedding + vector search) and the SQL schema
+refresh start while the router call is in flight; the losing branch is
+cancelled once the route is known.
+
+Latencies are injected into the stubs: ``--llm-latency`` per LLM call,
+``--embed-latency`` per embedding call and ``--search-latency`` per vector
+search (the Qdrant round trip). The semantic answer cache is off and every
+question is distinct, so nothing is answered or embedded from a cache.
+
+Usage:
+    python -m benchmarks.speculative --turns 60 --llm-latency 0.08 --embed-latency 0.03 --search-latency 0.02
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from .stubs import classify, install_stub_models, use_memory_checkpointer
+from .chat_load import QUESTIONS
+
+
+def _add_search_latency(vectorstore, latency: float):
+    original = vectorstore.amax_marginal_relevance_search_by_vector
+
+    async def search(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return await original(*args, **kwargs)
+
+    vectorstore.amax_marginal_relevance_search_by_vector = search
+
+
+async def main(args):
+    models = install_stub_models(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+    _add_search_latency(models.vectorstore, args.search_latency)
+    rag_service = await use_memory_checkpointer()
+    logging.disable(logging.WARNING)
+
+    from app.core.config import settings
+    from app.schemas.chat import ChatRequest
+    from app.services.semantic_cache_service import semantic_cache_service
+    from app.utils.nodes import speculative_retriever, tiered_router
+
+    semantic_cache_service.enabled = False
+    tiered_router.enabled = False
+    routes = sorted({classify(question) for question in QUESTIONS})
+
+    print(f"{'mode':<13}" + "".join(f"{route + ' p50 ms':>18}" for route in routes))
+    for mode, enabled in (("sequential", False), ("speculative", True)):
+        settings.ROUTER_SPECULATIVE_ENABLED = enabled
+        samples = {route: [] for route in routes}
+        for turn in range(args.turns):
+            question = QUESTIONS[turn % len(QUESTIONS)]
+            start = time.perf_counter()
+            response = await rag_service.process_question(ChatRequest(
+                question=f"{question} ({mode} {turn})", thread_id=f"speculative-{mode}-{turn}",
+            ))
+            samples[response.route].append(time.perf_counter() - start)
+        print(f"{mode:<13}" + "".join(
+            f"{1000 * statistics.median(samples[route]):>18.1f}" if samples[route] else f"{'-':>18}"
+            for route in routes
+        ))
+    print(f"speculative retrieval: {speculative_retriever.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--llm-latency", type=float, default=0.08)
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
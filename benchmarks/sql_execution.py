@@ -0,0 +1,63 @@
+"""
+Generated-SQL execution benchmark: per-call ``QuerySQLDatabaseTool`` vs ``ReadOnlySQLExecutor``.
+
+Replays a dashboard-style workload (the same few top-N queries, with the
+whitespace/case drift an LLM produces) and reports mean latency per query:
+
+- ``tool``: a new ``QuerySQLDatabaseTool`` per call, as ``execute_query`` used to do.
+- ``executor (cold)``: pooled read-only connections, result cache disabled.
+- ``executor (cached)``: pooled read-only connections with the result cache.
+
+Usage:
+    python -m benchmarks.sql_execution --iterations 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain_community.utilities import SQLDatabase
+
+from app.utils.sql_executor import ReadOnlySQLExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(ROOT_DIR, "data", "db", "movies_cv.db")
+
+QUERIES = [
+    "SELECT director, COUNT(*) AS n FROM movies GROUP BY director ORDER BY n DESC LIMIT 10;",
+    "select director, count(*) as n from movies group by director order by n desc limit 10",
+    "SELECT release_year, COUNT(*) FROM movies GROUP BY release_year ORDER BY release_year DESC LIMIT 10",
+    "SELECT g.name, COUNT(*) FROM genre g JOIN movie_genre mg ON g.id = mg.genre_id GROUP BY g.name LIMIT 10",
+    "SELECT  g.name, COUNT(*)  FROM genre g JOIN movie_genre mg ON g.id = mg.genre_id\nGROUP BY g.name LIMIT 10",
+]
+
+
+async def _measure(run, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        await run(QUERIES[i % len(QUERIES)])
+    return 1000 * (time.perf_counter() - start) / iterations
+
+
+async def main(args):
+    db = SQLDatabase.from_uri(f"sqlite:///{DB_PATH}", sample_rows_in_table_info=3)
+    cold = ReadOnlySQLExecutor(DB_PATH, cache_max_entries=0)
+    cached = ReadOnlySQLExecutor(DB_PATH)
+
+    variants = {
+        "tool": lambda query: QuerySQLDatabaseTool(db=db).ainvoke(query),
+        "executor (cold)": cold.arun,
+        "executor (cached)": cached.arun,
+    }
+    print(f"{'variant':<20}{'ms/query':>10}")
+    for name, run in variants.items():
+        print(f"{name:<20}{await _measure(run, args.iterations):>10.3f}")
+    print(f"cache: {cached.get_cache_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""
+SQL prompt schema benchmark: per-call ``SQLDatabase.get_context()`` vs ``SchemaContext``.
+
+For each sample question it measures the time spent building the ``table_info``
+part of the ``write_query`` prompt and its size (tokens estimated as chars / 4):
+
+- ``get_context``: what ``write_query`` used to do on every call.
+- ``cached``: ``SchemaContext`` with the full schema (this database is below the
+  pruning threshold).
+- ``pruned``: ``SchemaContext`` forced to prune, as it would for a larger schema.
+
+Usage:
+    python -m benchmarks.sql_schema --iterations 50
+"""
+
+import argparse
+import os
+import time
+
+from langchain_community.utilities import SQLDatabase
+
+from app.utils.sql_schema import SchemaContext
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(ROOT_DIR, "data", "db", "movies_cv.db")
+
+QUESTIONS = [
+    "Who directed Get Out?",
+    "Which actors star in 1917?",
+    "What genres does Blade Runner 2049 belong to?",
+    "How many movies were released after 2015?",
+]
+
+
+def _measure(build, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        text = build()
+    return 1000 * (time.perf_counter() - start) / iterations, len(text)
+
+
+def main(args):
+    db_uri = f"sqlite:///{DB_PATH}"
+    db = SQLDatabase.from_uri(db_uri, sample_rows_in_table_info=3)
+    cached = SchemaContext(db_uri, DB_PATH)
+    pruned = SchemaContext(db_uri, DB_PATH, prune_min_tables=1)
+
+    start = time.perf_counter()
+    cached.get_table_info()
+    pruned.get_table_info()
+    print(f"Startup cost: {1000 * (time.perf_counter() - start) / 2:.1f} ms per SchemaContext")
+
+    print(f"{'question':<48}{'variant':<13}{'ms/call':>10}{'chars':>8}{'~tokens':>9}")
+    for question in QUESTIONS:
+        variants = {
+            "get_context": lambda: str(db.get_context()),
+            "cached": lambda: cached.get_table_info(question),
+            "pruned": lambda: pruned.get_table_info(question),
+        }
+        for name, build in variants.items():
+            ms, chars = _measure(build, args.iterations)
+            print(f"{question[:46]:<48}{name:<13}{ms:>10.3f}{chars:>8}{chars // 4:>9}")
+        print(f"{'':<48}tables: {', '.join(pruned.select_tables(question))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,132 @@
+"""
+Startup benchmark: import cost of ``app.main`` and time until the server answers.
+
+- ``import``: runs ``python -X importtime -c "import app.main"`` in a fresh
+  interpreter and reports the cumulative import time, the heaviest packages
+  and whether any module that belongs to warm-up (model clients, LangGraph,
+  the graph nodes) was pulled onto the import path.
+- ``serve``: starts ``uvicorn app.main:app`` and polls ``/health`` (liveness)
+  and ``/ready`` (readiness) from process spawn. Without reachable backends
+  warm-up fails and ``/ready`` stays 503; ``/health`` must answer anyway.
+
+Exits non-zero when the import exceeds ``--budget-ms`` or a warm-up module
+is imported eagerly, so it can guard startup in CI.
+
+Usage:
+    python -m benchmarks.startup --runs 3 --budget-ms 1500
+    python -m benchmarks.startup --serve
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from .stubs import ROOT_DIR, STUB_ENV
+
+# Must only be imported during warm-up, never by `import app.main`
+WARMUP_MODULES = (
+    "langchain_google_genai", "langchain_cohere", "langchain_qdrant", "qdrant_client",
+    "langgraph", "langchain_community", "app.utils.nodes", "app.utils.retrieval",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env() -> dict:
+    env = {**os.environ, **STUB_ENV, "MONGODB_URL": ""}
+    env["PYTHONPATH"] = ROOT_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _importtime() -> dict:
+    """Cumulative microseconds per imported module (and its nesting depth) for one cold import."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                          cwd=ROOT_DIR, env=_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import app.main failed:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for match in _LINE.finditer(proc.stderr):
+        modules[match.group(4)] = (int(match.group(2)), len(match.group(3)) // 2)
+    return modules
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _poll(url: str, start: float, timeout: float, want_ok: bool):
+    """Seconds from ``start`` until ``url`` answers (with 2xx if ``want_ok``), or None."""
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return time.perf_counter() - start
+        except urllib.error.HTTPError:
+            if not want_ok:
+                return time.perf_counter() - start
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def serve(args):
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=ROOT_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health = _poll(f"http://127.0.0.1:{port}/health", start, args.timeout, want_ok=False)
+        ready = _poll(f"http://127.0.0.1:{port}/ready", start, args.ready_timeout, want_ok=True)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"first /health: {'%.0f ms' % (1000 * health) if health is not None else 'timed out'}")
+    print(f"/ready 200:    {'%.0f ms' % (1000 * ready) if ready is not None else f'not within {args.ready_timeout:.0f}s'}")
+    return health is not None
+
+
+def main(args) -> int:
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        modules = _importtime()
+        totals.append(modules["app.main"][0] / 1000)
+
+    print(f"import app.main: median {statistics.median(totals):.0f} ms over {args.runs} runs "
+          f"({', '.join(f'{total:.0f}' for total in totals)})")
+    print("heaviest top-level imports (last run):")
+    top = sorted(((us, name) for name, (us, depth) in modules.items() if depth == 1), reverse=True)[:args.top]
+    for us, name in top:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    eager = sorted(name for name in modules if name.split(".")[0] in WARMUP_MODULES or name in WARMUP_MODULES)
+    ok = True
+    if eager:
+        print(f"FAIL: warm-up modules imported eagerly: {', '.join(eager[:10])}")
+        ok = False
+    if statistics.median(totals) > args.budget_ms:
+        print(f"FAIL: import exceeds budget of {args.budget_ms:.0f} ms")
+        ok = False
+    if args.serve:
+        ok = serve(args) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    parser.add_argument("--serve", action="store_true", help="also time /health and /ready under uvicorn")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for /health")
+    parser.add_argument("--ready-timeout", type=float, default=5.0, help="seconds to wait for /ready")
+    sys.exit(main(parser.parse_args()))
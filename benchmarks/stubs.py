@@ -0,0 +1,457 @@
+"""
+Deterministic stand-ins for the remote backends used by the RAG pipeline.
+
+``install_stub_models()`` must run before anything under ``app`` is imported:
+it registers a fake ``app.factories.models`` module so no Gemini, Cohere or
+Qdrant client is ever constructed. The SQLite database is the real local file.
+
+Every stand-in sleeps for a fixed, configurable latency per call, so runs are
+repeatable and can approximate production round trips. Set up in this order:
+
+    install_stub_models(llm_latency=..., vector_latency=..., redis_latency=...)
+    use_stub_memory(latency=...)         # optional: in-memory MongoDB history
+    await use_memory_checkpointer(latency=...)
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+import types
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.vectorstores import InMemoryVectorStore
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings() requires these even though no remote client is built
+STUB_ENV = {
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_PASSWORD": "",
+    "QDRANT_URL": "",
+    "QDRANT_API_KEY": "",
+    "EMBEDDING_AZURE_OPENAI_ENDPOINT": "",
+    "EMBEDDING_API_VERSION": "",
+}
+
+STUB_SQL = {"query": "SELECT title, release_year, director FROM movies ORDER BY release_year DESC LIMIT 10"}
+
+SQL_KEYWORDS = ("director", "directed", "release", "year", "genre", "cast", "actor", "how many", "list")
+VECTOR_KEYWORDS = ("plot", "theme", "character", "motivation", "scene", "feel", "emotion", "dialogue")
+
+SCRIPT_SNIPPETS = [
+    ("1917", "Schofield and Blake cross no man's land to deliver the message that will stop the attack."),
+    ("1917", "Blake is stabbed by the German pilot; Schofield carries on alone to find his brother."),
+    ("1917", "Schofield runs along the trench line as the first wave goes over the top."),
+    ("Blade Runner 2049", "K discovers the remains of a replicant who died in childbirth."),
+    ("Blade Runner 2049", "Joi tells K he is special, and K begins to believe he was born, not made."),
+    ("Blade Runner 2049", "Deckard and K fight in the abandoned Las Vegas casino."),
+    ("Get Out", "Chris is hypnotized by Missy and sinks into the sunken place."),
+    ("Get Out", "Rose's family auctions Chris to the highest bidder at the garden party."),
+    ("Get Out", "Rod tracks down Chris and rescues him from the Armitage estate."),
+]
+
+
+def classify(question: str) -> str:
+    """Keyword routing used by the stub LLM to answer router prompts."""
+    text = question.lower()
+    if any(keyword in text for keyword in VECTOR_KEYWORDS):
+        return "vector"
+    if any(keyword in text for keyword in SQL_KEYWORDS):
+        return "sql"
+    return "general"
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that sleeps for ``latency`` seconds and returns a canned reply."""
+
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        text = str(messages[-1].content) if messages else ""
+        if "intelligent routing assistant" in text:
+            question = text.rsplit("Q:", 1)[-1]
+            return classify(question)
+        if "Standalone question:" in text:
+            # Condensation: echo the follow-up unchanged
+            return text.rsplit("Follow-up question:", 1)[-1].split("\n", 1)[0].strip()
+        return f"Stub answer ({len(text)} chars of context)."
+
+    def _message(self, messages: List[BaseMessage], structured: bool) -> AIMessage:
+        if structured:
+            return AIMessage(content="", tool_calls=[{"name": "QueryOutput", "args": dict(STUB_SQL), "id": "stub"}])
+        return AIMessage(content=self._reply(messages))
+
+    def _chunks(self, messages: List[BaseMessage], structured: bool) -> Iterator[ChatGenerationChunk]:
+        if structured:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": "QueryOutput", "args": json.dumps(STUB_SQL), "id": "stub", "index": 0}
+            ]))
+            return
+        for word in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, structured_output: bool = False, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, structured_output))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, structured_output: bool = False, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, structured_output))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, structured_output: bool = False, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for chunk in self._chunks(messages, structured_output):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, structured_output: bool = False,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(messages, structured_output):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema: Any, **kwargs: Any):
+        # A tool-call reply through the model itself, like Gemini, so callbacks (metrics, traces) see it
+        return self.bind(structured_output=True) | RunnableLambda(lambda message: dict(message.tool_calls[0]["args"]))
+
+
+class StubEmbeddings(Embeddings):
+    """Hash-based embeddings with an injected per-call latency."""
+
+    def __init__(self, size: int = 64, latency: float = 0.01):
+        self.size = size
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in text.lower().split():
+            vector[zlib.crc32(token.encode()) % self.size] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+def stub_documents() -> List[Document]:
+    """Script snippets as chunks, with ``_id`` set like Qdrant results."""
+    return [
+        Document(page_content=text, metadata={"movie": movie, "chunk": i, "_id": i})
+        for i, (movie, text) in enumerate(SCRIPT_SNIPPETS)
+    ]
+
+
+class StubVectorStore(InMemoryVectorStore):
+    """In-memory vector store whose MMR search sleeps for ``latency`` seconds, like a Qdrant round trip."""
+
+    def __init__(self, embedding: Embeddings, latency: float = 0.0):
+        super().__init__(embedding)
+        self.latency = latency
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        time.sleep(self.latency)
+        return super().max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, **kwargs)
+
+    async def amax_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                       lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return super().max_marginal_relevance_search_by_vector(embedding, k, fetch_k, lambda_mult, **kwargs)
+
+
+def build_stub_vectorstore(embedder: Embeddings, latency: float = 0.0, store_class=StubVectorStore) -> StubVectorStore:
+    """In-memory vector store seeded with a few script snippets."""
+    store = store_class(embedder, latency=latency)
+    store.add_documents(stub_documents())
+    return store
+
+
+class StubRedis:
+    """In-memory stand-in for the sync Redis client used by the embedding cache (``mget`` + pipelined ``set``)."""
+
+    def __init__(self, data: Dict[str, bytes], latency: float = 0.0):
+        self.data = data
+        self.latency = latency
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        time.sleep(self.latency)
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "_StubPipeline":
+        return _StubPipeline(self)
+
+
+class StubAsyncRedis(StubRedis):
+    """Async variant of ``StubRedis``, sharing its data."""
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        await asyncio.sleep(self.latency)
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "_StubAsyncPipeline":
+        return _StubAsyncPipeline(self)
+
+
+class _StubPipeline:
+    def __init__(self, client: StubRedis):
+        self.client = client
+        self.pending: Dict[str, bytes] = {}
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        self.pending[key] = value
+
+    def execute(self):
+        time.sleep(self.client.latency)
+        self.client.data.update(self.pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _StubAsyncPipeline(_StubPipeline):
+    async def execute(self):
+        await asyncio.sleep(self.client.latency)
+        self.client.data.update(self.pending)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class StubMongoCollection:
+    """The slice of the async PyMongo collection API that ``MemoryService`` uses, kept in a list.
+
+    Filters are equality matches; ``bulk_write`` metadata upserts are accepted
+    (and timed) but not applied, so session summaries stay empty.
+    """
+
+    def __init__(self, database: "StubMongoDatabase", latency: float):
+        self.database = database
+        self.latency = latency
+        self.documents: List[dict] = []
+        self._ids = itertools.count()
+
+    @staticmethod
+    def _matches(document: dict, query: dict) -> bool:
+        return all(document.get(key) == value for key, value in query.items())
+
+    async def insert_many(self, documents: List[dict], **kwargs: Any):
+        await asyncio.sleep(self.latency)
+        for document in documents:
+            self.documents.append({"_id": next(self._ids), **document})
+
+    async def bulk_write(self, requests: list, **kwargs: Any):
+        await asyncio.sleep(self.latency)
+
+    def find(self, query: dict, projection: Optional[dict] = None) -> "_StubCursor":
+        return _StubCursor(self, [d for d in self.documents if self._matches(d, query)])
+
+    async def find_one(self, query: dict):
+        await asyncio.sleep(self.latency)
+        return next((d for d in self.documents if self._matches(d, query)), None)
+
+    async def delete_many(self, query: dict):
+        await asyncio.sleep(self.latency)
+        self.documents = [d for d in self.documents if not self._matches(d, query)]
+
+    async def delete_one(self, query: dict):
+        await asyncio.sleep(self.latency)
+        match = next((d for d in self.documents if self._matches(d, query)), None)
+        if match is not None:
+            self.documents.remove(match)
+
+
+class _StubCursor:
+    def __init__(self, collection: StubMongoCollection, documents: List[dict]):
+        self.collection = collection
+        self.documents = documents
+
+    def sort(self, keys: list) -> "_StubCursor":
+        # Insertion order is timestamp order; only the direction matters
+        if keys and keys[0][1] < 0:
+            self.documents = self.documents[::-1]
+        return self
+
+    def limit(self, n: int) -> "_StubCursor":
+        self.documents = self.documents[:n]
+        return self
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.collection.latency)
+        for document in self.documents:
+            yield document
+
+
+class StubMongoDatabase:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.collections: Dict[str, StubMongoCollection] = {}
+
+    def __getitem__(self, name: str) -> StubMongoCollection:
+        if name not in self.collections:
+            self.collections[name] = StubMongoCollection(self, self.latency)
+        return self.collections[name]
+
+
+class StubMongoClient:
+    """In-memory stand-in for ``AsyncMongoClient`` with a per-operation latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.databases: Dict[str, StubMongoDatabase] = {}
+
+    def __getitem__(self, name: str) -> StubMongoDatabase:
+        if name not in self.databases:
+            self.databases[name] = StubMongoDatabase(self.latency)
+        return self.databases[name]
+
+    async def close(self):
+        pass
+
+
+def install_stub_models(llm_latency: float = 0.05, embed_latency: float = 0.01, vector_latency: float = 0.0,
+                        sql_latency: float = 0.0, redis_latency: Optional[float] = None,
+                        llm_class=StubChatModel, embeddings_class=StubEmbeddings,
+                        vectorstore_class=StubVectorStore) -> types.ModuleType:
+    """Register a fake ``app.factories.models`` backed by the stand-ins above.
+
+    With ``redis_latency`` set, the embedding cache gets an in-memory Redis
+    tier with that latency; otherwise it runs LRU-only. The ``*_class``
+    arguments swap in subclasses of the stand-ins (see ``benchmarks.replay``).
+    The LLM, embedder and vector store sit behind the same bulkheads as in
+    production, configured by the ``<BACKEND>_MAX_CONCURRENCY`` settings.
+    """
+    for name, value in STUB_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ["MONGODB_URL"] = ""
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    import app.factories
+    from app.factories.resources import ResourceRegistry
+    from app.utils.admission import Bulkhead, limit_chat_model
+    from app.utils.metrics import LLMMetricsHandler
+    from app.utils.tracing import TraceCallbackHandler
+    from app.utils.embedding_cache import CachedEmbeddings
+    from app.utils.retrieval import BM25Index, HybridRetriever
+    from app.utils.sql_schema import SchemaContext
+    from app.utils.sql_executor import ReadOnlySQLExecutor
+    from langchain_community.utilities import SQLDatabase
+
+    module = types.ModuleType("app.factories.models")
+    module.llm = limit_chat_model(
+        llm_class(latency=llm_latency, cache=False, callbacks=[LLMMetricsHandler("stub"), TraceCallbackHandler()]),
+        Bulkhead.from_settings("llm"))
+    embeddings = embeddings_class(latency=embed_latency)
+    module.embedder = CachedEmbeddings(embeddings, model_name="stub", abatch_query=embeddings.aembed_documents,
+                                       limiter=Bulkhead.from_settings("embedder"))
+    if redis_latency is not None:
+        redis_data: Dict[str, bytes] = {}
+        module.embedder._redis_url = "stub://"
+        module.embedder._redis = StubRedis(redis_data, redis_latency)
+        module.embedder._aredis = StubAsyncRedis(redis_data, redis_latency)
+    module.vectorstore = build_stub_vectorstore(module.embedder, latency=vector_latency, store_class=vectorstore_class)
+    module.hybrid_retriever = HybridRetriever(vectorstore=module.vectorstore, bm25=BM25Index(stub_documents()),
+                                              limiter=Bulkhead.from_settings("vectorstore"))
+    db_path = os.path.join(ROOT_DIR, "data", "db", "movies_cv.db")
+    module.db = SQLDatabase.from_uri(f"sqlite:///{db_path}", sample_rows_in_table_info=3)
+    module.schema_context = SchemaContext(f"sqlite:///{db_path}", db_path)
+
+    class StubSQLExecutor(ReadOnlySQLExecutor):
+        """Real SQLite execution plus ``sql_latency`` per uncached query."""
+
+        def _execute_query(self, query: str) -> str:
+            time.sleep(sql_latency)
+            return super()._execute_query(query)
+
+    module.sql_executor = StubSQLExecutor(db_path)
+    module.resources = ResourceRegistry()
+    for name in ("llm", "embedder", "vectorstore", "hybrid_retriever", "db", "schema_context", "sql_executor"):
+        module.resources.register(name)(lambda value=getattr(module, name): value)
+    sys.modules["app.factories.models"] = module
+    app.factories.models = module
+    return module
+
+
+def use_stub_memory(latency: float = 0.0):
+    """Enable the MongoDB chat history service against ``StubMongoClient``; call before ``use_memory_checkpointer``."""
+    from app.services.memory_service import memory_service
+
+    memory_service._async_client = StubMongoClient(latency)
+    memory_service._validated = True
+    return memory_service
+
+
+def _delayed(fn, latency: float):
+    async def wrapper(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return await fn(*args, **kwargs)
+    return wrapper
+
+
+async def use_memory_checkpointer(latency: float = 0.0):
+    """Swap the Redis checkpointer for LangGraph's in-memory saver and build the graph.
+
+    ``latency`` is added to every checkpoint read and write, standing in for
+    the Redis round trip.
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+    from app.services.redis_checkpointer import redis_checkpointer
+    from app.services.redis_cache_service import redis_cache_service
+    from app.services.rag_service import rag_service
+    from app.utils.metrics import timed_async
+
+    saver = MemorySaver()
+    if latency:
+        for name in ("aget_tuple", "aput", "aput_writes"):
+            delayed = _delayed(getattr(saver, name), latency)
+            setattr(saver, name, timed_async(delayed, "redis", f"checkpoint_{name[1:]}"))
+
+    async def _aget_checkpointer():
+        return saver
+
+    redis_checkpointer.aget_checkpointer = _aget_checkpointer
+    redis_checkpointer.get_checkpointer = lambda: saver
+    redis_cache_service.initialize_llm_cache = lambda: None
+    await rag_service.initialize()
+    return rag_service
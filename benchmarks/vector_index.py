@@ -0,0 +1,141 @@
+"""
+Vector search benchmark: Qdrant vs the embedded snapshot index.
+
+Fills a Qdrant collection with ``--chunks`` random unit vectors, exports it
+with ``export_snapshot`` and loads it into ``EmbeddedVectorIndex``, then
+times the dense half of hybrid retrieval
+(``amax_marginal_relevance_search_by_vector``, k=10, fetch_k=20) on each:
+
+- ``qdrant``: ``QdrantVectorStore`` on an in-memory client by default, or a
+  real server with ``--qdrant-url`` (which adds the network hop the
+  embedded index removes).
+- ``embedded``: brute force over the memory-mapped matrix.
+- ``embedded hnsw``: with ``--hnsw`` (needs hnswlib).
+
+Also reports snapshot export/load time and how often both return the same
+top-10 for plain similarity search.
+
+Usage:
+    python -m benchmarks.vector_index --chunks 3000 --queries 300
+    python -m benchmarks.vector_index --qdrant-url http://localhost:6333
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from .stubs import ROOT_DIR, STUB_ENV
+
+
+class _FixedEmbeddings:
+    """Placeholder; the benchmark searches by vector."""
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
+    async def aembed_query(self, text):
+        raise NotImplementedError
+
+
+async def _time_queries(search, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await search(query)
+        samples.append(time.perf_counter() - start)
+    ordered = sorted(samples)
+    return 1000 * statistics.median(ordered), 1000 * ordered[int(0.99 * (len(ordered) - 1))]
+
+
+async def main(args):
+    for name, value in STUB_ENV.items():
+        os.environ.setdefault(name, value)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    from qdrant_client import AsyncQdrantClient, QdrantClient, models
+    from langchain_qdrant import QdrantVectorStore
+    from app.utils.vector_index import EmbeddedVectorIndex, export_snapshot
+
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((args.chunks, args.dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, args.dimensions)).astype(np.float32).tolist()
+
+    collection = f"bench-{uuid.uuid4().hex[:8]}"
+    if args.qdrant_url:
+        client, aclient = QdrantClient(url=args.qdrant_url), AsyncQdrantClient(url=args.qdrant_url)
+    else:
+        # The in-memory client is per object, so the async export reads the sync client's data via a dump
+        client, aclient = QdrantClient(location=":memory:"), None
+    client.create_collection(collection, vectors_config=models.VectorParams(size=args.dimensions,
+                                                                            distance=models.Distance.COSINE))
+    for i in range(0, args.chunks, 512):
+        client.upsert(collection, points=[
+            models.PointStruct(id=str(uuid.uuid4()), vector=vectors[j].tolist(),
+                               payload={"page_content": f"chunk {j}", "metadata": {"chunk": j}})
+            for j in range(i, min(i + 512, args.chunks))
+        ])
+
+    if aclient is None:
+        aclient = AsyncQdrantClient(location=":memory:")
+        await aclient.create_collection(collection, vectors_config=models.VectorParams(
+            size=args.dimensions, distance=models.Distance.COSINE))
+        offset = None
+        while True:
+            points, offset = client.scroll(collection, limit=1024, offset=offset, with_vectors=True, with_payload=True)
+            await aclient.upsert(collection, points=[
+                models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points
+            ])
+            if offset is None:
+                break
+
+    qdrant = QdrantVectorStore(client=client, collection_name=collection, embedding=_FixedEmbeddings(),
+                               validate_embeddings=False, validate_collection_config=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        await export_snapshot(aclient, collection, directory)
+        export_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        embedded = EmbeddedVectorIndex.from_snapshot(directory, _FixedEmbeddings())
+        load_ms = 1000 * (time.perf_counter() - start)
+
+        print(f"{args.chunks} chunks x {args.dimensions} dims: export {export_seconds:.2f}s, load {load_ms:.1f} ms")
+        print(f"{'backend':<16}{'mmr p50 ms':>12}{'mmr p99 ms':>12}")
+        backends = [("qdrant", qdrant), ("embedded", embedded)]
+        if args.hnsw:
+            backends.append(("embedded hnsw", EmbeddedVectorIndex.from_snapshot(directory, _FixedEmbeddings(), use_hnsw=True)))
+        for name, store in backends:
+            p50, p99 = await _time_queries(
+                lambda q, store=store: store.amax_marginal_relevance_search_by_vector(q, k=10, fetch_k=20, lambda_mult=0.7),
+                queries,
+            )
+            print(f"{name:<16}{p50:>12.3f}{p99:>12.3f}")
+
+        same = 0
+        for query in queries:
+            expected = [doc.metadata["chunk"] for doc in qdrant.similarity_search_by_vector(query, k=10)]
+            actual = [doc.metadata["chunk"] for doc in embedded.similarity_search_by_vector(query, k=10)]
+            same += expected == actual
+        print(f"identical top-10 (similarity): {same}/{len(queries)}")
+
+    client.delete_collection(collection)
+    await aclient.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--qdrant-url", help="benchmark against a running Qdrant instead of the in-memory client")
+    parser.add_argument("--hnsw", action="store_true", help="also time the HNSW index (needs hnswlib)")
+    asyncio.run(main(parser.parse_args()))
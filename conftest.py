@@ -0,0 +1,17 @@
+"""
+Test defaults: ``Settings()`` requires these even though the tests build no remote client.
+"""
+
+import os
+
+for name, value in {
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_PASSWORD": "",
+    "QDRANT_URL": "",
+    "QDRANT_API_KEY": "",
+    "EMBEDDING_AZURE_OPENAI_ENDPOINT": "",
+    "EMBEDDING_API_VERSION": "",
+}.items():
+    os.environ.setdefault(name, value)
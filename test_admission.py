@@ -0,0 +1,164 @@
+"""
+Tests for backend admission control: Bulkhead slot handover, shedding and request priority.
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.admission import Bulkhead, Overloaded, admission_scope, bulkheads
+
+
+@pytest.fixture
+def bulkhead():
+    """One slot, held by a caller outside the test (``in_flight=1``); ``_release()`` frees it."""
+    bulkhead = Bulkhead("test", max_concurrency=1, max_queue=4, queue_timeout=1.0)
+    bulkhead.in_flight = 1
+    yield bulkhead
+    bulkheads.pop("test", None)
+
+
+async def _call(bulkhead: Bulkhead, order: list = None, tag: str = None):
+    async with bulkhead.slot():
+        if order is not None:
+            order.append(tag)
+
+
+async def _queue(bulkhead: Bulkhead, coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(0)
+    return task
+
+
+@pytest.mark.asyncio
+async def test_released_slot_is_handed_to_waiters_in_order(bulkhead):
+    order = []
+    tasks = [await _queue(bulkhead, _call(bulkhead, order, tag)) for tag in "abc"]
+    assert bulkhead.waiting == 3
+
+    bulkhead._release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "b", "c"]
+    assert bulkhead.in_flight == 0
+    assert bulkhead.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_handover_racing_the_queue_timeout_is_admitted(bulkhead, monkeypatch):
+    async def wait_for_handover_then_timeout(waiter, timeout):
+        # The holder hands its slot over just as the queue wait times out
+        bulkhead._release()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, "wait_for", wait_for_handover_then_timeout)
+    async with bulkhead.slot():
+        assert bulkhead.in_flight == 1
+
+    assert bulkhead.in_flight == 0
+    assert bulkhead.get_stats()["shed_timeout"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_sheds_with_503(bulkhead):
+    bulkhead.queue_timeout = 0.01
+
+    with pytest.raises(Overloaded) as shed:
+        await _call(bulkhead)
+
+    assert shed.value.reason == "timeout"
+    assert shed.value.status_code == 503
+    assert bulkhead.waiting == 0
+    bulkhead._release()
+    assert bulkhead.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue(bulkhead):
+    waiter = await _queue(bulkhead, _call(bulkhead))
+    assert bulkhead.waiting == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert bulkhead.waiting == 0
+    bulkhead._release()
+    assert bulkhead.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_right_after_handover_does_not_leak_the_slot(bulkhead):
+    waiter = await _queue(bulkhead, _call(bulkhead))
+
+    bulkhead._release()
+    waiter.cancel()
+    # Depending on the Python version the call is cancelled or runs; either way the slot comes back
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert bulkhead.in_flight == 0
+    assert bulkhead.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_with_429(bulkhead):
+    bulkhead.max_queue = 1
+    queued = await _queue(bulkhead, _call(bulkhead))
+
+    with pytest.raises(Overloaded) as shed:
+        await _call(bulkhead)
+
+    assert shed.value.reason == "queue_full"
+    assert shed.value.status_code == 429
+    bulkhead._release()
+    await queued
+    assert bulkhead.in_flight == 0
+    assert bulkhead.get_stats()["shed_queue_full"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expected_wait_over_the_deadline_sheds_with_503(bulkhead):
+    bulkhead.queue_timeout = 0.5
+    bulkhead._service_time = 1.0
+
+    with pytest.raises(Overloaded) as shed:
+        await _call(bulkhead)
+
+    assert shed.value.reason == "deadline"
+    assert shed.value.status_code == 503
+    assert shed.value.retry_after == pytest.approx(1.0)
+    assert bulkhead.waiting == 0
+    bulkhead._release()
+    assert bulkhead.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_admitted_request_skips_shedding_and_goes_first(bulkhead):
+    bulkhead.max_queue = 1
+    bulkhead._release()
+    order = []
+    first_call_done, second_call = asyncio.Event(), asyncio.Event()
+
+    async def admitted_request():
+        with admission_scope():
+            await _call(bulkhead)
+            first_call_done.set()
+            await second_call.wait()
+            await _call(bulkhead, order, "admitted")
+
+    admitted = asyncio.create_task(admitted_request())
+    await first_call_done.wait()
+    bulkhead.in_flight = 1
+    # A new request fills the queue; the admitted request's next call still queues, ahead of it
+    new = await _queue(bulkhead, _call(bulkhead, order, "new"))
+    second_call.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert bulkhead.waiting == 2
+
+    bulkhead._release()
+    await asyncio.gather(admitted, new)
+
+    assert order == ["admitted", "new"]
+    assert bulkhead.in_flight == 0
+    assert bulkhead.get_stats()["shed_queue_full"] == 0
@@ -0,0 +1,148 @@
+"""
+Tests for request coalescing: SingleFlight and how RAGService shares a run between threads.
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.schemas.chat import ChatRequest
+from app.utils.coalescing import SingleFlight
+
+
+def _counting(result=None, error=None, delay=0.01):
+    calls = {"n": 0}
+
+    async def compute():
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    return compute, calls
+
+
+@pytest.mark.asyncio
+async def test_followers_share_the_leader_result():
+    flight = SingleFlight()
+    compute, calls = _counting("answer")
+
+    results = await asyncio.gather(*(flight.run("q", compute) for _ in range(5)))
+
+    assert calls["n"] == 1
+    assert [result for result, _ in results] == ["answer"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_followers_get_the_leader_error():
+    flight = SingleFlight()
+    compute, calls = _counting(error=ValueError("backend down"))
+
+    results = await asyncio.gather(*(flight.run("q", compute) for _ in range(3)), return_exceptions=True)
+
+    assert calls["n"] == 1
+    assert all(isinstance(result, ValueError) and str(result) == "backend down" for result in results)
+    assert flight.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_followers_rerun_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+    compute, calls = _counting("answer", delay=0.05)
+
+    leader = asyncio.create_task(flight.run("q", compute))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(flight.run("q", compute)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*followers)
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert [result for result in results] == [("answer", False)] * 2
+    assert calls["n"] == 3
+    assert flight.get_stats()["leader_cancelled"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_follower_does_not_cancel_the_leader():
+    flight = SingleFlight()
+    compute, calls = _counting("answer", delay=0.05)
+
+    leader = asyncio.create_task(flight.run("q", compute))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.run("q", compute))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+
+    assert await leader == ("answer", False)
+    with pytest.raises(asyncio.CancelledError):
+        await follower
+    assert calls["n"] == 1
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """RAGService with the pipeline replaced by a counting stub; ``histories`` maps thread to history key."""
+    from app.services import rag_service as module
+
+    rag = module.RAGService()
+    rag._graph_initialized = True
+    rag.histories, rag.recorded, rag.route, rag.runs = {}, [], "general", 0
+
+    async def build_input(thread_id, question):
+        return {"messages": [HumanMessage(content=question)], "thread_id": thread_id}
+
+    async def condense(request, graph_input):
+        return request.question
+
+    async def generate(request, config, graph_input, question, history_key):
+        rag.runs += 1
+        await asyncio.sleep(0.01)
+        return {"answer": f"answer for {history_key}", "route": rag.route, "history_key": history_key}
+
+    async def record(request, config, graph_input, entry):
+        if entry["route"] not in ("sql", "vector", "general"):
+            return False
+        rag.recorded.append(request.thread_id)
+        return True
+
+    monkeypatch.setattr(module.session_hydrator, "build_input", build_input)
+    rag._condense = condense
+    rag._history_key = lambda request, graph_input: rag.histories[request.thread_id]
+    rag._generate = generate
+    rag._record_cached_answer = record
+    return rag
+
+
+@pytest.mark.asyncio
+async def test_history_dependent_answer_reruns_per_history(service):
+    service.histories = {"a": "h1", "b": "h1", "c": "h2", "d": "h2"}
+
+    responses = await asyncio.gather(*(
+        service._answer(ChatRequest(question="Hi there", thread_id=thread)) for thread in "abcd"
+    ))
+
+    assert service.runs == 2
+    assert [response.answer for response in responses] == [
+        "answer for h1", "answer for h1", "answer for h2", "answer for h2",
+    ]
+    assert sorted(service.recorded) == ["b", "d"]
+
+
+@pytest.mark.asyncio
+async def test_unrecordable_shared_route_falls_back_to_own_run(service):
+    service.route = "unknown"
+    service.histories = {thread: "h" for thread in "abc"}
+
+    responses = await asyncio.gather(*(
+        service._answer(ChatRequest(question="Who directed 1917?", thread_id=thread)) for thread in "abc"
+    ))
+
+    assert service.runs == 3
+    assert all(response.route == "unknown" and response.answer == "answer for h" for response in responses)
+    assert service.recorded == []
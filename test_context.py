@@ -0,0 +1,87 @@
+"""
+Tests for ContextSummarizer: background folds, their hand-back and discarding them on a clear.
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.utils.context import ContextSummarizer
+
+
+class StubLLM:
+    def __init__(self, delay: float = 0.01, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return AIMessage(content="summary")
+
+
+MESSAGES = [HumanMessage(content=f"message {i}", id=f"id-{i}") for i in range(3)]
+
+
+@pytest.mark.asyncio
+async def test_finished_fold_is_collected_once_with_its_message_ids():
+    summarizer = ContextSummarizer(StubLLM())
+    summarizer.schedule("thread", None, MESSAGES)
+    assert summarizer.collect("thread", None) is None
+
+    await asyncio.sleep(0.05)
+    assert summarizer.collect("thread", None) == ("summary", ["id-0", "id-1", "id-2"])
+    assert summarizer.collect("thread", None) is None
+    assert summarizer.get_stats()["pending"] == summarizer.get_stats()["uncollected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_or_stale_fold_is_not_collected():
+    summarizer = ContextSummarizer(StubLLM(fail=True))
+    summarizer.schedule("thread", None, MESSAGES)
+    await asyncio.sleep(0.05)
+    assert summarizer.collect("thread", None) is None
+
+    summarizer.llm.fail = False
+    summarizer.schedule("thread", None, MESSAGES)
+    await asyncio.sleep(0.05)
+    # Another worker stored a summary in the meantime
+    assert summarizer.collect("thread", "newer summary") is None
+    assert summarizer.get_stats()["stale"] == 1
+
+
+@pytest.mark.asyncio
+async def test_forget_discards_running_and_uncollected_folds():
+    summarizer = ContextSummarizer(StubLLM(delay=0.05))
+    summarizer.schedule("running", None, MESSAGES)
+    summarizer.schedule("finished", None, MESSAGES)
+    await asyncio.sleep(0.1)
+    summarizer.schedule("running", None, MESSAGES)
+
+    summarizer.forget("running")
+    summarizer.forget("finished")
+    await asyncio.sleep(0.1)
+
+    assert summarizer.collect("running", None) is None
+    assert summarizer.collect("finished", None) is None
+    assert not summarizer.pending("running") and not summarizer.pending("finished")
+
+
+@pytest.mark.asyncio
+async def test_thread_cap_evicts_oldest_uncollected_fold():
+    summarizer = ContextSummarizer(StubLLM(), max_threads=2)
+    for thread in ("a", "b"):
+        summarizer.schedule(thread, None, MESSAGES)
+    summarizer.schedule("c", None, MESSAGES)
+    assert summarizer.get_stats()["skipped"] == 1
+
+    await asyncio.sleep(0.05)
+    summarizer.schedule("c", None, MESSAGES)
+    await asyncio.sleep(0.05)
+
+    assert summarizer.collect("a", None) is None
+    assert summarizer.collect("b", None) is not None
+    assert summarizer.collect("c", None) is not None
+    assert summarizer.get_stats()["evicted"] == 1
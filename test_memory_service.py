@@ -0,0 +1,98 @@
+"""
+Tests for the chat history write-behind queue against in-memory stand-ins for the MongoDB collections.
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.services.memory_service import MemoryService
+
+
+class FakeCollection:
+    def __init__(self, events: list, name: str, delay: float = 0.0):
+        self.events = events
+        self.name = name
+        self.delay = delay
+
+    async def insert_many(self, documents):
+        await asyncio.sleep(self.delay)
+        self.events.append((self.name, "insert", sorted({doc["SessionId"] for doc in documents})))
+
+    async def bulk_write(self, updates, ordered=False):
+        self.events.append((self.name, "upsert", len(updates)))
+
+    async def delete_many(self, query):
+        self.events.append((self.name, "delete", query["SessionId"]))
+
+    async def delete_one(self, query):
+        self.events.append((self.name, "delete", query["_id"]))
+
+
+@pytest_asyncio.fixture
+async def service(monkeypatch):
+    service = MemoryService()
+    service._validated = True
+    service.events = []
+    messages = FakeCollection(service.events, "messages", delay=0.05)
+    meta = FakeCollection(service.events, "meta")
+    monkeypatch.setattr(service, "_get_async_collection", lambda: messages)
+    monkeypatch.setattr(service, "_get_async_meta_collection", lambda: meta)
+    monkeypatch.setattr(service, "_meta_updates", lambda turns: [turn[0] for turn in turns])
+    yield service
+    await service.drain(1.0)
+
+
+@pytest.mark.asyncio
+async def test_clear_discards_queued_turns(service, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MEMORY_WRITE_FLUSH_INTERVAL", 0.2)
+
+    service.enqueue_conversation("cleared", "q", "a", "general")
+    service.enqueue_conversation("kept", "q", "a", "general")
+    assert await service.aclear_session_history("cleared")
+    await service.drain(1.0)
+
+    inserts = [event for event in service.events if event[1] == "insert"]
+    assert inserts == [("messages", "insert", ["kept"])]
+    assert service.get_write_stats()["discarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_clear_waits_for_the_batch_being_written(service, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MEMORY_WRITE_FLUSH_INTERVAL", 0.0)
+
+    service.enqueue_conversation("thread", "q1", "a1", "general")
+    await asyncio.sleep(0.01)
+    assert service._flushing is not None
+    service.enqueue_conversation("thread", "q2", "a2", "general")
+    assert await service.aclear_session_history("thread")
+    await service.drain(1.0)
+
+    assert service.events == [
+        ("messages", "insert", ["thread"]),
+        ("meta", "upsert", 1),
+        ("messages", "delete", "thread"),
+        ("meta", "delete", "thread"),
+    ]
+    stats = service.get_write_stats()
+    assert stats["written"] == 1
+    assert stats["discarded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_turns_after_a_clear_are_written(service, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MEMORY_WRITE_FLUSH_INTERVAL", 0.2)
+
+    service.enqueue_conversation("thread", "old", "a", "general")
+    assert await service.aclear_session_history("thread")
+    service.enqueue_conversation("thread", "new", "a", "general")
+    await service.drain(1.0)
+
+    stats = service.get_write_stats()
+    assert stats["written"] == 1
+    assert stats["discarded"] == 1
+    assert service._clear_generation == {}